@@ -6,6 +6,27 @@ Key upgrade from v1:
   - code_interpreter runs SERVER-SIDE (real sandbox with numpy/pandas)
   - Stateful conversations via previous_response_id (cheaper, automatic caching)
   - Only custom functions (update_plan) are handled locally
+  - Optional token-level streaming: text, tool calls and partial plans are
+    yielded as soon as the Responses API emits them
+  - AsyncTradvisorAgent: asyncio-native loop for serving many concurrent chats
+  - One pooled keep-alive HTTP client per process (clients.py)
+  - Custom function calls from one turn run concurrently, each with its own
+    timeout; a ToolResult event is emitted as each one finishes
+  - Token/cost accounting per turn and per query (usage.py), reported on
+    Done.usage, with a per-query Budget that forces an early final answer
+  - Latency spans for every run, model turn, output item and local function
+    (tracing.py), sent to pluggable exporters
+  - Transient API failures are retried with backoff from the last completed
+    turn, behind a circuit breaker, with optional hedged requests (resilience.py)
+  - Multi-turn chats: with a Conversation, each run resumes from the previous
+    run's final response instead of re-sending the system prompt
+    (conversation.py)
+  - Prompt-cache friendly requests: the same tools + system prompt prefix on
+    every call, tagged with a cache key per prompt version
+  - Modular prompt: each query gets only the methodology sections its class
+    needs (methodology.py), plus a load_methodology tool for the rest
+  - Plan changes are yielded as step-level PlanDelta events after the first
+    PlanUpdate snapshot, not as a full copy of the plan per update
 
 Architecture:
   User gives high-level intent
@@ -16,15 +37,39 @@ Architecture:
     → Grok produces final analysis text
 """
 
+import asyncio
+import hashlib
 import json
+import re
+import time
+import weakref
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from dataclasses import dataclass, field
-from typing import Generator
+from typing import TYPE_CHECKING, AsyncGenerator, Generator
 
-from openai import OpenAI
+from openai import AsyncOpenAI, BadRequestError, NotFoundError, OpenAI
 
-from config import XAI_API_KEY, BASE_URL, MODEL, MAX_ITERATIONS
-from prompts import SYSTEM_PROMPT
-from tools import ALL_TOOLS, execute_function
+from clients import get_async_client, get_client
+from config import (
+    BASE_URL,
+    MODEL,
+    MAX_ITERATIONS,
+    MAX_CONCURRENT_RUNS,
+    MODULAR_PROMPT,
+    PLAN_DELTAS,
+    PROMPT_CACHE_ROUTING,
+    STREAM,
+    TOOL_WORKERS,
+)
+from methodology import classify_query, system_messages, tokens_saved
+from prompts import BUDGET_WRAP_UP_PROMPT, SYSTEM_PROMPT
+from resilience import Resilience, get_resilience
+from tools import ALL_TOOLS, execute_function, tool_timeout
+from tracing import Span, get_tracer
+from usage import DEFAULT_BUDGET, Budget, Usage
+
+if TYPE_CHECKING:
+    from conversation import Conversation
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -34,12 +79,25 @@ from tools import ALL_TOOLS, execute_function
 
 @dataclass
 class PlanUpdate:
-    """Agent created or updated its execution plan."""
+    """Agent created or updated its execution plan (full snapshot)."""
     task_summary: str
     steps: list
     is_complete: bool
 
 
+@dataclass
+class PlanDelta:
+    """
+    Changes to the plan since the previous PlanUpdate / PlanDelta of the run.
+    Apply it with apply_plan_event(); fields left at None did not change.
+    """
+    added: list = field(default_factory=list)    # new steps, appended after the existing ones
+    changed: list = field(default_factory=list)  # {"id": ..., <only the fields that changed>}
+    removed: list = field(default_factory=list)  # ids of dropped steps
+    task_summary: str | None = None
+    is_complete: bool | None = None
+
+
 @dataclass
 class ToolCall:
     """Agent is calling a tool (built-in or custom)."""
@@ -47,6 +105,24 @@ class ToolCall:
     description: str = ""
 
 
+@dataclass
+class ToolResult:
+    """A custom function call finished (or timed out)."""
+    name: str
+    call_id: str
+    seconds: float
+    error: str | None = None
+
+
+@dataclass
+class Retrying:
+    """A model turn failed transiently and will be re-sent after `delay` seconds."""
+    attempt: int
+    delay: float
+    error: str
+    discard_chars: int = 0  # text already streamed by the failed attempt; drop it
+
+
 @dataclass
 class TextDelta:
     """Text chunk from the agent's response."""
@@ -58,29 +134,609 @@ class Done:
     """Agent finished."""
     iterations: int
     plan: dict | None
+    ttft: float | None = None  # seconds from run() start to first output token
+    error: str | None = None   # set when the run ended on an API error or the iteration cap
+    cached: bool = False       # replayed from the response cache (response_cache.py)
+    usage: Usage | None = None             # tokens, server tool calls and cost for the query
+    budget_exceeded: str | None = None     # which budget cut the research short
+
+
+STEP_STATUSES = ("pending", "in_progress", "completed", "skipped")
+
+
+# ═══════════════════════════════════════════════════════════════
+# PLAN DIFFS
+# ═══════════════════════════════════════════════════════════════
+#
+# Every update_plan call (and every settled step of a streamed one) re-sends
+# the whole plan.  A run's first plan is yielded as a PlanUpdate snapshot;
+# after that only what changed per step (keyed by step id) goes out as a
+# PlanDelta.  Consumers keep the current plan with apply_plan_event().
+# Plans whose steps can't be matched up (missing or duplicate ids, steps
+# reordered or inserted in the middle), or where a step drops a field, fall
+# back to a snapshot.
+
+
+def _plan_snapshot(plan: dict) -> PlanUpdate:
+    # Copy the steps so consumers holding earlier events don't see them change
+    return PlanUpdate(
+        task_summary=plan.get("task_summary", ""),
+        steps=[dict(step) for step in plan.get("steps", [])],
+        is_complete=plan.get("is_complete", False),
+    )
+
+
+def diff_plan(old: dict | None, new: dict) -> PlanUpdate | PlanDelta | None:
+    """Event taking a consumer from plan `old` to `new`; None if nothing changed."""
+    if old is None:
+        return _plan_snapshot(new)
+
+    old_steps = {step.get("id"): step for step in old.get("steps", [])}
+    new_steps = new.get("steps", [])
+    new_ids = [step.get("id") for step in new_steps]
+    kept = [step_id for step_id in old_steps if step_id in new_ids]
+    if (None in old_steps or None in new_ids or len(set(new_ids)) != len(new_ids)
+            or len(old_steps) != len(old.get("steps", [])) or new_ids[:len(kept)] != kept):
+        return _plan_snapshot(new)
+
+    delta = PlanDelta(
+        added=[dict(step) for step in new_steps[len(kept):]],
+        removed=[step_id for step_id in old_steps if step_id not in new_ids],
+    )
+    for step in new_steps[:len(kept)]:
+        before = old_steps[step["id"]]
+        if before.keys() - step.keys():
+            return _plan_snapshot(new)  # a delta can't remove a field
+        fields = {
+            key: value for key, value in step.items()
+            if key not in before or before[key] != value
+        }
+        if fields:
+            delta.changed.append({"id": step["id"], **fields})
+    if new.get("task_summary", "") != old.get("task_summary", ""):
+        delta.task_summary = new.get("task_summary", "")
+    if new.get("is_complete", False) != old.get("is_complete", False):
+        delta.is_complete = new.get("is_complete", False)
+
+    if delta == PlanDelta():
+        return None
+    return delta
+
+
+def apply_plan_event(plan: dict | None, event: PlanUpdate | PlanDelta) -> dict:
+    """The plan after `event`, as a new dict ({"task_summary", "steps", "is_complete"})."""
+    if isinstance(event, PlanUpdate):
+        return {
+            "task_summary": event.task_summary,
+            "steps": [dict(step) for step in event.steps],
+            "is_complete": event.is_complete,
+        }
+
+    plan = plan or {"task_summary": "", "steps": [], "is_complete": False}
+    changed = {fields["id"]: fields for fields in event.changed}
+    steps = [
+        {**step, **changed.get(step.get("id"), {})}
+        for step in plan["steps"] if step.get("id") not in event.removed
+    ]
+    steps += [dict(step) for step in event.added]
+    return {
+        "task_summary": plan["task_summary"] if event.task_summary is None else event.task_summary,
+        "steps": steps,
+        "is_complete": plan["is_complete"] if event.is_complete is None else event.is_complete,
+    }
+
+
+# ═══════════════════════════════════════════════════════════════
+# PARTIAL JSON (for streamed function-call arguments)
+# ═══════════════════════════════════════════════════════════════
+
+
+def parse_partial_json(text: str):
+    """
+    Best-effort parse of a truncated JSON document.
+
+    Streamed function-call arguments arrive in arbitrary fragments, e.g.
+    '{"steps": [{"id": 1, "descr'.  We close any open string (dropping a
+    half-received escape such as '\\' or '\\u00'), then try the text as-is
+    and progressively earlier cut points (after a ',', '{', '[', '}' or
+    ']'), appending the closers needed at that point.
+    Returns None if nothing parseable has arrived yet.
+    """
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+
+    cuts = []       # (prefix_end, closers) — places we can truncate safely
+    stack = []
+    in_string = escaped = False
+    escape_start = None  # index of the last escape sequence's backslash
+
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+                escape_start = i
+            elif ch == '"':
+                in_string = False
+            continue
+
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+            cuts.append((i + 1, "".join(reversed(stack))))
+        elif ch in "}]":
+            if stack:
+                stack.pop()
+            cuts.append((i + 1, "".join(reversed(stack))))
+        elif ch == ",":
+            cuts.append((i, "".join(reversed(stack))))
+
+    closers = "".join(reversed(stack))
+    head = text
+    if (in_string and escape_start is not None
+            and re.fullmatch(r"\\(u[0-9a-fA-F]{0,3})?", text[escape_start:])):
+        head = text[:escape_start]
+    candidates = [head + ('"' if in_string else "") + closers]
+    candidates += [text[:end] + tail for end, tail in reversed(cuts)]
+
+    for candidate in candidates:
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+    return None
+
+
+# ═══════════════════════════════════════════════════════════════
+# PROMPT CACHING
+# ═══════════════════════════════════════════════════════════════
+#
+# The provider caches the longest request prefix it has seen recently:
+# tools first, then the input items in order.  Every agent turn (and the
+# coordinator's merge) therefore starts with the same ALL_TOOLS + CORE_PROMPT
+# (or the full SYSTEM_PROMPT), and anything that varies per request, such as
+# the methodology sections, comes after them.  The cache key
+# routes requests with that prefix to the same cache; it changes whenever
+# the prompt or a tool schema does, so a new version starts a new entry.
+
+
+def prompt_cache_key(*parts) -> str:
+    """Stable key for a request prefix: a hash of its parts (prompt text, tool schemas)."""
+    digest = hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+    return f"tradvisor-{digest[:12]}"
+
+
+# None disables it (PROMPT_CACHE_ROUTING=false)
+CACHE_KEY = prompt_cache_key(SYSTEM_PROMPT, ALL_TOOLS) if PROMPT_CACHE_ROUTING else None
+
+
+def cache_routing(kwargs: dict) -> dict:
+    """Add the prompt cache key to request kwargs (xAI reads it from a header)."""
+    if CACHE_KEY is not None:
+        if "x.ai" in BASE_URL:
+            kwargs["extra_headers"] = {"x-grok-conv-id": CACHE_KEY}
+        else:
+            kwargs["extra_body"] = {"prompt_cache_key": CACHE_KEY}
+    return kwargs
+
+
+# ═══════════════════════════════════════════════════════════════
+# SHARED TURN HANDLING (used by the sync and async agents)
+# ═══════════════════════════════════════════════════════════════
+
+
+class _AgentCore:
+    """
+    State and output parsing shared by TradvisorAgent and AsyncTradvisorAgent.
+
+    The parse methods return lists of events instead of yielding them so the
+    same logic can drive both a generator and an async generator.  Custom
+    function calls found in a turn are appended to `calls` as
+    (name, arguments, call_id) and executed by the loop once the turn ends.
+
+    Tracing: each run opens a root span (parented to `trace_parent` when a
+    coordinator sets it), each Responses API call a "responses.create" span
+    with one child per output item, and each local function a "tool.<name>"
+    span.  See tracing.py.
+
+    Conversations: with `conversation` set, a run continues the chain of the
+    conversation's last completed run and, if it completes, becomes the new
+    end of the chain.  See conversation.py.
+    """
+
+    _span_name = "agent.run"
+
+    def __init__(self, stream: bool, budget: Budget | None = None,
+                 resilience: Resilience | None = None, conversation: "Conversation | None" = None):
+        self.stream = stream
+        self.budget = budget or DEFAULT_BUDGET
+        self.resilience = resilience or get_resilience()
+        self.conversation = conversation
+        self.methodology: tuple | None = None  # fixed sections instead of per-query ones
+        self.sections: tuple | None = None     # sent in this run; None = full SYSTEM_PROMPT
+        self.plan: dict | None = None
+        self._shown_plan: dict | None = None  # the plan as consumers have it from our events
+        self.response_id: str | None = None
+        self._resumed_from: str | None = None
+        self.ttft: float | None = None
+        self.usage = Usage()
+        self.budget_exceeded: str | None = None
+        self._started: float = 0.0
+        self.tracer = get_tracer()
+        self.trace_parent: Span | None = None
+        self._run_span: Span | None = None
+        self._turn_span: Span | None = None
+        self._item_spans: dict = {}
+
+    def _start_run(self, user_query: str) -> list:
+        """Reset per-run state and return the first turn's input."""
+        self.plan = None
+        self._shown_plan = None
+        self.response_id = self.conversation.response_id if self.conversation else None
+        self._resumed_from = self.response_id
+        self.ttft = None
+        self.usage = Usage()
+        self.budget_exceeded = None
+        self._started = time.perf_counter()
+        query_class, self.sections = classify_query(user_query) if MODULAR_PROMPT else (None, None)
+        if MODULAR_PROMPT and self.methodology is not None:
+            self.sections = self.methodology
+        self._run_span = self.tracer.start(
+            self._span_name, parent=self.trace_parent, model=MODEL, query_chars=len(user_query),
+            resumed=self._resumed_from is not None, query_class=query_class,
+            methodology=",".join(self.sections) if self.sections is not None else "all",
+            prompt_tokens_saved=tokens_saved(self.sections) if self.sections is not None else 0,
+        )
+        return self._first_input(user_query)
+
+    def _first_input(self, user_query: str, sections: tuple | None = None) -> list:
+        if self.response_id:
+            # Follow-up: the system prompt and earlier turns are already in the stored chain
+            return [{"role": "user", "content": user_query}]
+        # New chain — system prompt (+ methodology), the conversation so far, then the user message
+        history = self.conversation.history if self.conversation else []
+        return [
+            *system_messages(self.sections if sections is None else sections),
+            *history,
+            {"role": "user", "content": user_query},
+        ]
+
+    def _resume_expired(self, error: Exception, previous_id: str | None) -> bool:
+        """
+        True if `error` is the provider rejecting the resumed response id
+        (expired or deleted).  The run then starts a new chain instead.
+        """
+        if previous_id is None or previous_id != self._resumed_from:
+            return False
+        if not isinstance(error, NotFoundError) and not (
+            isinstance(error, BadRequestError) and "previous_response" in str(error)
+        ):
+            return False
+        self._end_turn(error=str(error))
+        self.response_id = self._resumed_from = None
+        if self.conversation is not None:
+            self.conversation.response_id = None
+        return True
+
+    def _request_kwargs(self, input_messages: list) -> dict:
+        kwargs = {
+            "model": MODEL,
+            "tools": ALL_TOOLS,
+            "input": input_messages,
+        }
+        # Continue stateful conversation if we have a previous response
+        if self.response_id:
+            kwargs["previous_response_id"] = self.response_id
+        # Over budget: one last turn to write the answer, no more research
+        # (tools stay in the request: they are part of the cached prefix)
+        if self.budget_exceeded:
+            kwargs["tool_choice"] = "none"
+        return cache_routing(kwargs)
+
+    def _record_usage(self, response):
+        """Add a completed response's token usage and server-side tool calls."""
+        self.usage.add(Usage.from_response(response))
+
+    def _check_budget(self, input_messages: list) -> bool:
+        """
+        After a turn's tools ran: if the query is over budget, append the
+        wrap-up instruction to the next input and return True.
+        """
+        if self.budget_exceeded is None:
+            self.budget_exceeded = self.budget.exceeded(self.usage, time.perf_counter() - self._started)
+        if self.budget_exceeded is None:
+            return False
+        input_messages.append({"role": "user", "content": BUDGET_WRAP_UP_PROMPT})
+        return True
+
+    def _done(self, iterations: int, error: str | None = None) -> "Done":
+        if self.conversation is not None and error is None:
+            # The next run in this conversation continues from here
+            self.conversation.response_id = self.response_id
+        if self._run_span is not None:
+            self._run_span.end(
+                iterations=iterations, error=error, ttft=self.ttft,
+                tokens=self.usage.total_tokens, cost=round(self.usage.cost, 6),
+                budget_exceeded=self.budget_exceeded,
+            )
+        return Done(iterations=iterations, plan=self.plan, ttft=self.ttft, error=error,
+                    usage=self.usage, budget_exceeded=self.budget_exceeded)
+
+    # ── tracing ─────────────────────────────────────────────
+
+    def _start_turn(self, kwargs: dict, **attributes):
+        """Open the span for one Responses API call."""
+        self._item_spans = {}
+        self._turn_span = self.tracer.start(
+            "responses.create", parent=self._run_span, stream=self.stream,
+            input_items=len(kwargs["input"]) if isinstance(kwargs["input"], list) else 1,
+            input_bytes=len(json.dumps(kwargs["input"], default=str)),
+            **attributes,
+        )
+
+    def _end_turn(self, error: str | None = None):
+        span, self._turn_span = self._turn_span, None
+        if span is None:
+            return
+        for item_span in self._item_spans.values():
+            item_span.end(incomplete=True)
+        turn = self.usage.turns[-1] if self.usage.turns and error is None else None
+        span.end(
+            error=error, response_id=self.response_id,
+            input_tokens=turn.input_tokens if turn else None,
+            cached_tokens=turn.cached_tokens if turn else None,
+            cached_ratio=round(turn.cached_ratio, 3) if turn else None,
+            output_tokens=turn.output_tokens if turn else None,
+        )
+
+    def _retry(self, error: Exception, attempt: int, emitted: int) -> "Retrying | None":
+        """Retrying event for a failed turn, or None to give up (not retryable / out of attempts)."""
+        self._end_turn(error=str(error))
+        delay = self.resilience.backoff(error, attempt)
+        if delay is None:
+            return None
+        return Retrying(attempt=attempt + 1, delay=round(delay, 2), error=str(error),
+                        discard_chars=emitted)
+
+    def _end_cancelled(self):
+        self._end_turn(error="cancelled")
+        if self._run_span is not None:
+            self._run_span.end(cancelled=True)
+
+    def _mark_first_event(self):
+        if self._turn_span is not None and "first_event_ms" not in self._turn_span.attributes:
+            self._turn_span.set(first_event_ms=round(self._turn_span.duration * 1000, 1))
+
+    @staticmethod
+    def _item_size(item) -> int:
+        """Characters of model output carried by an output item."""
+        if item.type == "function_call":
+            return len(item.arguments or "")
+        if item.type == "message":
+            return sum(len(getattr(part, "text", "") or "") for part in getattr(item, "content", []))
+        return 0
+
+    def _trace_item(self, item):
+        """Span for an item of a non-streamed response (arrives whole: no duration)."""
+        self.tracer.start(item.type, parent=self._turn_span).end(chars=self._item_size(item))
+
+    def _traced_call(self, name: str, arguments: str, submitted: float) -> str:
+        """execute_function inside a "tool.<name>" span (runs on a worker thread)."""
+        span = self.tracer.start(
+            f"tool.{name}", parent=self._run_span, args_bytes=len(arguments or ""),
+            queued_ms=round((time.perf_counter() - submitted) * 1000, 1),
+            timeout_s=tool_timeout(name),
+        )
+        try:
+            result = execute_function(name, arguments)
+        except Exception as e:
+            span.end(error=str(e))
+            raise
+        try:
+            error = json.loads(result).get("error")
+        except (json.JSONDecodeError, AttributeError):
+            error = None
+        span.end(result_bytes=len(result), error=error)
+        return result
+
+    def _parse_item(self, item, calls: list) -> list:
+        """Events for one output item of a completed (non-streamed) response."""
+        item_type = item.type
+        self._trace_item(item)
+
+        # --- Built-in: web search executed server-side ---
+        if item_type == "web_search_call":
+            return [ToolCall(name="web_search", description="Searching the web...")]
+
+        # --- Built-in: code interpreter executed server-side ---
+        if item_type == "code_interpreter_call":
+            return [ToolCall(name="code_execution", description="Executing Python code...")]
+
+        # --- Custom function call (update_plan) ---
+        if item_type == "function_call":
+            self._mark_first_token()
+            return self._function_call_events(item, calls)
+
+        # --- Text message from the model ---
+        events = []
+        if item_type == "message":
+            for content_part in getattr(item, "content", []):
+                if getattr(content_part, "type", "") == "output_text":
+                    self._mark_first_token()
+                    events.append(TextDelta(content_part.text))
+        return events
+
+    def _parse_stream_event(self, event, pending_calls: dict, calls: list) -> list:
+        """
+        Events for one Responses API stream event.
+        `pending_calls` maps item_id → function call still being streamed.
+        """
+        event_type = event.type
+        self._mark_first_event()
+
+        if event_type in ("response.created", "response.completed"):
+            self.response_id = event.response.id
+            if event_type == "response.completed":
+                self._record_usage(event.response)
+
+        elif event_type == "response.output_item.added":
+            item = event.item
+            self._item_spans[item.id] = self.tracer.start(item.type, parent=self._turn_span)
+            if item.type == "web_search_call":
+                return [ToolCall(name="web_search", description="Searching the web...")]
+            if item.type == "code_interpreter_call":
+                return [ToolCall(name="code_execution", description="Executing Python code...")]
+            if item.type == "function_call":
+                pending_calls[item.id] = {"name": item.name, "arguments": "", "steps": None}
+
+        elif event_type == "response.output_text.delta":
+            self._mark_first_token()
+            return [TextDelta(event.delta)]
+
+        # --- Partial arguments: surface the plan while it is being written ---
+        elif event_type == "response.function_call_arguments.delta":
+            self._mark_first_token()
+            call = pending_calls.get(event.item_id)
+            if call is None:
+                return []
+            call["arguments"] += event.delta
+            if call["name"] == "update_plan":
+                return self._partial_plan_events(call)
+
+        elif event_type == "response.output_item.done":
+            item_span = self._item_spans.pop(event.item.id, None)
+            if item_span is not None:
+                item_span.end(chars=self._item_size(event.item))
+            if event.item.type == "function_call":
+                pending_calls.pop(event.item.id, None)
+                return self._function_call_events(event.item, calls)
+
+        elif event_type == "response.failed":
+            error = getattr(event.response, "error", None)
+            raise RuntimeError(getattr(error, "message", None) or "Response failed")
+
+        elif event_type == "error":
+            raise RuntimeError(getattr(event, "message", None) or "Stream error")
+
+        return []
+
+    def _partial_plan_events(self, call: dict) -> list:
+        """Plan event for streamed update_plan arguments, if new steps have settled."""
+        partial = parse_partial_json(call["arguments"])
+        if not isinstance(partial, dict) or not isinstance(partial.get("steps"), list):
+            return []
+
+        # Only surface steps whose status has fully arrived
+        steps = [
+            step for step in partial["steps"]
+            if isinstance(step, dict) and step.get("status") in STEP_STATUSES
+        ]
+        if not steps or steps == call["steps"]:
+            return []
+
+        call["steps"] = steps
+        # Steps not streamed yet keep their current state rather than showing as removed
+        shown = self._shown_plan["steps"] if self._shown_plan else []
+        return self._plan_events({
+            "task_summary": partial.get("task_summary", ""),
+            "steps": steps + shown[len(steps):],
+            "is_complete": partial.get("is_complete", False),
+        })
+
+    def _plan_events(self, plan: dict) -> list:
+        """The plan as a PlanUpdate or PlanDelta against what was last shown (none if unchanged)."""
+        if not PLAN_DELTAS:
+            return [_plan_snapshot(plan)]
+        event = diff_plan(self._shown_plan, plan)
+        if event is None:
+            return []
+        self._shown_plan = apply_plan_event(self._shown_plan, event)
+        return [event]
+
+    def _function_call_events(self, item, calls: list) -> list:
+        """Events for a completed custom function call; queues it for execution."""
+        name = item.name
+        arguments = item.arguments
+
+        try:
+            args_dict = json.loads(arguments)
+        except json.JSONDecodeError:
+            args_dict = {}
+
+        events = [ToolCall(name=name, description=args_dict.get("task_summary", ""))]
+
+        # Track plan state
+        if name == "update_plan":
+            self.plan = args_dict
+            events += self._plan_events(args_dict)
+
+        calls.append((name, arguments, item.call_id))
+        return events
+
+    @staticmethod
+    def _timeout_output(name: str) -> str:
+        return json.dumps({"error": f"{name} timed out after {tool_timeout(name):g}s"})
+
+    @staticmethod
+    def _result_event(name: str, call_id: str, result: str, seconds: float) -> ToolResult:
+        try:
+            error = json.loads(result).get("error")
+        except (json.JSONDecodeError, AttributeError):
+            error = None
+        return ToolResult(name=name, call_id=call_id, seconds=round(seconds, 3), error=error)
+
+    @staticmethod
+    def _function_call_output(call_id: str, result: str) -> dict:
+        return {
+            "type": "function_call_output",
+            "call_id": call_id,
+            "output": result,
+        }
+
+    def _mark_first_token(self):
+        """Record time-to-first-token the first time output arrives in a run."""
+        if self.ttft is None:
+            self.ttft = time.perf_counter() - self._started
 
 
 # ═══════════════════════════════════════════════════════════════
 # AGENT
 # ═══════════════════════════════════════════════════════════════
 
+# Shared by every TradvisorAgent in the process (sub-agents included)
+_tool_pool = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="tool")
+QUEUE_POLL = 0.05  # seconds between checks for queued calls that have started
 
-class TradvisorAgent:
+
+class TradvisorAgent(_AgentCore):
     """
     Agentic loop using the Responses API.
 
     Built-in tools (web_search, code_interpreter) execute automatically on
     Grok's servers.  Only custom function calls (update_plan) return to us
     for handling, creating the Cursor-style plan-update loop.
+
+    With stream=True each turn is read from the Responses API event stream,
+    so text deltas, tool calls and partial plan updates reach the UI while
+    Grok is still generating.  Time-to-first-token is recorded in self.ttft
+    and reported on the Done event.
+
+    Token usage is summed per turn into self.usage (reported on Done.usage).
+    Once a turn pushes the query over `budget`, the next turn gets the tool
+    results plus a wrap-up instruction with tools disabled, and the run ends
+    after it with Done.budget_exceeded set.
     """
 
-    def __init__(self):
-        self.client = OpenAI(
-            api_key=XAI_API_KEY,
-            base_url=BASE_URL,
-        )
-        self.plan: dict | None = None
-        self.response_id: str | None = None
+    def __init__(self, stream: bool = STREAM, client: OpenAI | None = None,
+                 budget: Budget | None = None, resilience: Resilience | None = None,
+                 conversation: "Conversation | None" = None):
+        super().__init__(stream, budget, resilience, conversation)
+        # Shared pooled client by default, so queries reuse warm connections
+        self.client = client or get_client()
 
     # ── public ──────────────────────────────────────────────
 
@@ -89,99 +745,323 @@ class TradvisorAgent:
         Run the full agentic loop for a user query.
         Yields events as the agent works.
         """
-        self.plan = None
-        self.response_id = None
-
-        # First call — full input with system + user message
-        input_messages = [
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": user_query},
-        ]
+        input_messages = self._start_run(user_query)
 
         for iteration in range(1, MAX_ITERATIONS + 1):
-            # ── Call the Responses API ──────────────────────
-            try:
-                kwargs = {
-                    "model": MODEL,
-                    "tools": ALL_TOOLS,
-                    "input": input_messages,
-                }
-                # Continue stateful conversation if we have a previous response
-                if self.response_id:
-                    kwargs["previous_response_id"] = self.response_id
-
-                response = self.client.responses.create(**kwargs)
-                self.response_id = response.id
+            calls = []
 
+            # ── Call the Responses API and parse its output ─
+            try:
+                yield from self._turn(input_messages, iteration, calls)
             except Exception as e:
                 yield TextDelta(f"\n\nAPI Error: {e}")
-                yield Done(iterations=iteration, plan=self.plan)
+                yield self._done(iteration, error=str(e))
                 return
 
-            # ── Parse output items ──────────────────────────
-            function_call_outputs = []
-
-            for item in response.output:
-                item_type = item.type
-
-                # --- Built-in: web search executed server-side ---
-                if item_type == "web_search_call":
-                    yield ToolCall(name="web_search", description="Searching the web...")
-
-                # --- Built-in: code interpreter executed server-side ---
-                elif item_type == "code_interpreter_call":
-                    yield ToolCall(name="code_execution", description="Executing Python code...")
-
-                # --- Custom function call (update_plan) ---
-                elif item_type == "function_call":
-                    name = item.name
-                    arguments = item.arguments
-                    call_id = item.call_id
-
-                    try:
-                        args_dict = json.loads(arguments)
-                    except json.JSONDecodeError:
-                        args_dict = {}
-
-                    yield ToolCall(name=name, description=args_dict.get("task_summary", ""))
-
-                    # Track plan state
-                    if name == "update_plan":
-                        self.plan = args_dict
-                        yield PlanUpdate(
-                            task_summary=args_dict.get("task_summary", ""),
-                            steps=args_dict.get("steps", []),
-                            is_complete=args_dict.get("is_complete", False),
-                        )
-
-                    # Execute the custom function
-                    result = execute_function(name, arguments)
-
-                    # Queue the result to send back
-                    function_call_outputs.append({
-                        "type": "function_call_output",
-                        "call_id": call_id,
-                        "output": result,
-                    })
-
-                # --- Text message from the model ---
-                elif item_type == "message":
-                    for content_part in getattr(item, "content", []):
-                        if getattr(content_part, "type", "") == "output_text":
-                            yield TextDelta(content_part.text)
-
             # ── Decide whether to continue ──────────────────
-            if not function_call_outputs:
-                # No custom function calls → model is done
-                yield Done(iterations=iteration, plan=self.plan)
+            if not calls or self.budget_exceeded:
+                # No custom function calls → model is done (or this was the wrap-up turn)
+                yield self._done(iteration)
                 return
 
-            # Send function results back and continue the loop
-            input_messages = function_call_outputs
+            # Execute custom functions concurrently and send results back
+            input_messages = yield from self._execute_calls(calls)
+            self._check_budget(input_messages)
 
         # Max iterations
         yield TextDelta("\n\n(Reached maximum iterations.)")
-        yield Done(iterations=MAX_ITERATIONS, plan=self.plan)
+        yield self._done(MAX_ITERATIONS, error="Reached maximum iterations")
+
+    def _turn(self, input_messages: list, iteration: int, calls: list) -> Generator:
+        """
+        One model turn, retried on transient failures.  A retry resumes from
+        the last completed turn's response id and yields Retrying first;
+        the error is raised once retries are exhausted.
+        """
+        last_good = self.response_id
+        for attempt in range(self.resilience.max_attempts + 1):
+            self.response_id = last_good
+            calls.clear()
+            emitted = 0
+            kwargs = self._request_kwargs(input_messages)
+            self._start_turn(kwargs, iteration=iteration, attempt=attempt)
+            started = time.perf_counter()
+            try:
+                if self.stream:
+                    with self.resilience.breaker.guard():
+                        pending_calls = {}
+                        for event in self.client.responses.create(**kwargs, stream=True):
+                            for agent_event in self._parse_stream_event(event, pending_calls, calls):
+                                if isinstance(agent_event, TextDelta):
+                                    emitted += len(agent_event.content)
+                                yield agent_event
+                        self.resilience.record_success()
+                else:
+                    response = self.resilience.call(lambda: self.client.responses.create(**kwargs))
+                    self.resilience.record_success(time.perf_counter() - started)
+                    self._mark_first_event()
+                    self.response_id = response.id
+                    self._record_usage(response)
+                    for item in response.output:
+                        yield from self._parse_item(item, calls)
+            except Exception as e:
+                if self._resume_expired(e, last_good):
+                    input_messages[:] = self._first_input(input_messages[-1]["content"])
+                    yield from self._turn(input_messages, iteration, calls)
+                    return
+                retry = self._retry(e, attempt, emitted)
+                if retry is None:
+                    raise
+                yield retry
+                time.sleep(retry.delay)
+                continue
+            self._end_turn()
+            return
+
+    def _execute_calls(self, calls: list) -> Generator:
+        """
+        Run a turn's function calls concurrently on the shared pool.
+        Yields a ToolResult as each finishes; returns the function_call_output
+        items in call order.  A call past its timeout is reported as an error
+        (its thread is left to finish in the background).
+        """
+        started = time.perf_counter()
+        results = {}
+        # The pool is shared with every other agent (fan-out sub-agents
+        # included), so a call may wait for a worker; its timeout runs from
+        # when it starts, not from when it was queued
+        begun = {}
+
+        def run(name: str, arguments: str, call_id: str) -> str:
+            begun[call_id] = time.perf_counter()
+            return self._traced_call(name, arguments, started)
+
+        futures = {
+            _tool_pool.submit(run, name, arguments, call_id): (name, call_id)
+            for name, arguments, call_id in calls
+        }
+
+        def deadline(future) -> float | None:
+            name, call_id = futures[future]
+            return begun[call_id] + tool_timeout(name) if call_id in begun else None
+
+        pending = set(futures)
+        while pending:
+            deadlines = [d for d in map(deadline, pending) if d is not None]
+            wake = min(deadlines, default=None)
+            if len(deadlines) < len(pending):
+                # Queued calls have no deadline yet; look again soon for when they start
+                wake = min(wake or float("inf"), time.perf_counter() + QUEUE_POLL)
+            timeout = None if wake is None else max(0.0, wake - time.perf_counter())
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, call_id = futures[future]
+                try:
+                    results[call_id] = future.result()
+                except Exception as e:
+                    results[call_id] = json.dumps({"error": f"{name} failed: {e}"})
+                yield self._result_event(name, call_id, results[call_id], time.perf_counter() - started)
+
+            now = time.perf_counter()
+            for future in [f for f in pending if (deadline(f) or float("inf")) <= now]:
+                pending.discard(future)
+                future.cancel()
+                name, call_id = futures[future]
+                results[call_id] = self._timeout_output(name)
+                yield self._result_event(name, call_id, results[call_id], now - started)
+
+        return [self._function_call_output(call_id, results[call_id]) for _, _, call_id in calls]
+
+
+class AsyncTradvisorAgent(_AgentCore):
+    """
+    asyncio-native version of TradvisorAgent for serving many chats per process.
+
+    run() is an async generator yielding the same PlanUpdate / PlanDelta /
+    ToolCall / TextDelta / Done events.  Concurrent runs on one event loop are
+    capped by a shared semaphore (MAX_CONCURRENT_RUNS); extra runs wait for a
+    free slot.
+
+    Cancellation: when the consumer stops iterating (aclose()), the task is
+    cancelled, or cancel() is called (e.g. on client disconnect), the open
+    stream is closed and the slot released without waiting for Grok to finish.
+    A cancel() before run() cancels that run before it starts.
+    """
+
+    # One semaphore per event loop: a semaphore is bound to the loop it is
+    # first used on, and a process may run several (asyncio.run() per test)
+    _slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+        weakref.WeakKeyDictionary()
+    )
+
+    def __init__(self, stream: bool = STREAM, client: AsyncOpenAI | None = None,
+                 budget: Budget | None = None, resilience: Resilience | None = None,
+                 conversation: "Conversation | None" = None):
+        super().__init__(stream, budget, resilience, conversation)
+        # Resolved in run(): the shared async client belongs to the running loop
+        self.client = client
+        self._cancelled = asyncio.Event()
+
+    @classmethod
+    def _concurrency_slots(cls) -> asyncio.Semaphore:
+        """Semaphore limiting concurrent runs on the running event loop."""
+        loop = asyncio.get_running_loop()
+        slots = AsyncTradvisorAgent._slots.get(loop)
+        if slots is None:
+            slots = AsyncTradvisorAgent._slots[loop] = asyncio.Semaphore(MAX_CONCURRENT_RUNS)
+        return slots
+
+    # ── public ──────────────────────────────────────────────
+
+    def cancel(self):
+        """Stop the current run at the next event (e.g. the client disconnected)."""
+        self._cancelled.set()
+
+    async def run(self, user_query: str) -> AsyncGenerator:
+        """
+        Run the full agentic loop for a user query.
+        Yields events as the agent works.
+        """
+        if self._cancelled.is_set():
+            # cancel() came before the run started: this is the run it cancels
+            self._cancelled.clear()
+            return
+        events = self._run(user_query)
+        try:
+            async for event in events:
+                yield event
+        finally:
+            await events.aclose()
+            self._cancelled.clear()  # the next run starts uncancelled
+
+    async def _run(self, user_query: str) -> AsyncGenerator:
+        if self.client is None:
+            self.client = get_async_client()
+
+        async with self._concurrency_slots():
+            input_messages = self._start_run(user_query)
+
+            for iteration in range(1, MAX_ITERATIONS + 1):
+                calls = []
+
+                # ── Call the Responses API and parse its output ─
+                try:
+                    async for agent_event in self._turn(input_messages, iteration, calls):
+                        yield agent_event
+                except Exception as e:
+                    yield TextDelta(f"\n\nAPI Error: {e}")
+                    yield self._done(iteration, error=str(e))
+                    return
+
+                if self._cancelled.is_set():
+                    self._end_cancelled()
+                    return
+
+                # ── Decide whether to continue ──────────────────
+                if not calls or self.budget_exceeded:
+                    # No custom function calls → model is done (or this was the wrap-up turn)
+                    yield self._done(iteration)
+                    return
+
+                # Execute custom functions concurrently off the event loop
+                results = {}
+                async for result_event in self._execute_calls(calls, results):
+                    yield result_event
+                input_messages = [
+                    self._function_call_output(call_id, results[call_id])
+                    for _, _, call_id in calls
+                ]
+                self._check_budget(input_messages)
+
+            # Max iterations
+            yield TextDelta("\n\n(Reached maximum iterations.)")
+            yield self._done(MAX_ITERATIONS, error="Reached maximum iterations")
+
+    async def _turn(self, input_messages: list, iteration: int, calls: list) -> AsyncGenerator:
+        """Async version of TradvisorAgent._turn; returns early if the run is cancelled."""
+        last_good = self.response_id
+        for attempt in range(self.resilience.max_attempts + 1):
+            self.response_id = last_good
+            calls.clear()
+            emitted = 0
+            kwargs = self._request_kwargs(input_messages)
+            self._start_turn(kwargs, iteration=iteration, attempt=attempt)
+            started = time.perf_counter()
+            try:
+                if self.stream:
+                    with self.resilience.breaker.guard():
+                        pending_calls = {}
+                        stream = await self.client.responses.create(**kwargs, stream=True)
+                        async with stream:
+                            async for event in stream:
+                                if self._cancelled.is_set():
+                                    return
+                                for agent_event in self._parse_stream_event(event, pending_calls, calls):
+                                    if isinstance(agent_event, TextDelta):
+                                        emitted += len(agent_event.content)
+                                    yield agent_event
+                        self.resilience.record_success()
+                else:
+                    response = await self.resilience.acall(lambda: self.client.responses.create(**kwargs))
+                    self.resilience.record_success(time.perf_counter() - started)
+                    self._mark_first_event()
+                    self.response_id = response.id
+                    self._record_usage(response)
+                    for item in response.output:
+                        for agent_event in self._parse_item(item, calls):
+                            yield agent_event
+            except Exception as e:
+                if self._resume_expired(e, last_good):
+                    input_messages[:] = self._first_input(input_messages[-1]["content"])
+                    async for agent_event in self._turn(input_messages, iteration, calls):
+                        yield agent_event
+                    return
+                retry = self._retry(e, attempt, emitted)
+                if retry is None:
+                    raise
+                yield retry
+                await asyncio.sleep(retry.delay)
+                continue
+            self._end_turn()
+            return
+
+    async def _execute_calls(self, calls: list, results: dict) -> AsyncGenerator:
+        """
+        Run a turn's function calls as concurrent tasks (each in a worker
+        thread, with its own timeout).  Fills `results` {call_id: output} and
+        yields a ToolResult as each finishes.
+        """
+        started = time.perf_counter()
+
+        loop = asyncio.get_running_loop()
+
+        async def call(name: str, arguments: str, call_id: str):
+            begun = asyncio.Event()
+
+            def run() -> str:
+                loop.call_soon_threadsafe(begun.set)
+                return self._traced_call(name, arguments, started)
+
+            # The default executor is shared by every run on the loop: the
+            # timeout covers running the call, not waiting for a free thread
+            task = asyncio.ensure_future(asyncio.to_thread(run))
+            waiter = asyncio.ensure_future(begun.wait())
+            try:
+                await asyncio.wait({task, waiter}, return_when=asyncio.FIRST_COMPLETED)
+                result = await asyncio.wait_for(task, tool_timeout(name))
+            except asyncio.TimeoutError:
+                result = self._timeout_output(name)
+            except Exception as e:
+                result = json.dumps({"error": f"{name} failed: {e}"})
+            finally:
+                waiter.cancel()
+                task.cancel()  # no-op once it has finished
+            return name, call_id, result
+
+        for finished in asyncio.as_completed([call(*c) for c in calls]):
+            name, call_id, result = await finished
+            results[call_id] = result
+            yield self._result_event(name, call_id, result, time.perf_counter() - started)
 
 
 def run_agent(query: str) -> Generator:
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-query OpenAI client vs. the shared pooled client.
+
+Runs the same single-turn query N times against a local mock Responses API
+that charges a delay on every new connection (standing in for TCP + TLS).
+
+    python benchmarks/bench_client_pool.py --queries 50 --handshake-ms 40
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mock_server import MockResponsesServer
+
+
+def run_queries(make_agent, queries: int) -> list[float]:
+    """Latency (seconds) of each query, each through a fresh agent like demo.run_query."""
+    latencies = []
+    for _ in range(queries):
+        start = time.perf_counter()
+        for _event in make_agent().run("What is AAPL's PE?"):
+            pass
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def summarize(label: str, latencies: list[float], connections: int):
+    ordered = sorted(latencies)
+    p95 = ordered[max(0, int(len(ordered) * 0.95) - 1)]
+    print(
+        f"{label:<20} mean {statistics.mean(latencies) * 1000:7.1f} ms   "
+        f"p50 {statistics.median(latencies) * 1000:7.1f} ms   "
+        f"p95 {p95 * 1000:7.1f} ms   connections {connections}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--handshake-ms", type=float, default=40)
+    parser.add_argument("--latency-ms", type=float, default=5)
+    args = parser.parse_args()
+
+    with MockResponsesServer(latency_ms=args.latency_ms, handshake_ms=args.handshake_ms) as server:
+        # config.py reads these at import time
+        os.environ["XAI_API_KEY"] = os.environ.get("XAI_API_KEY") or "bench"
+        os.environ["BASE_URL"] = server.base_url
+
+        from openai import OpenAI
+        from agent import TradvisorAgent
+        from config import XAI_API_KEY
+
+        def per_query_agent():
+            # Previous behaviour: a brand-new client (and pool) per query
+            client = OpenAI(api_key=XAI_API_KEY, base_url=server.base_url)
+            return TradvisorAgent(stream=False, client=client)
+
+        def shared_agent():
+            return TradvisorAgent(stream=False)
+
+        print(f"{args.queries} queries, {args.handshake_ms:.0f} ms simulated handshake, "
+              f"{args.latency_ms:.0f} ms server latency\n")
+
+        before = server.connections
+        per_query = run_queries(per_query_agent, args.queries)
+        summarize("per-query client", per_query, server.connections - before)
+
+        before = server.connections
+        shared = run_queries(shared_agent, args.queries)
+        summarize("shared client", shared, server.connections - before)
+
+        saved = statistics.mean(per_query) - statistics.mean(shared)
+        print(f"\nSaved per query: {saved * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
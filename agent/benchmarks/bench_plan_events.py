@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark: plan event payload and terminal rendering, full snapshots vs deltas.
+
+Feeds a scripted run through the agent's stream parser: one update_plan call
+per step (mark it completed with a result, start the next), each streamed as
+small argument fragments the way the Responses API sends them.  No model or
+server is involved.  Compares PLAN_DELTAS off (a PlanUpdate snapshot per
+change, a new table printed per snapshot, as the demo used to) with deltas
+rendered in place by the demo's PlanView.
+
+    python benchmarks/bench_plan_events.py --steps 12 --chunk 16
+"""
+
+import argparse
+import dataclasses
+import io
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def plan_calls(steps: int) -> list[str]:
+    """update_plan arguments for each call of a run with `steps` steps."""
+    plan = [
+        {"id": i, "description": f"Step {i}: gather and check the figures for part {i} of the analysis",
+         "status": "pending"}
+        for i in range(1, steps + 1)
+    ]
+    calls = []
+    for current in range(steps + 1):
+        if current:
+            plan[current - 1]["status"] = "completed"
+            plan[current - 1]["result"] = f"Done: figures for part {current} look consistent with filings"
+        if current < steps:
+            plan[current]["status"] = "in_progress"
+        calls.append(json.dumps({
+            "task_summary": "Full valuation with DCF, PE cross-check and moat review",
+            "steps": plan,
+            "is_complete": current == steps,
+        }))
+    return calls
+
+
+def stream_events(arguments: str, call: int, chunk: int) -> list:
+    """Responses API stream events for one streamed update_plan call."""
+    item_id = f"fc_{call}"
+    item = SimpleNamespace(type="function_call", id=item_id, name="update_plan",
+                           arguments=arguments, call_id=f"call_{call}")
+    events = [SimpleNamespace(type="response.output_item.added", item=item)]
+    events += [
+        SimpleNamespace(type="response.function_call_arguments.delta", item_id=item_id,
+                        delta=arguments[i:i + chunk])
+        for i in range(0, len(arguments), chunk)
+    ]
+    events.append(SimpleNamespace(type="response.output_item.done", item=item))
+    return events
+
+
+def plan_events(steps: int, chunk: int) -> list:
+    """PlanUpdate / PlanDelta events the agent yields for the scripted run."""
+    from agent import PlanDelta, PlanUpdate, TradvisorAgent
+
+    agent = TradvisorAgent(stream=True)
+    agent._start_run("Analyze NVDA")
+    events = []
+    for call, arguments in enumerate(plan_calls(steps)):
+        pending_calls = {}
+        for event in stream_events(arguments, call, chunk):
+            events += [
+                e for e in agent._parse_stream_event(event, pending_calls, [])
+                if isinstance(e, (PlanUpdate, PlanDelta))
+            ]
+    return events
+
+
+def payload_bytes(events: list) -> int:
+    """Size of the events as JSON, as a web relay would send them."""
+    return sum(len(json.dumps({"type": type(e).__name__, **dataclasses.asdict(e)})) for e in events)
+
+
+def render(events: list, live: bool, interval: float) -> tuple[float, int]:
+    """CPU seconds and terminal bytes to show the events; `interval` between events."""
+    import demo
+    from agent import apply_plan_event
+    from rich.console import Console
+
+    out = io.StringIO()
+    demo.console = Console(file=out, force_terminal=True, width=120)
+    view = demo.PlanView() if live else None
+    plan = None
+
+    started = time.process_time()
+    for event in events:
+        if live:
+            view.update(event)
+        else:
+            plan = apply_plan_event(plan, event)
+            demo.console.print()
+            demo.console.print(demo.plan_table(plan))
+        time.sleep(interval)
+    if live:
+        view.stop()
+    return time.process_time() - started, len(out.getvalue().encode())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--steps", type=int, default=12, help="Plan steps (one update_plan call per step)")
+    parser.add_argument("--chunk", type=int, default=16, help="Characters per streamed argument fragment")
+    parser.add_argument("--interval-ms", type=float, default=2,
+                        help="Time between plan events (stands in for token arrival)")
+    args = parser.parse_args()
+
+    # config.py reads these at import time
+    os.environ["XAI_API_KEY"] = os.environ.get("XAI_API_KEY") or "bench"
+
+    import agent
+
+    results = {}
+    for label, deltas in (("snapshots", False), ("deltas", True)):
+        agent.PLAN_DELTAS = deltas
+        events = plan_events(args.steps, args.chunk)
+        cpu, written = render(events, live=deltas, interval=args.interval_ms / 1000)
+        results[label] = (len(events), payload_bytes(events), cpu, written)
+
+    print(f"{args.steps} steps, {args.steps + 1} update_plan calls streamed in "
+          f"{args.chunk}-character fragments\n")
+    print(f"{'':<10} {'events':>6} {'payload':>10} {'render cpu':>11} {'terminal':>10}")
+    for label, (count, size, cpu, written) in results.items():
+        print(f"{label:<10} {count:6d} {size / 1024:8.1f}KB {cpu * 1000:9.1f}ms {written / 1024:8.1f}KB")
+
+    (_, base_size, base_cpu, base_written), (_, size, cpu, written) = results.values()
+    print(f"\nPayload {1 - size / base_size:.0%} smaller, rendering {1 - cpu / base_cpu:.0%} less CPU, "
+          f"{1 - written / base_written:.0%} less terminal output")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cached-token ratio, input cost and latency with and without the prompt cache key.
+
+Runs the same mix of queries (single-stock questions plus "Compare X vs Y"
+fan-outs) against a local mock Responses API that simulates a provider's
+prompt cache spread over several replicas, and charges prefill time for
+every uncached input token.
+
+    python benchmarks/bench_prompt_cache.py --queries 100 --replicas 16
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mock_server import MockResponsesServer
+
+TICKERS = ["AAPL", "MSFT", "NVDA", "GOOGL", "AMZN", "META", "TSLA", "JPM", "V", "KO"]
+TEMPLATES = [
+    "What is {0}'s fair value?",
+    "Analyze {0}",
+    "What are the main risks for {0}?",
+    "Is {0} undervalued right now?",
+]
+
+
+def build_queries(count: int, compare_every: int) -> list[str]:
+    queries = []
+    for i in range(count):
+        ticker = TICKERS[i % len(TICKERS)]
+        if compare_every and i % compare_every == compare_every - 1:
+            queries.append(f"Compare {ticker} vs {TICKERS[(i + 3) % len(TICKERS)]}")
+        else:
+            queries.append(TEMPLATES[i % len(TEMPLATES)].format(ticker))
+    return queries
+
+
+def run_queries(queries: list[str]) -> tuple[list[float], list]:
+    """Latency (seconds) and Done.usage of each query."""
+    from agent import Done
+    from coordinator import CoordinatorAgent
+
+    latencies, usages = [], []
+    for query in queries:
+        start = time.perf_counter()
+        for event in CoordinatorAgent(stream=False).run(query):
+            if isinstance(event, Done):
+                usages.append(event.usage)
+        latencies.append(time.perf_counter() - start)
+    return latencies, usages
+
+
+def summarize(label: str, latencies: list[float], usages: list):
+    from config import PRICE_CACHED_INPUT_PER_M, PRICE_INPUT_PER_M
+
+    turns = [turn for usage in usages for turn in usage.turns]
+    input_tokens = sum(turn.input_tokens for turn in turns)
+    cached = sum(turn.cached_tokens for turn in turns)
+    cost = ((input_tokens - cached) * PRICE_INPUT_PER_M + cached * PRICE_CACHED_INPUT_PER_M) / 1_000_000
+    hits = sum(1 for turn in turns if turn.cached_tokens)
+    ordered = sorted(latencies)
+    p95 = ordered[max(0, int(len(ordered) * 0.95) - 1)]
+    print(
+        f"{label:<14} cached {cached / input_tokens:6.1%}   "
+        f"hits {hits:3d}/{len(turns):<3d}   input ${cost:.4f}   "
+        f"mean {statistics.mean(latencies) * 1000:6.1f} ms   p95 {p95 * 1000:6.1f} ms"
+    )
+    return cost, statistics.mean(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--replicas", type=int, default=16, help="Provider cache replicas")
+    parser.add_argument("--latency-ms", type=float, default=10)
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=20,
+                        help="Latency per 1K uncached input tokens")
+    parser.add_argument("--compare-every", type=int, default=5,
+                        help="Every Nth query is a two-ticker comparison (0 = none)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with MockResponsesServer(latency_ms=args.latency_ms, prompt_cache=True,
+                             cache_replicas=args.replicas, prefill_ms_per_1k=args.prefill_ms_per_1k,
+                             seed=args.seed) as server:
+        # config.py reads these at import time
+        os.environ["XAI_API_KEY"] = os.environ.get("XAI_API_KEY") or "bench"
+        os.environ["BASE_URL"] = server.base_url
+        os.environ["RESPONSE_CACHE"] = "false"  # measure the model calls, not replays
+
+        import agent
+
+        queries = build_queries(args.queries, args.compare_every)
+        print(f"{len(queries)} queries, {args.replicas} cache replicas, "
+              f"{args.prefill_ms_per_1k:.0f} ms prefill per 1K uncached tokens\n")
+
+        cache_key = agent.CACHE_KEY or agent.prompt_cache_key(agent.SYSTEM_PROMPT, agent.ALL_TOOLS)
+        results = {}
+        for label, key in (("no cache key", None), ("cache key", cache_key)):
+            agent.CACHE_KEY = key
+            server.reset_prompt_cache()
+            latencies, usages = run_queries(queries)
+            results[label] = summarize(label, latencies, usages)
+
+        (base_cost, base_latency), (cost, latency) = results["no cache key"], results["cache key"]
+        print(f"\nInput cost {1 - cost / base_cost:.0%} lower, "
+              f"mean latency {(base_latency - latency) * 1000:.1f} ms faster per query "
+              f"(key {cache_key})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark: input tokens and time-to-first-token per query class, full vs modular prompt.
+
+Sends sample queries of each class (methodology.QUERY_CLASSES) through
+TradvisorAgent twice, once with the whole SYSTEM_PROMPT and once with only
+the sections the classifier picks, against a local mock Responses API that
+counts input tokens and charges prefill time per uncached token.  By default
+every query starts cold (no prompt cache); --warm keeps the cache between
+queries.
+
+    python benchmarks/bench_prompt_modules.py --prefill-ms-per-1k 40
+"""
+
+import argparse
+import os
+import statistics
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mock_server import MockResponsesServer
+
+QUERIES = [
+    "What's AAPL's PE?",
+    "What is MSFT's dividend yield?",
+    "How fast is NVDA's revenue growth?",
+    "What are the main risks for TSLA?",
+    "Does KO have a moat?",
+    "Find undervalued tech stocks",
+    "List the cheapest healthcare stocks",
+    "Analyze NVDA",
+    "What is GOOGL's fair value?",
+    "Compare AAPL vs MSFT",
+    "Tell me about AMZN",
+]
+
+
+def run_queries(queries: list[str], server, warm: bool) -> dict:
+    """{query class: [(input_tokens, ttft), ...]}"""
+    from agent import Done, TradvisorAgent
+    from methodology import classify_query
+
+    results = defaultdict(list)
+    for query in queries:
+        if not warm:
+            server.reset_prompt_cache()
+        for event in TradvisorAgent(stream=True).run(query):
+            if isinstance(event, Done):
+                results[classify_query(query)[0]].append((event.usage.input_tokens, event.ttft))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3, help="Runs of the query set")
+    parser.add_argument("--latency-ms", type=float, default=10)
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=40,
+                        help="Latency per 1K uncached input tokens")
+    parser.add_argument("--warm", action="store_true", help="Keep the prompt cache between queries")
+    args = parser.parse_args()
+
+    with MockResponsesServer(latency_ms=args.latency_ms, prompt_cache=True,
+                             prefill_ms_per_1k=args.prefill_ms_per_1k) as server:
+        # config.py reads these at import time
+        os.environ["XAI_API_KEY"] = os.environ.get("XAI_API_KEY") or "bench"
+        os.environ["BASE_URL"] = server.base_url
+
+        import agent
+
+        queries = QUERIES * args.repeat
+        print(f"{len(queries)} queries, {args.prefill_ms_per_1k:.0f} ms prefill per 1K uncached tokens, "
+              f"{'warm' if args.warm else 'cold'} prompt cache\n")
+
+        run_queries(QUERIES[:1], server, args.warm)  # warm up the connection pool
+        agent.MODULAR_PROMPT = False
+        full = run_queries(queries, server, args.warm)
+        agent.MODULAR_PROMPT = True
+        modular = run_queries(queries, server, args.warm)
+
+        print(f"{'class':<11} {'full tokens':>11} {'modular':>8} {'saved':>7}   "
+              f"{'full ttft':>9} {'modular':>8} {'saved':>8}")
+        for name in modular:
+            full_tokens = statistics.mean(tokens for tokens, _ in full[name])
+            tokens = statistics.mean(tokens for tokens, _ in modular[name])
+            full_ttft = statistics.mean(ttft for _, ttft in full[name]) * 1000
+            ttft = statistics.mean(ttft for _, ttft in modular[name]) * 1000
+            print(f"{name:<11} {full_tokens:11.0f} {tokens:8.0f} {full_tokens - tokens:7.0f}   "
+                  f"{full_ttft:7.1f}ms {ttft:6.1f}ms {full_ttft - ttft:6.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
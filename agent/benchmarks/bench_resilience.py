@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark: query success rate and tail latency with and without retries / hedging.
+
+Runs the same single-turn query N times against a local mock Responses API
+that fails, drops or stalls a fraction of requests, once per policy:
+no retries (the old behaviour), retries with backoff, and retries + hedging.
+
+    python benchmarks/bench_resilience.py --queries 200 --fail-rate 0.1 --slow-rate 0.05
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mock_server import MockResponsesServer
+
+
+def run_queries(make_agent, queries: int) -> tuple[list[float], int]:
+    """Latency (seconds) of each query and how many ended on an error."""
+    latencies, failures = [], 0
+    for _ in range(queries):
+        start = time.perf_counter()
+        for event in make_agent().run("What is AAPL's PE?"):
+            if getattr(event, "error", None) and type(event).__name__ == "Done":
+                failures += 1
+        latencies.append(time.perf_counter() - start)
+    return latencies, failures
+
+
+def summarize(label: str, latencies: list[float], failures: int, resilience):
+    ordered = sorted(latencies)
+    p99 = ordered[max(0, int(len(ordered) * 0.99) - 1)]
+    stats = resilience.stats()
+    print(
+        f"{label:<18} success {1 - failures / len(latencies):6.1%}   "
+        f"p50 {statistics.median(latencies) * 1000:7.1f} ms   "
+        f"p99 {p99 * 1000:7.1f} ms   "
+        f"retries {stats['retries']:4d}   hedges {stats['hedges']:3d} ({stats['hedges_won']} won)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--fail-rate", type=float, default=0.1)
+    parser.add_argument("--fail-status", type=int, default=503)
+    parser.add_argument("--drop-rate", type=float, default=0.02)
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--slow-ms", type=float, default=1500)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with MockResponsesServer(latency_ms=args.latency_ms, fail_rate=args.fail_rate,
+                             fail_status=args.fail_status, drop_rate=args.drop_rate,
+                             slow_rate=args.slow_rate, slow_ms=args.slow_ms, seed=args.seed) as server:
+        # config.py reads these at import time
+        os.environ["XAI_API_KEY"] = os.environ.get("XAI_API_KEY") or "bench"
+        os.environ["BASE_URL"] = server.base_url
+
+        from agent import TradvisorAgent
+        from resilience import CircuitBreaker, Resilience
+
+        # Breakers effectively off: the benchmark measures retries, not fail-fast
+        policies = [
+            ("no retries", Resilience(max_attempts=0, breaker=CircuitBreaker(failures=10**9))),
+            ("retries", Resilience(base_delay=0.05, max_delay=0.5,
+                                   breaker=CircuitBreaker(failures=10**9))),
+            ("retries + hedging", Resilience(base_delay=0.05, max_delay=0.5, hedge=True,
+                                             hedge_percentile=80, hedge_min_samples=10,
+                                             hedge_min_delay=0.05,
+                                             breaker=CircuitBreaker(failures=10**9))),
+        ]
+
+        print(f"{args.queries} queries, {args.latency_ms:.0f} ms server latency, "
+              f"{args.fail_rate:.0%} {args.fail_status}s, {args.drop_rate:.0%} dropped, "
+              f"{args.slow_rate:.0%} slowed by {args.slow_ms:.0f} ms\n")
+
+        for label, resilience in policies:
+            latencies, failures = run_queries(
+                lambda: TradvisorAgent(stream=False, resilience=resilience), args.queries)
+            summarize(label, latencies, failures, resilience)
+
+        print(f"\nInjected: {server.injected}")
+
+
+if __name__ == "__main__":
+    main()
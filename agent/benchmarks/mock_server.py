@@ -0,0 +1,247 @@
+"""
+Local mock of the Responses API for benchmarks.
+
+Serves POST .../responses with a canned final answer (JSON, or SSE when the
+request sets "stream": true).  Knobs:
+  - latency_ms:   server "thinking" time per request
+  - handshake_ms: extra delay on every NEW connection, standing in for the
+                  TCP + TLS setup a real BASE_URL costs
+Counts requests and connections so benchmarks can report pool reuse.
+
+Fault injection (for the retry / hedging / breaker engine in resilience.py):
+  - faults:     scripted outcome per request, consumed in order, e.g.
+                ["429", "ok"]; one of "ok", an HTTP status, "slow" or "drop"
+  - fail_rate:  fraction of requests answered with fail_status (plus a
+                Retry-After header when retry_after is set)
+  - drop_rate:  fraction of requests whose connection is cut mid-response
+  - slow_rate:  fraction of requests delayed by an extra slow_ms (tail latency)
+
+Prompt caching (prompt_cache=True), for measuring cached-token ratios:
+  - usage is computed from the request: ~4 characters per token over the
+    tools, the stored previous_response_id chain and the input items
+  - the request is served by one of `cache_replicas` replicas, each caching
+    the prefixes it has seen.  Requests with a prompt_cache_key (or an
+    x-grok-conv-id header) go to the replica for that key; others to a
+    random one, as behind a load balancer.  The longest cached prefix
+    (at least min_cached_tokens) is reported as cached_tokens
+  - prefill_ms_per_1k adds latency per 1K uncached input tokens
+"""
+
+import hashlib
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def canned_response(response_id: str, text: str, usage: dict | None = None) -> dict:
+    """A minimal completed Responses API object with one output_text message."""
+    return {
+        "id": response_id,
+        "object": "response",
+        "created_at": int(time.time()),
+        "status": "completed",
+        "model": "mock",
+        "output": [{
+            "type": "message",
+            "id": f"msg_{response_id}",
+            "role": "assistant",
+            "status": "completed",
+            "content": [{"type": "output_text", "text": text, "annotations": []}],
+        }],
+        "usage": usage or {
+            "input_tokens": 1200,
+            "input_tokens_details": {"cached_tokens": 0},
+            "output_tokens": 40,
+            "output_tokens_details": {"reasoning_tokens": 0},
+            "total_tokens": 1240,
+        },
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def setup(self):
+        # Called once per connection, not per request
+        super().setup()
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        if server.handshake_ms:
+            time.sleep(server.handshake_ms / 1000)
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+
+        with server.lock:
+            server.requests += 1
+            response_id = f"resp_{server.requests}"
+
+        fault = server.next_fault()
+        if fault.isdigit():
+            headers = {"Retry-After": f"{server.retry_after:g}"} if server.retry_after is not None else {}
+            self._send_json(int(fault), {"error": {"message": f"injected {fault}", "type": "mock"}}, headers)
+            return
+
+        usage = server.prompt_usage(body, self.headers, response_id) if server.prompt_cache else None
+        if server.latency_ms:
+            time.sleep(server.latency_ms / 1000)
+        if usage and server.prefill_ms_per_1k:
+            uncached = usage["input_tokens"] - usage["input_tokens_details"]["cached_tokens"]
+            time.sleep(server.prefill_ms_per_1k * uncached / 1000 / 1000)
+        if fault == "slow":
+            time.sleep(server.slow_ms / 1000)
+
+        payload = canned_response(response_id, server.text, usage)
+        if body.get("stream"):
+            self._send_stream(payload, drop=fault == "drop")
+        elif fault == "drop":
+            self.close_connection = True  # no response at all
+        else:
+            self._send_json(200, payload)
+
+    def _send_json(self, status: int, payload: dict, headers: dict | None = None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, payload: dict, drop: bool = False):
+        text = payload["output"][0]["content"][0]["text"]
+        events = [{"type": "response.created", "response": {**payload, "status": "in_progress", "output": []}}]
+        events += [{"type": "response.output_text.delta", "delta": word + " "} for word in text.split()]
+        events.append({"type": "response.completed", "response": payload})
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for seq, event in enumerate(events):
+            if drop and seq == len(events) // 2:
+                self.close_connection = True  # cut the stream halfway
+                return
+            chunk = f"event: {event['type']}\ndata: {json.dumps({**event, 'sequence_number': seq})}\n\n".encode()
+            self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+
+class MockResponsesServer(ThreadingHTTPServer):
+    """Run with `with MockResponsesServer(...) as server:`; base URL is server.base_url."""
+
+    daemon_threads = True
+
+    def __init__(self, latency_ms: float = 0, handshake_ms: float = 0,
+                 text: str = "Mock analysis complete.", handler=_Handler,
+                 faults: list[str] | None = None, fail_rate: float = 0.0, fail_status: int = 503,
+                 retry_after: float | None = None, drop_rate: float = 0.0,
+                 slow_rate: float = 0.0, slow_ms: float = 0, seed: int | None = None,
+                 prompt_cache: bool = False, cache_replicas: int = 1,
+                 min_cached_tokens: int = 1024, prefill_ms_per_1k: float = 0):
+        super().__init__(("127.0.0.1", 0), handler)
+        self.latency_ms = latency_ms
+        self.handshake_ms = handshake_ms
+        self.text = text
+        self.faults = list(faults or [])
+        self.fail_rate = fail_rate
+        self.fail_status = fail_status
+        self.retry_after = retry_after
+        self.drop_rate = drop_rate
+        self.slow_rate = slow_rate
+        self.slow_ms = slow_ms
+        self.random = random.Random(seed)
+        self.prompt_cache = prompt_cache
+        self.cache_replicas = cache_replicas
+        self.min_cached_tokens = min_cached_tokens
+        self.prefill_ms_per_1k = prefill_ms_per_1k
+        self._replica_caches: list[set] = [set() for _ in range(cache_replicas)]
+        self._chains: dict[str, list[str]] = {}  # response id -> rendered conversation
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+        self.injected: dict[str, int] = {}
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    def reset_prompt_cache(self):
+        with self.lock:
+            self._replica_caches = [set() for _ in range(self.cache_replicas)]
+            self._chains.clear()
+
+    def prompt_usage(self, body: dict, headers, response_id: str) -> dict:
+        """Usage for a request, with cached_tokens from the simulated prefix cache."""
+        items = body.get("input") or []
+        if isinstance(items, str):
+            items = [{"role": "user", "content": items}]
+        tools = [json.dumps(body["tools"], sort_keys=True)] if body.get("tools") else []
+        key = body.get("prompt_cache_key") or headers.get("x-grok-conv-id")
+
+        with self.lock:
+            conversation = self._chains.get(body.get("previous_response_id"), [])
+            conversation = conversation + [json.dumps(item, sort_keys=True) for item in items]
+            if key:
+                replica = self._replica_caches[zlib.crc32(key.encode()) % self.cache_replicas]
+            else:
+                replica = self._replica_caches[self.random.randrange(self.cache_replicas)]
+
+            digest, total, cached, hit = hashlib.sha256(), 0, 0, True
+            for segment in tools + conversation:
+                digest.update(segment.encode())
+                total += max(1, len(segment) // 4)
+                prefix = digest.hexdigest()
+                hit = hit and prefix in replica  # only an unbroken prefix is reused
+                if hit:
+                    cached = total
+                replica.add(prefix)
+            self._chains[response_id] = conversation + [json.dumps({"role": "assistant", "content": self.text})]
+
+        if cached < self.min_cached_tokens:
+            cached = 0
+        return {
+            "input_tokens": total,
+            "input_tokens_details": {"cached_tokens": cached},
+            "output_tokens": 40,
+            "output_tokens_details": {"reasoning_tokens": 0},
+            "total_tokens": total + 40,
+        }
+
+    def next_fault(self) -> str:
+        """Outcome for the next request: the script first, then the random rates."""
+        with self.lock:
+            if self.faults:
+                fault = self.faults.pop(0)
+            else:
+                r = self.random.random()
+                if r < self.fail_rate:
+                    fault = str(self.fail_status)
+                elif r < self.fail_rate + self.drop_rate:
+                    fault = "drop"
+                elif r < self.fail_rate + self.drop_rate + self.slow_rate:
+                    fault = "slow"
+                else:
+                    fault = "ok"
+            if fault != "ok":
+                self.injected[fault] = self.injected.get(fault, 0) + 1
+        return fault
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
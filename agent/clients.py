@@ -0,0 +1,98 @@
+"""
+Shared API clients for TradvisorAI Agent.
+
+Every TradvisorAgent used to build its own OpenAI client, so each query paid
+for a fresh connection pool (TCP + TLS handshake to BASE_URL).  The factories
+here hand out one process-wide client instead:
+  - keep-alive connection pooling, sized from config.py
+  - connect/read timeouts from config.py
+  - HTTP/2 when enabled and the `h2` package is installed
+  - SDK retries off: the agents retry through resilience.py instead
+
+Agents use these clients by default; pass `client=` to an agent to override.
+"""
+
+import asyncio
+import threading
+import weakref
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+
+from config import (
+    XAI_API_KEY,
+    BASE_URL,
+    HTTP2,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT,
+)
+
+_lock = threading.Lock()
+_client: OpenAI | None = None
+# httpx async pools are tied to the event loop they were created on
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional `h2` package (pip install httpx[http2])."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _pool_settings() -> dict:
+    return {
+        "limits": httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        "timeout": httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        "http2": HTTP2 and http2_available(),
+    }
+
+
+def get_client() -> OpenAI:
+    """Process-wide OpenAI client with a pooled, keep-alive HTTP connection."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = OpenAI(
+                    api_key=XAI_API_KEY,
+                    base_url=BASE_URL,
+                    http_client=DefaultHttpxClient(**_pool_settings()),
+                    max_retries=0,
+                )
+    return _client
+
+
+def get_async_client() -> AsyncOpenAI:
+    """AsyncOpenAI client shared by every agent on the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = AsyncOpenAI(
+            api_key=XAI_API_KEY,
+            base_url=BASE_URL,
+            http_client=DefaultAsyncHttpxClient(**_pool_settings()),
+            max_retries=0,
+        )
+        _async_clients[loop] = client
+    return client
+
+
+def close_clients():
+    """Close the shared sync client (e.g. at process shutdown)."""
+    global _client
+    with _lock:
+        if _client is not None:
+            _client.close()
+            _client = None
@@ -21,6 +21,93 @@ MODEL = os.getenv("MODEL", "grok-3-mini")
 # Agent loop settings
 MAX_ITERATIONS = int(os.getenv("MAX_ITERATIONS", "15"))
 
+# Pricing in USD for Done.usage cost (defaults: grok-4-1-fast-reasoning)
+PRICE_INPUT_PER_M = float(os.getenv("PRICE_INPUT_PER_M", "0.20"))
+PRICE_CACHED_INPUT_PER_M = float(os.getenv("PRICE_CACHED_INPUT_PER_M", "0.05"))
+PRICE_OUTPUT_PER_M = float(os.getenv("PRICE_OUTPUT_PER_M", "0.50"))
+PRICE_SERVER_TOOL_CALL = float(os.getenv("PRICE_SERVER_TOOL_CALL", "0.005"))
+
+# Per-query budget (0 = no limit); see usage.py for per-tier budgets
+BUDGET_MAX_TOKENS = int(os.getenv("BUDGET_MAX_TOKENS", "0"))
+BUDGET_MAX_COST = float(os.getenv("BUDGET_MAX_COST", "0"))
+BUDGET_MAX_SECONDS = float(os.getenv("BUDGET_MAX_SECONDS", "0"))
+
+# Retries, hedging and circuit breaker for model calls (see resilience.py)
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "4"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "1.0"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "30"))
+RETRY_AFTER_MAX = float(os.getenv("RETRY_AFTER_MAX", "60"))
+HEDGE = os.getenv("HEDGE", "false").lower() in ("1", "true", "yes")
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "2.0"))
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", "30"))
+
+# Send a prompt cache key (one per prompt version) with every model call so the
+# provider serves the shared system prompt + tools prefix from its cache
+PROMPT_CACHE_ROUTING = os.getenv("PROMPT_CACHE_ROUTING", "true").lower() in ("1", "true", "yes")
+
+# Send only the methodology sections a query needs (see methodology.py);
+# false sends the whole SYSTEM_PROMPT every time
+MODULAR_PROMPT = os.getenv("MODULAR_PROMPT", "true").lower() in ("1", "true", "yes")
+
+# Yield plan changes as step-level PlanDelta events after the first PlanUpdate;
+# false yields a full PlanUpdate snapshot for every change
+PLAN_DELTAS = os.getenv("PLAN_DELTAS", "true").lower() in ("1", "true", "yes")
+
+# Stream each turn token-by-token (lower time-to-first-token)
+STREAM = os.getenv("STREAM", "true").lower() in ("1", "true", "yes")
+
+# Custom function calls from one model turn run concurrently on a shared pool;
+# each gets TOOL_TIMEOUT seconds unless tools.TOOL_TIMEOUTS sets its own
+TOOL_WORKERS = int(os.getenv("TOOL_WORKERS", "8"))
+TOOL_TIMEOUT = float(os.getenv("TOOL_TIMEOUT", "30"))
+
+# Max AsyncTradvisorAgent runs in flight per event loop (extra runs wait)
+MAX_CONCURRENT_RUNS = int(os.getenv("MAX_CONCURRENT_RUNS", "200"))
+
+# Multi-ticker fan-out (coordinator.py)
+FANOUT = os.getenv("FANOUT", "true").lower() in ("1", "true", "yes")
+FANOUT_MAX_WORKERS = int(os.getenv("FANOUT_MAX_WORKERS", "5"))
+FANOUT_MAX_TICKERS = int(os.getenv("FANOUT_MAX_TICKERS", "10"))
+FANOUT_SCREEN_CANDIDATES = int(os.getenv("FANOUT_SCREEN_CANDIDATES", "5"))
+# Share of the query's token / cost budget held back for the merge turn
+FANOUT_MERGE_RESERVE = float(os.getenv("FANOUT_MERGE_RESERVE", "0.15"))
+
+# HTTP connection pool shared by all agents in the process (see clients.py)
+HTTP2 = os.getenv("HTTP2", "true").lower() in ("1", "true", "yes")
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "600"))  # reasoning turns can be slow
+
+# Response cache for repeated analysis queries (see response_cache.py)
+RESPONSE_CACHE = os.getenv("RESPONSE_CACHE", "true").lower() in ("1", "true", "yes")
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+
+# Span tracing (see tracing.py): comma-separated exporters, "jsonl" and/or "otel"
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "")
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+
+# Stock database filled by backend/scripts/bootstrap_db.py (optional; enables
+# the screen_stocks and get_stock_data tools)
+SUPABASE_URL = os.getenv("SUPABASE_URL", "")
+SUPABASE_KEY = os.getenv("SUPABASE_KEY", "")
+# get_stock_data read-through cache (see db.py); the bootstrap runs daily, so a
+# few minutes of staleness is invisible
+DB_CACHE_TTL = float(os.getenv("DB_CACHE_TTL", "300"))
+DB_CACHE_SIZE = int(os.getenv("DB_CACHE_SIZE", "2048"))
+
+# Save chats to the conversations / messages tables (needs the database above);
+# rows are inserted from a background thread in batches (see conversation.py)
+CONVERSATION_STORE = os.getenv("CONVERSATION_STORE", "true").lower() in ("1", "true", "yes")
+MESSAGES_BATCH_SIZE = int(os.getenv("MESSAGES_BATCH_SIZE", "50"))
+MESSAGES_FLUSH_INTERVAL = float(os.getenv("MESSAGES_FLUSH_INTERVAL", "1.0"))
+MESSAGES_MAX_PENDING = int(os.getenv("MESSAGES_MAX_PENDING", "10000"))
+
 # Validate
 if not XAI_API_KEY:
     raise ValueError(
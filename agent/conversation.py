@@ -0,0 +1,345 @@
+"""
+Multi-turn conversations and chat-history persistence.
+
+Every run used to start cold: a follow-up such as "now do MSFT" re-sent the
+full SYSTEM_PROMPT with no memory of the previous answer.  A Conversation
+links the runs of one chat instead:
+  - each agent run resumes from the previous run's final response id
+    (previous_response_id), so the system prompt and earlier turns are
+    already in the stored chain and served from the provider's prompt cache;
+    only the new user message is sent
+  - when there is no chain to resume (the previous answer was replayed from
+    the response cache, or the stored response has expired) the run starts
+    a new chain from the system prompt plus the recent message history
+
+With the stock database configured, the chat is also saved to the
+`conversations` / `messages` tables.  Rows are handed to a MessageWriter,
+which inserts them from a background thread in batches, so the event
+stream never waits on the database.  Each model turn is written as soon as
+its tool calls finish: the user message, then one assistant row per turn
+with its text, tool calls and tool results.  The final row of a completed
+run carries the response id that Conversation.load() resumes from.
+"""
+
+import atexit
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import AsyncGenerator, Generator
+
+import db
+from agent import Done, Retrying, TextDelta, ToolCall, ToolResult
+from config import (
+    CONVERSATION_STORE,
+    MESSAGES_BATCH_SIZE,
+    MESSAGES_FLUSH_INTERVAL,
+    MESSAGES_MAX_PENDING,
+)
+
+# Messages re-sent when a run has to start a new chain
+HISTORY_MESSAGES = 20
+
+# Flush order matters: messages reference conversations(id)
+TABLES = ("conversations", "messages")
+
+
+def _now() -> str:
+    # created_at is TIMESTAMP (UTC, no zone); set client-side so rows of one
+    # batched INSERT keep their order
+    return datetime.now(timezone.utc).replace(tzinfo=None).isoformat()
+
+
+# ═══════════════════════════════════════════════════════════════
+# BATCHED WRITER
+# ═══════════════════════════════════════════════════════════════
+
+
+class MessageWriter:
+    """
+    Append-only, non-blocking writer for chat rows.
+
+    append() only puts the row on a bounded queue (rows are dropped and
+    counted once MESSAGES_MAX_PENDING are waiting).  A daemon thread
+    inserts them with one multi-row upsert per table every `flush_interval`
+    seconds or `batch_size` rows.  Rows carry client-side ids, so a batch
+    that fails is retried without creating duplicates.
+    """
+
+    def __init__(self, batch_size: int = MESSAGES_BATCH_SIZE,
+                 flush_interval: float = MESSAGES_FLUSH_INTERVAL,
+                 max_pending: int = MESSAGES_MAX_PENDING, max_attempts: int = 3):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.round_trips = 0
+
+    def append(self, table: str, row: dict) -> bool:
+        """Queue a row for insertion; False if it was dropped."""
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait((table, row))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        return True
+
+    def flush(self, timeout: float | None = 10.0) -> bool:
+        """Block until every row queued so far is written (or given up on)."""
+        if self._thread is None:
+            return True
+        marker = threading.Event()
+        try:
+            self._queue.put(marker, timeout=timeout)
+        except queue.Full:
+            return False
+        return marker.wait(timeout)
+
+    def stats(self) -> dict:
+        return {
+            "written": self.written,
+            "pending": self._queue.qsize(),
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "round_trips": self.round_trips,
+        }
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._loop, name="message-writer", daemon=True)
+                    self._thread.start()
+
+    def _loop(self):
+        batch, markers = [], []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, threading.Event):
+                markers.append(item)
+            elif item is not None:
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+            due = deadline is not None and time.monotonic() >= deadline
+            if batch and (markers or due or len(batch) >= self.batch_size):
+                self._write(batch)
+                batch, deadline = [], None
+            for marker in markers:
+                marker.set()
+            markers = []
+
+    def _write(self, batch: list):
+        by_table = {table: [] for table in TABLES}
+        for table, row in batch:
+            by_table.setdefault(table, []).append(row)
+
+        for table, rows in by_table.items():
+            if not rows:
+                continue
+            for attempt in range(self.max_attempts):
+                try:
+                    db.get_db().table(table).upsert(rows, on_conflict="id", ignore_duplicates=True).execute()
+                except Exception:
+                    if attempt + 1 == self.max_attempts:
+                        with self._lock:
+                            self.failed += len(rows)
+                    else:
+                        time.sleep(0.5 * 2 ** attempt)
+                    continue
+                with self._lock:
+                    self.written += len(rows)
+                    self.round_trips += 1
+                break
+
+
+_writer: MessageWriter | None = None
+_writer_lock = threading.Lock()
+
+
+def get_message_writer() -> MessageWriter:
+    """Process-wide writer; pending rows are flushed at interpreter exit."""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = MessageWriter()
+                atexit.register(_writer.flush)
+    return _writer
+
+
+# ═══════════════════════════════════════════════════════════════
+# CONVERSATION
+# ═══════════════════════════════════════════════════════════════
+
+
+class Conversation:
+    """
+    One chat: the response id to resume from, recent history and persistence.
+
+    Pass it to an agent (`conversation=`) so runs resume from the previous
+    answer, and wrap the agent's events in record() (or arecord() for
+    AsyncTradvisorAgent) to save them:
+
+        conversation = Conversation()
+        agent = TradvisorAgent(conversation=conversation)
+        for event in conversation.record(query, agent.run(query)):
+            ...
+    """
+
+    def __init__(self, id: str | None = None, user_id: str | None = None,
+                 title: str | None = None, writer: MessageWriter | None = None,
+                 persist: bool | None = None):
+        self.id = id or str(uuid.uuid4())
+        self.user_id = user_id
+        self.title = title
+        self.response_id: str | None = None  # final response of the last completed run
+        self.history: list[dict] = []        # recent {"role", "content"} messages
+        self.runs = 0
+        self.persist = (CONVERSATION_STORE and db.available()) if persist is None else persist
+        self.writer = writer or (get_message_writer() if self.persist else None)
+        self._created = id is not None  # an existing id already has its row
+
+    @classmethod
+    def load(cls, conversation_id: str, **kwargs) -> "Conversation":
+        """Resume a stored conversation: its recent history and last response id."""
+        conversation = cls(id=conversation_id, **kwargs)
+        rows = (
+            db.get_db().table("messages")
+            .select("role, content, response_id")
+            .eq("conversation_id", conversation_id)
+            .order("created_at", desc=True)
+            .limit(200)
+            .execute()
+        ).data or []
+        for row in reversed(rows):
+            if row.get("content"):
+                conversation.history.append({"role": row["role"], "content": row["content"]})
+            if row["role"] == "assistant" and row.get("response_id"):
+                conversation.response_id = row["response_id"]
+            if row["role"] == "user":
+                conversation.runs += 1
+        conversation.history = conversation.history[-HISTORY_MESSAGES:]
+        return conversation
+
+    # ── recording ───────────────────────────────────────────
+
+    def record(self, query: str, events: Generator) -> Generator:
+        """Yield `events` unchanged while saving the run to this conversation."""
+        recorder = _RunRecorder(self, query)
+        try:
+            for event in events:
+                recorder.feed(event)
+                yield event
+        finally:
+            recorder.finish()
+
+    async def arecord(self, query: str, events: AsyncGenerator) -> AsyncGenerator:
+        """Async version of record()."""
+        recorder = _RunRecorder(self, query)
+        try:
+            async for event in events:
+                recorder.feed(event)
+                yield event
+        finally:
+            recorder.finish()
+
+    def _write(self, role: str, content: str, tool_calls: list | None = None,
+               tool_results: list | None = None, response_id: str | None = None):
+        if self.writer is None:
+            return
+        if not self._created:
+            self._created = True
+            self.writer.append("conversations", {
+                "id": self.id,
+                "user_id": self.user_id,
+                "title": self.title or content[:80],
+            })
+        self.writer.append("messages", {
+            "id": str(uuid.uuid4()),
+            "conversation_id": self.id,
+            "role": role,
+            "content": content,
+            "tool_calls": tool_calls or None,
+            "tool_results": tool_results or None,
+            "response_id": response_id,
+            "created_at": _now(),
+        })
+
+
+class _RunRecorder:
+    """
+    Turns one run's events into message rows.  A model turn ends when its
+    tool results are in (or on Done), and is written then.
+    """
+
+    def __init__(self, conversation: Conversation, query: str):
+        self.conversation = conversation
+        self.query = query
+        self.text = ""        # current turn
+        self.answer = ""      # whole run, for the history
+        self.tool_calls: list = []
+        self.tool_results: list = []
+        self.finished = False
+        conversation._write("user", query)
+
+    def feed(self, event):
+        if self.tool_results and not isinstance(event, ToolResult):
+            self._flush_turn()
+
+        if isinstance(event, TextDelta):
+            self.text += event.content
+            self.answer += event.content
+        elif isinstance(event, Retrying):
+            self.text = self.text[:len(self.text) - event.discard_chars]
+            self.answer = self.answer[:len(self.answer) - event.discard_chars]
+        elif isinstance(event, ToolCall):
+            self.tool_calls.append({"name": event.name, "description": event.description})
+        elif isinstance(event, ToolResult):
+            self.tool_results.append({
+                "name": event.name, "call_id": event.call_id,
+                "seconds": round(event.seconds, 3), "error": event.error,
+            })
+        elif isinstance(event, Done):
+            if event.cached:
+                # A replay is not part of the stored chain; the next run starts
+                # a new one from the history instead
+                self.conversation.response_id = None
+            self._flush_turn(response_id=self.conversation.response_id if event.error is None else None)
+            self._finish_run()
+
+    def finish(self):
+        """Called when the event stream ends (also on cancel / early close)."""
+        if not self.finished:
+            self._flush_turn()
+            self._finish_run()
+
+    def _flush_turn(self, response_id: str | None = None):
+        if self.text or self.tool_calls or self.tool_results or response_id:
+            self.conversation._write("assistant", self.text, self.tool_calls, self.tool_results,
+                                     response_id)
+        self.text, self.tool_calls, self.tool_results = "", [], []
+
+    def _finish_run(self):
+        self.finished = True
+        conversation = self.conversation
+        conversation.runs += 1
+        conversation.history.append({"role": "user", "content": self.query})
+        if self.answer:
+            conversation.history.append({"role": "assistant", "content": self.answer})
+        conversation.history = conversation.history[-HISTORY_MESSAGES:]
@@ -0,0 +1,386 @@
+"""
+Multi-ticker fan-out for TradvisorAI.
+
+"Compare AAPL vs MSFT" through a single TradvisorAgent runs every ticker's
+research serially, up to MAX_ITERATIONS round trips each.  The coordinator
+instead:
+  1. Detects the tickers in the query (or, for screening queries such as
+     "Find undervalued tech stocks", asks Grok for a short candidate list -
+     unless the stock database is configured, in which case the single agent
+     answers from the precomputed screening table via screen_stocks)
+  2. Runs one TradvisorAgent per ticker on a bounded thread pool
+  3. Streams ONE unified plan (a step per ticker + a merge step) to the UI
+  4. Makes a final merge call that combines the per-ticker analyses
+
+Wall-clock time is roughly one ticker's analysis plus the merge turn.
+Queries with fewer than two tickers go straight to a single TradvisorAgent.
+
+The query's Budget covers the whole fan-out: each sub-agent gets an equal
+share of the tokens and cost left after FANOUT_MERGE_RESERVE is held back
+for the merge.  If the budget is used up before the merge, the per-ticker
+analyses are shown as they are and Done.budget_exceeded is set.
+
+In a Conversation, the merge turn (or the single agent) continues the chat's
+response chain; sub-agents always start fresh.  Follow-ups skip the response
+cache, since their answer depends on the earlier turns.
+"""
+
+import json
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Generator
+
+from openai import OpenAI
+
+import db
+from agent import (
+    Done,
+    PlanDelta,
+    PlanUpdate,
+    Retrying,
+    TextDelta,
+    ToolCall,
+    TradvisorAgent,
+    _AgentCore,
+    apply_plan_event,
+    cache_routing,
+)
+from clients import get_client
+from conversation import Conversation
+from config import (
+    MODEL,
+    STREAM,
+    FANOUT_MAX_WORKERS,
+    FANOUT_MAX_TICKERS,
+    FANOUT_MERGE_RESERVE,
+    FANOUT_SCREEN_CANDIDATES,
+)
+from prompts import MERGE_PROMPT, SCREEN_CANDIDATES_PROMPT, SUBAGENT_PROMPT
+from methodology import ALL_SECTIONS
+from response_cache import ResponseCache, get_response_cache
+from tools import ALL_TOOLS
+from usage import Budget
+
+
+# ═══════════════════════════════════════════════════════════════
+# QUERY ROUTING
+# ═══════════════════════════════════════════════════════════════
+
+_TICKER_RE = re.compile(r"(\$)?\b([A-Z]{1,5}(?:\.[A-Z])?)\b")
+
+# All-caps words that show up in finance questions but are not tickers
+# (a leading $ always wins, e.g. "$AI")
+_NOT_TICKERS = {
+    "A", "I", "AI", "API", "AND", "BUY", "CEO", "CFO", "CPU", "DCF", "EBIT",
+    "EBITDA", "EPS", "ETF", "EU", "EUR", "EV", "FCF", "FCFE", "FY", "GDP",
+    "GPU", "HOLD", "IPO", "IS", "IT", "LLM", "MOS", "NYSE", "NASDAQ", "OF",
+    "OR", "PE", "PEG", "ROE", "ROIC", "SELL", "SEC", "SP", "TAM", "THE", "TO",
+    "TTM", "UK", "US", "USA", "USD", "VS", "WACC", "YOY",
+}
+
+_SCREEN_RE = re.compile(
+    r"\b(find|screen|list|top|best|cheapest|which)\b.*\bstocks?\b", re.IGNORECASE
+)
+
+
+def extract_tickers(text: str, limit: int = FANOUT_MAX_TICKERS) -> list[str]:
+    """Tickers mentioned in the text, in order, without duplicates."""
+    tickers = []
+    for dollar, symbol in _TICKER_RE.findall(text):
+        if (dollar or symbol not in _NOT_TICKERS) and symbol not in tickers:
+            tickers.append(symbol)
+    return tickers[:limit]
+
+
+def is_screening_query(text: str) -> bool:
+    """True for open-ended requests like "Find undervalued tech stocks"."""
+    return bool(_SCREEN_RE.search(text))
+
+
+# ═══════════════════════════════════════════════════════════════
+# COORDINATOR
+# ═══════════════════════════════════════════════════════════════
+
+_FINISHED = object()  # queue marker: a sub-agent is done
+
+
+class CoordinatorAgent(_AgentCore):
+    """
+    Fan a multi-ticker query out to per-ticker sub-agents and merge the results.
+
+    Yields the same PlanUpdate / PlanDelta / ToolCall / TextDelta / Done
+    events as TradvisorAgent, so it is a drop-in replacement for the UI layer.
+    Sub-agent text is collected, not shown; tool calls are forwarded with
+    the ticker prefixed to their description.
+
+    Sub-agent spans are recorded under this run's "coordinator.run" span.
+    """
+
+    _span_name = "coordinator.run"
+
+    def __init__(self, stream: bool = STREAM, client: OpenAI | None = None,
+                 max_workers: int = FANOUT_MAX_WORKERS,
+                 response_cache: ResponseCache | None = None, budget: Budget | None = None,
+                 conversation: Conversation | None = None):
+        # Each sub-agent gets `budget`; Done.usage sums all of them plus the merge
+        super().__init__(stream, budget, conversation=conversation)
+        self.client = client or get_client()
+        self.max_workers = max_workers
+        # Shared process-wide cache unless one is passed (None when RESPONSE_CACHE is off)
+        self.response_cache = response_cache or get_response_cache()
+
+    # ── public ──────────────────────────────────────────────
+
+    def run(self, user_query: str) -> Generator:
+        """
+        Run the query, fanning out when it names (or screens for) several tickers.
+        Repeated analysis queries are replayed from the response cache.
+        Yields events as the agents work.
+        """
+        tickers = extract_tickers(user_query)
+        follow_up = self.conversation is not None and bool(self.conversation.history)
+        if self.response_cache is None or follow_up:
+            yield from self._run(user_query, tickers)
+        else:
+            yield from self.response_cache.run(
+                user_query, tickers, lambda query: self._run(query, tickers)
+            )
+
+    def _run(self, user_query: str, tickers: list[str]) -> Generator:
+        self._start_run(user_query)
+        if len(tickers) < 2 and is_screening_query(user_query) and not db.available():
+            try:
+                tickers = self._select_candidates(user_query)
+            except Exception:
+                tickers = []
+
+        if len(tickers) < 2:
+            agent = TradvisorAgent(stream=self.stream, client=self.client,
+                                   budget=self._remaining_budget(),
+                                   resilience=self.resilience, conversation=self.conversation)
+            agent.trace_parent = self._run_span
+            yield from agent.run(user_query)
+            self._run_span.end(delegated=True)
+            return
+
+        self.plan = {
+            "task_summary": f"Analyze {', '.join(tickers)} in parallel",
+            "steps": [
+                {"id": i, "description": f"Analyze {ticker}", "status": "pending"}
+                for i, ticker in enumerate(tickers, 1)
+            ] + [
+                {"id": len(tickers) + 1, "description": "Merge and compare results", "status": "pending"},
+            ],
+            "is_complete": False,
+        }
+        yield from self._plan_events(self.plan)
+
+        analyses, iterations = yield from self._fan_out(user_query, tickers)
+
+        merge_step = self.plan["steps"][-1]
+        error = None
+        over_budget = self.budget.exceeded(self.usage, time.perf_counter() - self._started)
+        if over_budget:
+            # Nothing left for the merge turn: show the per-ticker analyses as they are
+            self.budget_exceeded = over_budget
+            merge_step["status"] = "skipped"
+            yield TextDelta(_sections(analyses))
+        else:
+            merge_step["status"] = "in_progress"
+            yield from self._plan_events(self.plan)
+            iterations += 1
+            try:
+                yield from self._merge(user_query, analyses)
+            except Exception as e:
+                yield TextDelta(f"\n\nAPI Error: {e}")
+                merge_step["status"] = "skipped"
+                error = str(e)
+            else:
+                merge_step["status"] = "completed"
+
+        self.plan["is_complete"] = True
+        yield from self._plan_events(self.plan)
+        yield self._done(iterations, error=error)
+
+    # ── stages ──────────────────────────────────────────────
+
+    def _select_candidates(self, user_query: str) -> list[str]:
+        """One short, tool-free call to pick tickers for a screening query."""
+        kwargs = {
+            "model": MODEL,
+            "input": SCREEN_CANDIDATES_PROMPT.format(limit=FANOUT_SCREEN_CANDIDATES, query=user_query),
+        }
+        self._start_turn(kwargs, purpose="select_candidates")
+        try:
+            response = self.resilience.call(lambda: self.client.responses.create(**kwargs))
+        except Exception as e:
+            self._end_turn(error=str(e))
+            raise
+        self._record_usage(response)
+        self._end_turn()
+        text = "".join(
+            part.text
+            for item in response.output if item.type == "message"
+            for part in item.content if getattr(part, "type", "") == "output_text"
+        )
+        try:
+            tickers = [str(t).upper() for t in json.loads(text)]
+        except (json.JSONDecodeError, TypeError):
+            tickers = extract_tickers(text)
+        return tickers[:FANOUT_SCREEN_CANDIDATES]
+
+    def _fan_out(self, user_query: str, tickers: list[str]) -> Generator:
+        """
+        Run one sub-agent per ticker on a bounded pool, relaying progress into
+        the unified plan.  Returns ({ticker: analysis_text}, total_iterations).
+        """
+        events = queue.Queue()
+        stop = threading.Event()
+        # Each sub-agent gets an equal part of what is left, minus the merge's reserve
+        budget = self._remaining_budget().share(len(tickers), FANOUT_MERGE_RESERVE)
+
+        def work(ticker: str):
+            text, done = "", None
+            try:
+                agent = TradvisorAgent(stream=self.stream, client=self.client, budget=budget,
+                                       resilience=self.resilience)
+                agent.trace_parent = self._run_span
+                # Each sub-agent runs a full single-stock analysis, whatever the query's class
+                agent.methodology = ALL_SECTIONS
+                for event in agent.run(SUBAGENT_PROMPT.format(query=user_query, ticker=ticker)):
+                    if stop.is_set():
+                        break
+                    if isinstance(event, TextDelta):
+                        text += event.content
+                    elif isinstance(event, Retrying):
+                        text = text[:len(text) - event.discard_chars]
+                    elif isinstance(event, Done):
+                        done = event
+                    else:
+                        events.put((ticker, event))
+            except Exception as e:
+                text += f"\n\nError: {e}"
+            events.put((ticker, (_FINISHED, text, done)))
+
+        steps = dict(zip(tickers, self.plan["steps"]))
+        sub_plans = {}  # each sub-agent's plan, rebuilt from its plan events
+        analyses = {}
+        total_iterations = 0
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="fanout")
+        try:
+            for ticker in tickers:
+                executor.submit(work, ticker)
+
+            while len(analyses) < len(tickers):
+                ticker, event = events.get()
+                step = steps[ticker]
+
+                if isinstance(event, tuple) and event[0] is _FINISHED:
+                    _, text, done = event
+                    analyses[ticker] = text.strip()
+                    if done is not None:
+                        total_iterations += done.iterations
+                        if done.usage is not None:
+                            self.usage.add(done.usage, record_turn=False)
+                        if done.budget_exceeded and self.budget_exceeded is None:
+                            self.budget_exceeded = f"{ticker}: {done.budget_exceeded}"
+                    step["status"] = "completed" if text.strip() else "skipped"
+                    step["result"] = _summarize(text)
+                    yield from self._plan_events(self.plan)
+
+                elif isinstance(event, (PlanUpdate, PlanDelta)):
+                    # Show the sub-agent's current step as this ticker's progress
+                    sub_plans[ticker] = apply_plan_event(sub_plans.get(ticker), event)
+                    sub_steps = sub_plans[ticker]["steps"]
+                    done = sum(1 for s in sub_steps if s.get("status") == "completed")
+                    current = next(
+                        (s for s in sub_steps if s.get("status") == "in_progress"), None
+                    )
+                    step["status"] = "in_progress"
+                    step["result"] = f"{done}/{len(sub_steps)} steps" + (
+                        f" · {current.get('description', '')}" if current else ""
+                    )
+                    yield from self._plan_events(self.plan)
+
+                elif isinstance(event, ToolCall) and event.name != "update_plan":
+                    yield ToolCall(name=event.name, description=f"[{ticker}] {event.description}")
+        finally:
+            stop.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return analyses, total_iterations
+
+    def _merge(self, user_query: str, analyses: dict) -> Generator:
+        """Final tool-free turn that turns the per-ticker analyses into one answer."""
+        sections = _sections(analyses)
+        # Same tools + system prompt prefix as the sub-agents' turns, so it is
+        # served from the prompt cache; tool_choice keeps the turn tool-free
+        kwargs = cache_routing({
+            "model": MODEL,
+            "tools": ALL_TOOLS,
+            "tool_choice": "none",
+            # The merge only needs the output format (all of it without MODULAR_PROMPT)
+            "input": self._first_input(MERGE_PROMPT.format(query=user_query, analyses=sections),
+                                       ("report",) if self.sections is not None else None),
+        })
+        # In a conversation, continue its chain so follow-ups see the merged answer
+        if self.response_id:
+            kwargs["previous_response_id"] = self.response_id
+
+        for attempt in range(self.resilience.max_attempts + 1):
+            calls = []  # no tools are offered, so no function calls come back
+            emitted = 0
+            self._start_turn(kwargs, purpose="merge", attempt=attempt)
+            started = time.perf_counter()
+            try:
+                if self.stream:
+                    with self.resilience.breaker.guard():
+                        pending_calls = {}
+                        for event in self.client.responses.create(**kwargs, stream=True):
+                            for agent_event in self._parse_stream_event(event, pending_calls, calls):
+                                if isinstance(agent_event, TextDelta):
+                                    emitted += len(agent_event.content)
+                                yield agent_event
+                        self.resilience.record_success()
+                else:
+                    response = self.resilience.call(lambda: self.client.responses.create(**kwargs))
+                    self.resilience.record_success(time.perf_counter() - started)
+                    self._mark_first_event()
+                    self.response_id = response.id
+                    self._record_usage(response)
+                    for item in response.output:
+                        yield from self._parse_item(item, calls)
+            except Exception as e:
+                if self._resume_expired(e, kwargs.get("previous_response_id")):
+                    yield from self._merge(user_query, analyses)
+                    return
+                retry = self._retry(e, attempt, emitted)
+                if retry is None:
+                    raise
+                yield retry
+                time.sleep(retry.delay)
+                continue
+            self._end_turn()
+            return
+
+    def _remaining_budget(self) -> Budget:
+        """The query's budget minus what this run has used so far."""
+        return self.budget.remaining(self.usage, time.perf_counter() - self._started)
+
+
+def _sections(analyses: dict) -> str:
+    """The per-ticker analyses under a heading each."""
+    return "\n\n".join(f"### {ticker}\n{text}" for ticker, text in analyses.items())
+
+
+def _summarize(text: str, limit: int = 80) -> str:
+    """First meaningful line of a sub-agent's analysis, for the plan's result column."""
+    for line in text.strip().splitlines():
+        line = line.replace("**", "").strip(" #*|-")
+        if line:
+            return line if len(line) <= limit else line[: limit - 3] + "..."
+    return "No analysis returned"
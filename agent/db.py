@@ -0,0 +1,242 @@
+"""
+Read access to the TradvisorAI stock database (Supabase).
+
+backend/scripts/bootstrap_db.py keeps companies, prices, metrics and
+dcf_valuations up to date and rebuilds the denormalized `screening` table
+after every run.  The agent's local database tools read from here through
+one process-wide client; per-ticker reads go through an LRU + TTL cache
+(DB_CACHE_TTL / DB_CACHE_SIZE) so repeated lookups skip the round trip.
+
+The database is optional: without SUPABASE_URL / SUPABASE_KEY (or the
+`supabase` package) the tools return an error and the agent falls back to
+web_search.
+"""
+
+import threading
+import time
+from datetime import date, datetime
+
+from cache import TTLCache
+from config import SUPABASE_URL, SUPABASE_KEY, DB_CACHE_TTL, DB_CACHE_SIZE
+
+_lock = threading.Lock()
+_client = None
+_cache = TTLCache(maxsize=DB_CACHE_SIZE, ttl=DB_CACHE_TTL)
+
+
+class DatabaseUnavailable(RuntimeError):
+    """The stock database is not configured or not reachable."""
+
+
+def available() -> bool:
+    """True when the database is configured and the client library is installed."""
+    try:
+        get_db()
+    except DatabaseUnavailable:
+        return False
+    return True
+
+
+def get_db():
+    """Shared Supabase client, created on first use."""
+    global _client
+    if _client is not None:
+        return _client
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        raise DatabaseUnavailable("stock database not configured (SUPABASE_URL / SUPABASE_KEY)")
+    try:
+        from supabase import create_client
+    except ImportError:
+        raise DatabaseUnavailable("supabase package not installed (pip install supabase)")
+    with _lock:
+        if _client is None:
+            _client = create_client(SUPABASE_URL, SUPABASE_KEY)
+    return _client
+
+
+# ═══════════════════════════════════════════════════════════════
+# SCREENING
+# ═══════════════════════════════════════════════════════════════
+
+# Tool argument -> (screening column, PostgREST operator)
+SCREEN_FILTERS = {
+    "min_margin_of_safety": ("margin_of_safety", "gte"),
+    "min_upside": ("upside_downside", "gte"),
+    "min_prob_undervalued": ("prob_undervalued", "gte"),
+    "max_pe": ("pe_ratio", "lte"),
+    "max_pb": ("pb_ratio", "lte"),
+    "min_roe": ("roe", "gte"),
+    "min_net_margin": ("net_margin", "gte"),
+    "min_revenue_growth": ("revenue_growth", "gte"),
+    "max_debt_to_equity": ("debt_to_equity", "lte"),
+    "min_market_cap": ("market_cap", "gte"),
+    "min_dividend_yield": ("dividend_yield", "gte"),
+}
+
+# Sortable columns and their natural direction (True = highest first)
+SCREEN_SORTS = {
+    "margin_of_safety": True,
+    "upside_downside": True,
+    "prob_undervalued": True,
+    "pe_ratio": False,
+    "roe": True,
+    "revenue_growth": True,
+    "market_cap": True,
+    "dividend_yield": True,
+}
+
+SCREEN_COLUMNS = (
+    "ticker, name, sector, industry, market_cap, current_price, intrinsic_value, "
+    "margin_of_safety, upside_downside, prob_undervalued, pe_ratio, pb_ratio, roe, "
+    "net_margin, revenue_growth, debt_to_equity, dividend_yield, valuation_date, "
+    "price_date, refreshed_at"
+)
+
+MAX_SCREEN_RESULTS = 50
+
+
+def screen_stocks(sector: str | None = None, industry: str | None = None,
+                  sort_by: str = "margin_of_safety", limit: int = 10, **filters) -> dict:
+    """
+    Filter and rank the precomputed screening table in one query.
+    `filters` are SCREEN_FILTERS keys, e.g. min_margin_of_safety=20, max_pe=25.
+    """
+    if sort_by not in SCREEN_SORTS:
+        raise ValueError(f"sort_by must be one of {', '.join(SCREEN_SORTS)}")
+    unknown = set(filters) - set(SCREEN_FILTERS)
+    if unknown:
+        raise ValueError(f"unknown filters: {', '.join(sorted(unknown))}")
+
+    started = time.perf_counter()
+    query = get_db().table("screening").select(SCREEN_COLUMNS)
+    if sector:
+        query = query.ilike("sector", f"%{sector}%")
+    if industry:
+        query = query.ilike("industry", f"%{industry}%")
+    for name, value in filters.items():
+        if value is None:
+            continue
+        column, operator = SCREEN_FILTERS[name]
+        query = getattr(query, operator)(column, value)
+        if column == "pe_ratio":
+            query = query.gt("pe_ratio", 0)  # negative earnings are not "cheap"
+
+    limit = max(1, min(int(limit), MAX_SCREEN_RESULTS))
+    rows = (
+        query.not_.is_(sort_by, "null")
+        .order(sort_by, desc=SCREEN_SORTS[sort_by])
+        .limit(limit)
+        .execute()
+        .data
+    )
+
+    return {
+        "count": len(rows),
+        "sorted_by": sort_by,
+        "results": rows,
+        "as_of": rows[0]["refreshed_at"] if rows else None,
+        "query_ms": round((time.perf_counter() - started) * 1000, 1),
+        "source": "TradvisorAI database (yfinance data, DCF by the bootstrap)",
+    }
+
+
+# ═══════════════════════════════════════════════════════════════
+# PER-TICKER DATA
+# ═══════════════════════════════════════════════════════════════
+
+# field -> (table, column holding the row's as-of date, extra filters, newest-first order column)
+STOCK_FIELDS = {
+    "company": ("companies", "last_updated", (), None),
+    "price": ("prices", "date", (("is_latest", True),), "date"),
+    "metrics": ("metrics", "metric_date", (), "metric_date"),
+    "dcf": ("dcf_valuations", "valuation_date", (), "valuation_date"),
+    "financials": ("financials", "period_end", (("period_type", "FY"),), "period_end"),
+}
+
+
+def cache_stats() -> dict:
+    return {"hits": _cache.hits, "misses": _cache.misses, "hit_rate": round(_cache.hit_rate, 3)}
+
+
+def _age_days(as_of) -> int | None:
+    if not as_of:
+        return None
+    try:
+        day = datetime.fromisoformat(str(as_of)).date()
+    except ValueError:
+        return None
+    return (date.today() - day).days
+
+
+def _load_row(field: str, ticker: str) -> dict | None:
+    table, _, filters, order = STOCK_FIELDS[field]
+    query = get_db().table(table).select("*").eq("ticker", ticker)
+    for column, value in filters:
+        query = query.eq(column, value)
+    if order:
+        query = query.order(order, desc=True)
+    rows = query.limit(1).execute().data
+    return rows[0] if rows else None
+
+
+def latest_valuation(ticker: str) -> dict | None:
+    """
+    The newest dcf_valuations row's date, creation time and headline numbers,
+    read straight from the database (not the cache) to detect revaluations.
+    """
+    rows = (
+        get_db().table("dcf_valuations")
+        .select("valuation_date, created_at, intrinsic_value, current_price")
+        .eq("ticker", ticker.strip().upper())
+        .order("valuation_date", desc=True)
+        .limit(1)
+        .execute()
+    ).data
+    return rows[0] if rows else None
+
+
+def get_stock_data(ticker: str, fields: list[str] | None = None) -> dict:
+    """
+    Latest stored rows for one ticker, each tagged with its as-of date and
+    age in days.  `fields` is a subset of STOCK_FIELDS (default: all but
+    financials).  Unknown tickers come back with covered=False.
+    """
+    ticker = ticker.strip().upper()
+    fields = fields or ["company", "price", "metrics", "dcf"]
+    unknown = set(fields) - set(STOCK_FIELDS)
+    if unknown:
+        raise ValueError(f"fields must be among {', '.join(STOCK_FIELDS)}")
+
+    started = time.perf_counter()
+    queries = 0
+
+    def load(field):
+        nonlocal queries
+        queries += 1
+        return _load_row(field, ticker)
+
+    # Every ticker we cover has a companies row; look it up first so
+    # uncovered tickers cost one (cached) query instead of one per field
+    company = _cache.get_or_load(("company", ticker), lambda: load("company"))
+    if company is None:
+        return {"ticker": ticker, "covered": False,
+                "message": f"{ticker} is not in the database. Use web_search."}
+
+    data, freshness = {}, {}
+    for field in fields:
+        row = company if field == "company" else _cache.get_or_load(
+            (field, ticker), lambda field=field: load(field)
+        )
+        data[field] = row
+        as_of = row.get(STOCK_FIELDS[field][1]) if row else None
+        freshness[field] = {"as_of": as_of, "age_days": _age_days(as_of)}
+
+    return {
+        "ticker": ticker,
+        "covered": True,
+        "data": data,
+        "freshness": freshness,
+        "queries": queries,
+        "query_ms": round((time.perf_counter() - started) * 1000, 1),
+        "source": "TradvisorAI database (yfinance data, DCF by the bootstrap)",
+    }
@@ -0,0 +1,118 @@
+"""
+Local deterministic DCF engine for the `run_dcf` function tool.
+
+Implements the methodology from prompts.py (Step 4 + Step 5) in plain
+Python so a valuation no longer needs a code_interpreter round trip:
+  - growth fades linearly from the initial rate toward terminal growth
+  - Gordon-growth terminal value on the final projected year
+  - equity value = enterprise value + cash - debt
+  - three scenarios in one call (conservative / base / optimistic)
+
+All rates are decimals (0.12 = 12%).  Runs in microseconds.
+"""
+
+# Scenario adjustments from the system prompt:
+#   Conservative: growth -30%, WACC +1%   Optimistic: growth +20%, WACC -0.5%
+SCENARIOS = {
+    "conservative": {"growth_multiplier": 0.7, "wacc_delta": 0.01},
+    "base": {"growth_multiplier": 1.0, "wacc_delta": 0.0},
+    "optimistic": {"growth_multiplier": 1.2, "wacc_delta": -0.005},
+}
+
+
+def project_fcfe(base_fcfe: float, growth: float, terminal_growth: float, years: int) -> list[dict]:
+    """Year-by-year FCFE with growth fading linearly to the terminal rate."""
+    projection = []
+    fcfe = base_fcfe
+    for year in range(1, years + 1):
+        fade = (years - year) / years
+        year_growth = terminal_growth + (growth - terminal_growth) * fade
+        fcfe = fcfe * (1 + year_growth)
+        projection.append({"year": year, "growth": year_growth, "fcfe": fcfe})
+    return projection
+
+
+def value_scenario(base_fcfe: float, growth: float, wacc: float, terminal_growth: float,
+                   years: int, cash: float, debt: float, shares: float,
+                   current_price: float | None = None) -> dict:
+    """Full DCF for one set of assumptions."""
+    if wacc <= terminal_growth:
+        raise ValueError(f"WACC ({wacc:.2%}) must exceed terminal growth ({terminal_growth:.2%})")
+
+    projection = project_fcfe(base_fcfe, growth, terminal_growth, years)
+    for row in projection:
+        row["pv"] = row["fcfe"] / (1 + wacc) ** row["year"]
+
+    pv_projected = sum(row["pv"] for row in projection)
+    terminal_value = projection[-1]["fcfe"] * (1 + terminal_growth) / (wacc - terminal_growth)
+    pv_terminal = terminal_value / (1 + wacc) ** years
+    enterprise_value = pv_projected + pv_terminal
+
+    # Adjust for net cash/debt
+    equity_value = enterprise_value + cash - debt
+    intrinsic_value = equity_value / shares
+
+    result = {
+        "assumptions": {"growth": growth, "wacc": wacc, "terminal_growth": terminal_growth},
+        "projection": [
+            {
+                "year": row["year"],
+                "growth": round(row["growth"], 4),
+                "fcfe": round(row["fcfe"]),
+                "pv": round(row["pv"]),
+            }
+            for row in projection
+        ],
+        "pv_projected_fcfe": round(pv_projected),
+        "terminal_value": round(terminal_value),
+        "pv_terminal_value": round(pv_terminal),
+        "terminal_value_share": round(pv_terminal / enterprise_value * 100, 1) if enterprise_value else None,
+        "enterprise_value": round(enterprise_value),
+        "equity_value": round(equity_value),
+        "intrinsic_value": round(intrinsic_value, 2),
+    }
+
+    if current_price and current_price > 0:
+        # MoS = (Intrinsic - Price) / Intrinsic × 100
+        result["margin_of_safety"] = (
+            round((intrinsic_value - current_price) / intrinsic_value * 100, 2)
+            if intrinsic_value > 0 else None
+        )
+        result["upside_downside"] = round((intrinsic_value - current_price) / current_price * 100, 2)
+
+    return result
+
+
+def run_dcf(base_fcfe: float, growth: float, wacc: float, shares: float,
+            terminal_growth: float = 0.025, years: int = 10, cash: float = 0.0,
+            debt: float = 0.0, current_price: float | None = None) -> dict:
+    """
+    Value a stock under conservative, base and optimistic scenarios.
+    Returns each scenario's projection, PV breakdown, intrinsic value and
+    (when current_price is given) margin of safety, plus the fair value range.
+    """
+    if shares <= 0:
+        raise ValueError("shares must be positive")
+    if years < 1:
+        raise ValueError("years must be at least 1")
+
+    scenarios = {}
+    for name, adjust in SCENARIOS.items():
+        scenarios[name] = value_scenario(
+            base_fcfe=base_fcfe,
+            growth=growth * adjust["growth_multiplier"],
+            wacc=wacc + adjust["wacc_delta"],
+            terminal_growth=terminal_growth,
+            years=years,
+            cash=cash,
+            debt=debt,
+            shares=shares,
+            current_price=current_price,
+        )
+
+    values = [s["intrinsic_value"] for s in scenarios.values()]
+    return {
+        "scenarios": scenarios,
+        "fair_value_range": [min(values), max(values)],
+        "current_price": current_price,
+    }
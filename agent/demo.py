@@ -9,9 +9,14 @@ Now powered by Grok's built-in tools:
 
 Run:
     python demo.py
+    python demo.py --profile    # per-query time breakdown after each answer
+    python demo.py --conversation <id>    # continue a saved conversation
 """
 
+import argparse
+
 from rich.console import Console
+from rich.live import Live
 from rich.markdown import Markdown
 from rich.panel import Panel
 from rich.table import Table
@@ -20,10 +25,19 @@ from rich import box
 from agent import (
     TradvisorAgent,
     PlanUpdate,
+    PlanDelta,
     ToolCall,
+    ToolResult,
     TextDelta,
+    Retrying,
     Done,
+    apply_plan_event,
 )
+from config import FANOUT
+from conversation import Conversation
+from coordinator import CoordinatorAgent, extract_tickers
+from response_cache import get_response_cache
+from tracing import MemoryExporter, flame_summary, get_tracer
 
 console = Console()
 
@@ -44,7 +58,8 @@ def print_banner():
         '  [cyan]"Find undervalued tech stocks"[/cyan]\n'
         '  [cyan]"Compare AAPL vs MSFT"[/cyan]\n'
         '  [cyan]"What is TSLA\'s fair value?"[/cyan]\n\n'
-        "[dim]Type [bold]quit[/bold] to exit.[/dim]",
+        "[dim]Ask follow-ups in the same chat. Type [bold]new[/bold] to start over, "
+        "[bold]quit[/bold] to exit.[/dim]",
         title="[bold blue] TradvisorAI [/bold blue]",
         subtitle="[dim]Powered by Grok (Responses API)[/dim]",
         border_style="blue",
@@ -53,8 +68,8 @@ def print_banner():
     console.print()
 
 
-def render_plan(plan_data: dict):
-    """Render the execution plan as a table."""
+def plan_table(plan_data: dict) -> Table:
+    """The execution plan as a table."""
     table = Table(
         box=box.ROUNDED,
         border_style="cyan",
@@ -87,8 +102,33 @@ def render_plan(plan_data: dict):
             f"[dim]{result}[/dim]",
         )
 
-    console.print()
-    console.print(table)
+    return table
+
+
+class PlanView:
+    """
+    Live-updating plan panel: one table redrawn in place as plan events
+    arrive, with tool calls printed above it.  Redraws are capped at
+    `refresh_per_second`, so a burst of streamed step changes costs one.
+    """
+
+    def __init__(self, refresh_per_second: float = 8):
+        self.plan: dict | None = None
+        self._live = Live(self, console=console, refresh_per_second=refresh_per_second)
+
+    def update(self, event: PlanUpdate | PlanDelta):
+        self.plan = apply_plan_event(self.plan, event)
+        if not self._live.is_started:
+            console.print()
+            self._live.start()
+
+    def stop(self):
+        """Leave the final plan on screen."""
+        if self._live.is_started:
+            self._live.stop()
+
+    def __rich__(self) -> Table:
+        return plan_table(self.plan or {})
 
 
 def render_tool_call(event: ToolCall):
@@ -109,6 +149,16 @@ def render_tool_call(event: ToolCall):
         )
 
 
+def render_tool_result(event: ToolResult):
+    """Render a finished local function call (timing, or its error)."""
+    if event.name == "update_plan":
+        return
+    if event.error:
+        console.print(f"     [red]x {event.name}: {event.error}[/red]")
+    else:
+        console.print(f"     [dim]done {event.name} ({event.seconds:.2f}s)[/dim]")
+
+
 def render_final_response(text: str):
     """Render the final analysis response."""
     console.print()
@@ -125,40 +175,99 @@ def render_final_response(text: str):
 # ═══════════════════════════════════════════════════════════════
 
 
-def run_query(query: str):
+def render_profile(spans: list):
+    """Render where the query's time went (spans recorded with --profile)."""
+    console.print(Panel(
+        flame_summary(spans),
+        title="[bold] Profile [/bold]",
+        border_style="dim",
+        box=box.ROUNDED,
+    ))
+
+
+def run_query(query: str, conversation: Conversation, profile: bool = False):
     """Run a single query through the agent and display results."""
-    agent = TradvisorAgent()
+    # Coordinator fans multi-ticker queries out to parallel sub-agents
+    # and checks the response cache itself (first message of a chat only)
+    cache = get_response_cache()
+    if FANOUT:
+        events = CoordinatorAgent(response_cache=cache, conversation=conversation).run(query)
+    elif cache is not None and not conversation.history:
+        events = cache.run(query, extract_tickers(query), TradvisorAgent(conversation=conversation).run)
+    else:
+        events = TradvisorAgent(conversation=conversation).run(query)
+    events = conversation.record(query, events)
     collected_text = ""
 
+    recorder = MemoryExporter() if profile else None
+    if recorder is not None:
+        get_tracer().add_exporter(recorder)
+
     console.print()
     console.print("[bold blue]Agent working...[/bold blue]")
 
-    for event in agent.run(query):
-        if isinstance(event, PlanUpdate):
-            render_plan({
-                "task_summary": event.task_summary,
-                "steps": event.steps,
-                "is_complete": event.is_complete,
-            })
-
-        elif isinstance(event, ToolCall):
-            render_tool_call(event)
-
-        elif isinstance(event, TextDelta):
-            collected_text += event.content
-
-        elif isinstance(event, Done):
-            if collected_text:
-                render_final_response(collected_text)
-            console.print()
-            console.print(
-                f"[dim]Completed in {event.iterations} iteration(s)[/dim]"
-            )
+    plan_view = PlanView()
+    try:
+        for event in events:
+            if isinstance(event, (PlanUpdate, PlanDelta)):
+                plan_view.update(event)
+
+            elif isinstance(event, ToolCall):
+                render_tool_call(event)
+
+            elif isinstance(event, ToolResult):
+                render_tool_result(event)
+
+            elif isinstance(event, TextDelta):
+                collected_text += event.content
+
+            elif isinstance(event, Retrying):
+                collected_text = collected_text[:len(collected_text) - event.discard_chars]
+                console.print(
+                    f"  [yellow]Retrying ({event.attempt}) in {event.delay:.1f}s[/yellow] [dim]{event.error}[/dim]"
+                )
+
+            elif isinstance(event, Done):
+                plan_view.stop()
+                if collected_text:
+                    render_final_response(collected_text)
+                console.print()
+                summary = f"Completed in {event.iterations} iteration(s)"
+                if event.cached:
+                    summary += " · replayed from cache"
+                elif event.ttft is not None:
+                    summary += f" · first token after {event.ttft:.2f}s"
+                if event.usage is not None and not event.cached:
+                    summary += f" · {event.usage.summary()}"
+                    if len(event.usage.turns) > 1:
+                        ratios = " ".join(f"{turn.cached_ratio:.0%}" for turn in event.usage.turns)
+                        summary += f" · prompt cache per turn: {ratios}"
+                if cache is not None:
+                    summary += f" · response cache: {cache.report()}"
+                console.print(f"[dim]{summary}[/dim]")
+                if event.budget_exceeded:
+                    console.print(f"[yellow]Stopped early: {event.budget_exceeded} reached[/yellow]")
+    finally:
+        plan_view.stop()
+        if recorder is not None:
+            get_tracer().remove_exporter(recorder)
+            render_profile(recorder.take_all())
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="TradvisorAI terminal demo")
+    parser.add_argument("--profile", action="store_true",
+                        help="Print a per-query time breakdown (model turns, server tools, local functions)")
+    parser.add_argument("--conversation", metavar="ID",
+                        help="Continue a conversation saved in the database")
+    return parser.parse_args()
 
 
 def main():
     """Main interactive loop."""
+    args = parse_args()
     print_banner()
+    conversation = Conversation.load(args.conversation) if args.conversation else Conversation()
 
     while True:
         try:
@@ -168,10 +277,16 @@ def main():
             if not query:
                 continue
             if query.lower() in ("quit", "exit", "q"):
+                if conversation.persist and conversation.runs:
+                    console.print(f"[dim]Saved. Continue with --conversation {conversation.id}[/dim]")
                 console.print("[dim]Goodbye![/dim]")
                 break
+            if query.lower() == "new":
+                conversation = Conversation()
+                console.print("[dim]Started a new conversation.[/dim]")
+                continue
 
-            run_query(query)
+            run_query(query, conversation, profile=args.profile)
 
         except KeyboardInterrupt:
             console.print("\n[dim]Interrupted. Type 'quit' to exit.[/dim]")
@@ -0,0 +1,64 @@
+"""
+Per-query methodology selection for the system prompt.
+
+The full methodology (DCF walkthrough, PE cross-check, moat framework,
+output format) is several thousand tokens, and "What's AAPL's PE?" needs
+none of the DCF part.  A local classifier (regexes, no model call) puts the
+query in a class, and the class decides which METHODOLOGY sections are sent
+after CORE_PROMPT.  Queries that match no class get every section.  Anything
+left out can still be fetched with the load_methodology tool.
+
+Sections always go in METHODOLOGY order, in a system message after the core
+prompt, so the cached prefix (tools + CORE_PROMPT) is the same for every
+query and queries of one class share a longer one.
+"""
+
+import re
+
+from prompts import CORE_PROMPT, METHODOLOGY, SYSTEM_PROMPT, methodology_prompt
+
+ALL_SECTIONS = tuple(METHODOLOGY)
+
+# (class, pattern, sections); the first match wins
+QUERY_CLASSES = [
+    ("screening", re.compile(r"\b(find|screen|list|top|best|cheapest)\b.*\bstocks?\b", re.IGNORECASE),
+     ("pe", "report")),
+    ("compare", re.compile(r"\b(vs\.?|versus|compare|comparison|which is better)\b", re.IGNORECASE),
+     ALL_SECTIONS),
+    ("valuation", re.compile(
+        r"\b(analy[sz]e|analysis|valuation|value|valued|worth|fair|intrinsic|dcf|undervalued|"
+        r"overvalued|cheap|expensive|price target|upside|margin of safety|monte carlo|buy|sell|hold)\b",
+        re.IGNORECASE,
+    ), ALL_SECTIONS),
+    ("moat", re.compile(r"\b(moat|competitive advantage|competition|risks?|bear case)\b", re.IGNORECASE),
+     ("moat",)),
+    ("metric", re.compile(
+        r"\b(p/?e|peg|eps|earnings|multiples?|ratios?|margins?|roe|yield|dividends?|"
+        r"price|market cap|revenue|growth)\b",
+        re.IGNORECASE,
+    ), ("pe",)),
+]
+
+
+def classify_query(query: str) -> tuple[str, tuple]:
+    """(query class, methodology sections) for a user query."""
+    for name, pattern, sections in QUERY_CLASSES:
+        if pattern.search(query):
+            return name, sections
+    return "general", ALL_SECTIONS
+
+
+def system_messages(sections: tuple | None) -> list:
+    """System messages for a new chain: the full prompt when `sections` is None."""
+    if sections is None:
+        return [{"role": "system", "content": SYSTEM_PROMPT}]
+    messages = [{"role": "system", "content": CORE_PROMPT}]
+    if sections:
+        messages.append({"role": "system", "content": methodology_prompt(sections)})
+    return messages
+
+
+def tokens_saved(sections: tuple) -> int:
+    """Rough prompt tokens left out (~4 characters per token)."""
+    omitted = [name for name in METHODOLOGY if name not in sections]
+    return len(methodology_prompt(omitted)) // 4
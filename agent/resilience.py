@@ -0,0 +1,324 @@
+"""
+Retry, backoff, hedging and circuit breaking for Responses API calls.
+
+One transient 429 or 5xx used to end a whole analysis with "API Error",
+throwing away every earlier iteration.  The agents now run each model turn
+through a Resilience policy:
+
+  - Retries: retryable failures (429, 408/409, 5xx, connection errors and
+    dropped streams) are retried up to RETRY_MAX_ATTEMPTS times with
+    full-jitter exponential backoff.  A Retry-After (or retry-after-ms)
+    header sets the minimum wait, capped at RETRY_AFTER_MAX.
+  - Resume: a retried turn is re-sent with the previous_response_id of the
+    last turn that completed, so earlier iterations are kept (see
+    TradvisorAgent._turn).
+  - Hedging (HEDGE=true, non-streamed turns only): when a call is slower
+    than the HEDGE_PERCENTILE of recent latencies, a duplicate request is
+    sent and the first response wins.  The slower one still runs to
+    completion and is billed.
+  - Circuit breaker: after BREAKER_FAILURES consecutive failures, calls fail
+    fast for BREAKER_COOLDOWN seconds, then one trial call decides whether
+    to close the circuit again.
+
+The OpenAI SDK's own retries are turned off for the shared clients
+(clients.py) so failures are not retried twice.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from email.utils import parsedate_to_datetime
+
+import httpx
+from openai import APIConnectionError, APIStatusError
+
+from config import (
+    RETRY_MAX_ATTEMPTS,
+    RETRY_BASE_DELAY,
+    RETRY_MAX_DELAY,
+    RETRY_AFTER_MAX,
+    HEDGE,
+    HEDGE_PERCENTILE,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_MIN_DELAY,
+    BREAKER_FAILURES,
+    BREAKER_COOLDOWN,
+)
+
+RETRYABLE_STATUS = {408, 409, 429}
+
+
+class CircuitOpenError(RuntimeError):
+    """The provider failed repeatedly; calls are refused until the cooldown ends."""
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, APIStatusError):
+        return error.status_code in RETRYABLE_STATUS or error.status_code >= 500
+    # Connection resets, timeouts and streams cut off mid-response
+    return isinstance(error, (APIConnectionError, httpx.TransportError))
+
+
+def retry_after(error: Exception) -> float | None:
+    """Seconds the server asked us to wait, if it said."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed → open (cooldown) → half-open trial."""
+
+    def __init__(self, failures: int = BREAKER_FAILURES, cooldown: float = BREAKER_COOLDOWN):
+        self.failures = failures
+        self.cooldown = cooldown
+        self._consecutive = 0
+        self._opened_at: float | None = None
+        self._trial = False
+        self._trial_at = 0.0
+        self._lock = threading.Lock()
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def check(self) -> float | None:
+        """
+        Raise CircuitOpenError unless a call may go out now.  Returns a token
+        when this call is the half-open trial (see guard()), else None.
+        """
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return None
+            now = time.monotonic()
+            # A trial older than the cooldown was never settled; let a new call probe
+            if state == "half-open" and (not self._trial or now - self._trial_at >= self.cooldown):
+                self._trial = True  # let exactly one call probe the provider
+                self._trial_at = now
+                return now
+            wait_for = max(0.0, self.cooldown - (now - self._opened_at))
+        raise CircuitOpenError(f"API circuit open after repeated failures; retry in {wait_for:.0f}s")
+
+    @contextmanager
+    def guard(self):
+        """
+        check() around a call.  A trial that ends without record_success() or
+        record_failure(), e.g. on a non-retryable error or a closed stream,
+        reopens the circuit instead of leaving it stuck half-open.
+        """
+        trial = self.check()
+        try:
+            yield
+        finally:
+            if trial is not None:
+                with self._lock:
+                    if self._trial and self._trial_at == trial:
+                        self.opened += 1
+                        self._opened_at = time.monotonic()
+                        self._trial = False
+
+    def record_success(self):
+        with self._lock:
+            self._consecutive = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive += 1
+            if self._trial or self._consecutive >= self.failures:
+                if self._opened_at is None or self._trial:
+                    self.opened += 1
+                self._opened_at = time.monotonic()
+                self._trial = False
+
+
+class Resilience:
+    """Retry / hedge / breaker policy shared by every agent in the process."""
+
+    def __init__(self, max_attempts: int = RETRY_MAX_ATTEMPTS, base_delay: float = RETRY_BASE_DELAY,
+                 max_delay: float = RETRY_MAX_DELAY, retry_after_max: float = RETRY_AFTER_MAX,
+                 hedge: bool = HEDGE, hedge_percentile: float = HEDGE_PERCENTILE,
+                 hedge_min_samples: int = HEDGE_MIN_SAMPLES, hedge_min_delay: float = HEDGE_MIN_DELAY,
+                 breaker: CircuitBreaker | None = None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_after_max = retry_after_max
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_min_delay = hedge_min_delay
+        self.breaker = breaker or CircuitBreaker()
+        self._latencies: deque = deque(maxlen=200)
+        self._lock = threading.Lock()
+        self._pool: ThreadPoolExecutor | None = None
+        self.retries = 0
+        self.hedges = 0
+        self.hedges_won = 0
+
+    # ── retries ─────────────────────────────────────────────
+
+    def backoff(self, error: Exception, attempt: int) -> float | None:
+        """
+        Record a failed call.  Returns the delay before retry `attempt + 1`,
+        or None when the error is not retryable or attempts are used up.
+        """
+        if isinstance(error, CircuitOpenError):
+            return None
+        retryable = is_retryable(error)
+        if retryable:
+            self.breaker.record_failure()
+        if not retryable or attempt >= self.max_attempts:
+            return None
+
+        # Full jitter: uniform over [0, base * 2^attempt], capped
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        requested = retry_after(error)
+        if requested is not None:
+            delay = max(delay, min(requested, self.retry_after_max))
+        with self._lock:
+            self.retries += 1
+        return delay
+
+    def record_success(self, seconds: float | None = None):
+        self.breaker.record_success()
+        if seconds is not None:
+            with self._lock:
+                self._latencies.append(seconds)
+
+    # ── hedging ─────────────────────────────────────────────
+
+    def hedge_delay(self) -> float | None:
+        """Latency after which a duplicate request is sent, or None (not hedging)."""
+        if not self.hedge:
+            return None
+        with self._lock:
+            if len(self._latencies) < self.hedge_min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.hedge_percentile / 100))
+        return max(self.hedge_min_delay, ordered[index])
+
+    def call(self, fn):
+        """fn() with the breaker check and, when enabled, a hedged duplicate."""
+        with self.breaker.guard():
+            result = self._hedged_call(fn)
+            self.breaker.record_success()
+        return result
+
+    def _hedged_call(self, fn):
+        threshold = self.hedge_delay()
+        if threshold is None:
+            return fn()
+
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="hedge")
+        primary = self._pool.submit(fn)
+        done, _ = wait([primary], timeout=threshold)
+        if done:
+            return primary.result()
+
+        with self._lock:
+            self.hedges += 1
+        backup = self._pool.submit(fn)
+        pending = {primary, backup}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is backup:
+                        with self._lock:
+                            self.hedges_won += 1
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    async def acall(self, fn):
+        """Async version of call(); fn() returns an awaitable."""
+        with self.breaker.guard():
+            result = await self._hedged_acall(fn)
+            self.breaker.record_success()
+        return result
+
+    async def _hedged_acall(self, fn):
+        threshold = self.hedge_delay()
+        if threshold is None:
+            return await fn()
+
+        primary = asyncio.ensure_future(fn())
+        done, _ = await asyncio.wait({primary}, timeout=threshold)
+        if done:
+            return primary.result()
+
+        with self._lock:
+            self.hedges += 1
+        backup = asyncio.ensure_future(fn())
+        pending = {primary, backup}
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is backup:
+                        with self._lock:
+                            self.hedges_won += 1
+                    for other in pending:
+                        other.cancel()
+                    return task.result()
+                error = task.exception()
+        raise error
+
+    def stats(self) -> dict:
+        return {
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedges_won": self.hedges_won,
+            "breaker": self.breaker.state,
+            "breaker_opened": self.breaker.opened,
+            "hedge_after": self.hedge_delay(),
+        }
+
+
+_shared: Resilience | None = None
+_shared_lock = threading.Lock()
+
+
+def get_resilience() -> Resilience:
+    """Process-wide policy, so the breaker sees every agent's failures."""
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = Resilience()
+    return _shared
@@ -0,0 +1,223 @@
+"""
+Response cache for repeated analysis queries.
+
+"Analyze NVDA" and "What is NVDA's fair value?" asked within the same hour
+produce the same research: plan, searches, DCF, answer.  Instead of running
+the whole agent loop again, the second query replays the first one's event
+stream (plan updates, tool calls, text) straight from memory.
+
+Queries are keyed on a normalized intent, not their wording:
+  - the ticker set (order-insensitive)
+  - the analysis type (INTENTS; queries matching none are not cached)
+  - a data-freshness bucket: each ticker's stored DCF valuation_date when the
+    stock database is configured, otherwise today's date
+Each entry also records the dcf_valuations row it was built on (date,
+creation time, intrinsic value, price), read from the database on every
+lookup rather than through db.py's cache.  If that row has changed since,
+e.g. the bootstrap repriced it, the entry is dropped and the query runs
+live.  When the lookup fails, the query runs live and is not cached.
+
+Queries with explicit numbers ("assume 8% WACC") or news/time words are
+never cached, and neither are runs that ended on an error or were cut short
+by a budget.
+
+Entries expire after RESPONSE_CACHE_TTL seconds; the least recently used are
+evicted beyond RESPONSE_CACHE_SIZE.
+"""
+
+import dataclasses
+import re
+import threading
+import time
+from datetime import date
+from typing import Callable, Generator
+
+import db
+from agent import Done, PlanDelta, PlanUpdate, Retrying, TextDelta, apply_plan_event, diff_plan
+from cache import TTLCache
+from config import PLAN_DELTAS, RESPONSE_CACHE, RESPONSE_CACHE_TTL, RESPONSE_CACHE_SIZE
+from usage import Usage
+
+# Analysis types, most specific first; the first match wins
+INTENTS = [
+    ("compare", re.compile(r"\b(vs\.?|versus|compare|comparison|which is better)\b", re.IGNORECASE)),
+    ("dividend", re.compile(r"\b(dividends?|payout|yield)\b", re.IGNORECASE)),
+    ("earnings", re.compile(r"\b(earnings|eps|guidance|quarterly results)\b", re.IGNORECASE)),
+    ("risk", re.compile(r"\b(risks?|bear case|downside|moat)\b", re.IGNORECASE)),
+    ("valuation", re.compile(
+        r"\b(analy[sz]e|analysis|valuation|value|valued|worth|fair|intrinsic|dcf|"
+        r"undervalued|overvalued|cheap|expensive|price target|buy|sell|hold|outlook)\b",
+        re.IGNORECASE,
+    )),
+]
+
+# Answers to these depend on more than the stored data
+_UNCACHEABLE = re.compile(
+    r"\d|%|\b(news|today|latest|this week|right now|assum\w*|what if|if)\b", re.IGNORECASE
+)
+
+
+def classify_intent(query: str) -> str | None:
+    """Analysis type of a query, or None when it should not be cached."""
+    if _UNCACHEABLE.search(query):
+        return None
+    for name, pattern in INTENTS:
+        if pattern.search(query):
+            return name
+    return None
+
+
+def _dcf_fingerprint(tickers: list[str]) -> tuple | None:
+    """
+    (ticker, valuation_date, created_at, intrinsic_value, current_price) per
+    ticker, all None for tickers without a valuation.  Read past db.py's
+    cache, so a rewritten valuation shows up at once.  None when the lookup
+    fails: the query then runs live and is not cached.
+    """
+    if not db.available():
+        return tuple((ticker, None, None, None, None) for ticker in tickers)
+    rows = []
+    for ticker in tickers:
+        try:
+            dcf = db.latest_valuation(ticker) or {}
+        except Exception:
+            return None
+        rows.append((ticker, dcf.get("valuation_date"), dcf.get("created_at"),
+                     dcf.get("intrinsic_value"), dcf.get("current_price")))
+    return tuple(rows)
+
+
+def _compact(events: list) -> list:
+    """
+    Merge runs of text deltas, fold consecutive plan events into one, and
+    drop retried attempts' text along with their Retrying events.
+    """
+    compacted = []
+    plan = run_start = None  # the plan after the last event / before the current run of plan events
+    for event in events:
+        previous = compacted[-1] if compacted else None
+        if isinstance(event, (PlanUpdate, PlanDelta)):
+            if isinstance(previous, (PlanUpdate, PlanDelta)):
+                compacted.pop()
+            else:
+                run_start = plan
+            plan = apply_plan_event(plan, event)
+            merged = diff_plan(run_start if PLAN_DELTAS else None, plan)
+            if merged is not None:
+                compacted.append(merged)
+        elif isinstance(event, Retrying):
+            discard = event.discard_chars
+            while discard and compacted and isinstance(compacted[-1], TextDelta):
+                text = compacted.pop().content
+                if len(text) > discard:
+                    compacted.append(TextDelta(text[:len(text) - discard]))
+                discard = max(0, discard - len(text))
+        elif isinstance(event, TextDelta) and isinstance(previous, TextDelta):
+            compacted[-1] = TextDelta(previous.content + event.content)
+        else:
+            compacted.append(event)
+    return compacted
+
+
+class ResponseCache:
+    """Intent-keyed cache of complete agent event streams."""
+
+    def __init__(self, ttl: float = RESPONSE_CACHE_TTL, maxsize: int = RESPONSE_CACHE_SIZE):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.saved_seconds = 0.0
+
+    def key(self, query: str, tickers: list[str]) -> tuple | None:
+        intent = classify_intent(query)
+        if intent is None or not tickers:
+            return None
+        return tuple(sorted(set(tickers))), intent
+
+    def run(self, query: str, tickers: list[str], runner: Callable[[str], Generator]) -> Generator:
+        """
+        Events for `query`: replayed from the cache when an equivalent query
+        was answered recently, otherwise produced by runner(query) and stored.
+        """
+        intent_key = self.key(query, tickers)
+        if intent_key is None:
+            yield from runner(query)
+            return
+
+        fingerprint = _dcf_fingerprint(list(intent_key[0]))
+        if fingerprint is None:
+            yield from runner(query)
+            return
+        bucket = tuple(valuation_date or date.today().isoformat() for _, valuation_date, *_ in fingerprint)
+        key = intent_key + (bucket,)
+
+        entry = self._entries.get(key)
+        if entry is not None and entry["fingerprint"] != fingerprint:
+            self._entries.pop(key)
+            entry = None
+            with self._lock:
+                self.invalidations += 1
+
+        if entry is not None:
+            with self._lock:
+                self.hits += 1
+                self.saved_seconds += entry["seconds"]
+            for event in entry["events"]:
+                if isinstance(event, Done):
+                    # A replay costs no tokens
+                    event = dataclasses.replace(event, ttft=0.0, cached=True, usage=Usage())
+                yield event
+            return
+
+        with self._lock:
+            self.misses += 1
+        started = time.perf_counter()
+        events = []
+        for event in runner(query):
+            events.append(event)
+            yield event
+
+        done = events[-1] if events else None
+        if isinstance(done, Done) and done.error is None and done.budget_exceeded is None:
+            self._entries.set(key, {
+                "events": _compact(events),
+                "fingerprint": fingerprint,
+                "seconds": time.perf_counter() - started,
+            })
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "saved_seconds": round(self.saved_seconds, 1),
+            "entries": len(self._entries),
+        }
+
+    def report(self) -> str:
+        stats = self.stats()
+        return (f"{stats['hits']} hits / {stats['misses']} misses ({stats['hit_rate']:.0%}), "
+                f"{stats['invalidations']} invalidated, {stats['saved_seconds']:.1f}s saved")
+
+    def clear(self):
+        self._entries.clear()
+
+
+_shared: ResponseCache | None = None
+_shared_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache | None:
+    """Process-wide response cache, or None when RESPONSE_CACHE is off."""
+    global _shared
+    if not RESPONSE_CACHE:
+        return None
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = ResponseCache()
+    return _shared
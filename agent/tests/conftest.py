@@ -0,0 +1,9 @@
+import os
+import sys
+from pathlib import Path
+
+# Modules import each other as top-level names (run from agent/)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# config.py reads these at import time
+os.environ.setdefault("XAI_API_KEY", "test")
@@ -0,0 +1,161 @@
+import json
+import random
+
+import pytest
+
+from agent import PlanDelta, PlanUpdate, apply_plan_event, diff_plan, parse_partial_json
+
+
+def plan(*steps, summary="Value NVDA", complete=False) -> dict:
+    return {"task_summary": summary, "steps": [dict(step) for step in steps], "is_complete": complete}
+
+
+def step(step_id, status="pending", **fields) -> dict:
+    return {"id": step_id, "description": f"Step {step_id}", "status": status, **fields}
+
+
+def assert_round_trip(old, new):
+    event = diff_plan(old, new)
+    if event is None:
+        assert old == new
+    else:
+        assert apply_plan_event(old, event) == new
+    return event
+
+
+def test_run_of_plans_round_trips_through_deltas():
+    plans = [
+        plan(step(1), step(2)),
+        plan(step(1, "in_progress"), step(2)),
+        plan(step(1, "completed", result="FCFE $60B"), step(2, "in_progress")),
+        plan(step(1, "completed", result="FCFE $60B"), step(2, "in_progress"), step(3)),
+        plan(step(1, "completed", result="FCFE $60B"), step(3, "in_progress")),
+        plan(step(1, "completed", result="FCFE $60B"), step(3, "completed", result=None),
+             summary="Value NVDA and AMD", complete=True),
+    ]
+    current = None
+    for new in plans:
+        event = assert_round_trip(current, new)
+        assert isinstance(event, PlanUpdate if current is None else PlanDelta)
+        current = apply_plan_event(current, event)
+    assert current == plans[-1]
+
+
+def test_delta_carries_only_what_changed():
+    old = plan(step(1), step(2))
+    new = plan(step(1, "completed", result="done"), step(2), step(3))
+    assert diff_plan(old, new) == PlanDelta(
+        added=[step(3)], changed=[{"id": 1, "status": "completed", "result": "done"}],
+    )
+    assert diff_plan(new, plan(step(1, "completed", result="done"), step(3))) == PlanDelta(removed=[2])
+    assert diff_plan(new, json.loads(json.dumps(new))) is None
+
+
+@pytest.mark.parametrize("new", [
+    plan(step(2), step(1)),                                  # reordered
+    plan(step(1), step(3), step(2)),                         # inserted in the middle
+    plan(step(1), step(1)),                                  # duplicate ids
+    plan({"description": "no id", "status": "pending"}),     # missing id
+    plan(step(1), {k: v for k, v in step(2).items() if k != "status"}),  # field dropped
+])
+def test_unmatchable_plans_fall_back_to_a_snapshot(new):
+    event = assert_round_trip(plan(step(1), step(2)), new)
+    assert isinstance(event, PlanUpdate)
+
+
+def test_events_are_not_aliased_to_the_plan():
+    old, new = plan(step(1)), plan(step(1, "completed"), step(2))
+    event = diff_plan(old, new)
+    new["steps"][1]["status"] = "skipped"
+    assert apply_plan_event(old, event)["steps"][1]["status"] == "pending"
+
+
+def mutate(current: dict, rng: random.Random) -> dict:
+    new = json.loads(json.dumps(current))
+    steps = new["steps"]
+    for _ in range(rng.randint(0, 3)):
+        action = rng.choice(["status", "result", "drop", "append", "remove", "insert", "swap",
+                             "summary", "complete", "none_field"])
+        target = rng.choice(steps) if steps else None
+        if action == "status" and target:
+            target["status"] = rng.choice(["pending", "in_progress", "completed", "skipped"])
+        elif action == "result" and target:
+            target["result"] = rng.choice(["ok", "FCFE $60B", ""])
+        elif action == "drop" and target and len(target) > 1:
+            target.pop(rng.choice([key for key in target if key != "id"]))
+        elif action == "none_field" and target:
+            target["note"] = None
+        elif action == "append":
+            steps.append(step(max([s["id"] for s in steps], default=0) + 1))
+        elif action == "remove" and steps:
+            steps.remove(target)
+        elif action == "insert" and steps:
+            steps.insert(rng.randrange(len(steps)), step(max(s["id"] for s in steps) + 1))
+        elif action == "swap" and len(steps) > 1:
+            i, j = rng.sample(range(len(steps)), 2)
+            steps[i], steps[j] = steps[j], steps[i]
+        elif action == "summary":
+            new["task_summary"] = rng.choice(["Value NVDA", "Value NVDA and AMD"])
+        elif action == "complete":
+            new["is_complete"] = not new["is_complete"]
+    return new
+
+
+def test_random_plan_sequences_round_trip():
+    rng = random.Random(7)
+    for _ in range(200):
+        old, current = None, plan(step(1), step(2))
+        for _ in range(15):
+            assert_round_trip(old, current)
+            old, current = current, mutate(current, rng)
+
+
+# ── parse_partial_json ──────────────────────────────────────────
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("", None),
+    ("{", {}),
+    ('{"task_summary": "Value NV', {"task_summary": "Value NV"}),
+    ('{"steps": [{"id": 1, "descr', {"steps": [{"id": 1}]}),
+    ('{"steps": [{"id": 1}, {"id": 2, "status": "pend', {"steps": [{"id": 1}, {"id": 2, "status": "pend"}]}),
+    ('{"steps": [1, 2', {"steps": [1, 2]}),
+    ('{"a": 1, "b": ', {"a": 1}),
+    ('{"a": 1, "is_complete": tr', {"a": 1}),
+    ('{"a": "say \\"hi', {"a": 'say "hi'}),
+    ('{"a": "line\\', {"a": "line"}),            # cut inside an escape
+    ('{"a": "caf\\u00', {"a": "caf"}),           # cut inside a \u escape
+    ('{"a": "C:\\\\', {"a": "C:\\"}),            # complete escaped backslash
+    ('{"a": {"b": [true, null]}}', {"a": {"b": [True, None]}}),
+])
+def test_parse_partial_json(text, expected):
+    assert parse_partial_json(text) == expected
+
+
+def test_every_prefix_of_streamed_arguments_parses_to_a_prefix_of_the_plan():
+    full = {
+        "task_summary": 'Value "NVDA"\nwith a café-style DCF',
+        "steps": [
+            {"id": 1, "description": "Get FCFE\tand net debt", "status": "completed", "result": "ok \\ done"},
+            {"id": 2, "description": "Run the DCF (WACC 9%)", "status": "in_progress"},
+        ],
+        "is_complete": False,
+    }
+    arguments = json.dumps(full)
+    assert "\\u00e9" in arguments  # ensure_ascii: escapes can be cut mid-way
+
+    for end in range(1, len(arguments) + 1):
+        partial = parse_partial_json(arguments[:end])
+        assert isinstance(partial, dict), arguments[:end]
+        for key, value in partial.items():
+            if key == "steps":
+                for index, partial_step in enumerate(value):
+                    for field, field_value in partial_step.items():
+                        expected = full["steps"][index][field]
+                        assert expected.startswith(field_value) if isinstance(expected, str) \
+                            else field_value == expected
+            elif isinstance(full[key], str):
+                assert full[key].startswith(value)
+            else:
+                assert value == full[key]
+    assert parse_partial_json(arguments) == full
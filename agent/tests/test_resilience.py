@@ -0,0 +1,63 @@
+import time
+
+import httpx
+import pytest
+from openai import BadRequestError
+
+from resilience import CircuitBreaker, CircuitOpenError, Resilience
+
+
+def bad_request() -> BadRequestError:
+    request = httpx.Request("POST", "https://api.example/v1/responses")
+    return BadRequestError("bad request", response=httpx.Response(400, request=request), body=None)
+
+
+def opened_breaker(cooldown: float = 0.05) -> CircuitBreaker:
+    breaker = CircuitBreaker(failures=1, cooldown=cooldown)
+    breaker.record_failure()
+    assert breaker.state == "open"
+    return breaker
+
+
+def test_non_retryable_trial_reopens_the_circuit():
+    breaker = opened_breaker()
+    resilience = Resilience(max_attempts=2, breaker=breaker)
+    time.sleep(0.06)
+    assert breaker.state == "half-open"
+
+    with pytest.raises(BadRequestError):
+        resilience.call(lambda: (_ for _ in ()).throw(bad_request()))
+    assert resilience.backoff(bad_request(), 0) is None  # not retryable: no record_failure()
+
+    # The failed trial reopened the circuit for another cooldown...
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    # ...after which a new trial may go out and close it
+    time.sleep(0.06)
+    assert resilience.call(lambda: "ok") == "ok"
+    assert breaker.state == "closed"
+
+
+def test_abandoned_streamed_trial_reopens_the_circuit():
+    breaker = opened_breaker()
+    time.sleep(0.06)
+
+    def stream():
+        with breaker.guard():
+            yield "event"
+
+    events = stream()
+    next(events)
+    events.close()  # consumer went away mid-stream
+    assert breaker.state == "open"
+
+
+def test_stale_trial_allows_a_new_probe():
+    breaker = opened_breaker()
+    time.sleep(0.06)
+    assert breaker.check() is not None  # trial never settled
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    time.sleep(0.06)
+    assert breaker.check() is not None
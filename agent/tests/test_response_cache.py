@@ -0,0 +1,129 @@
+import pytest
+
+import db
+from agent import Done, TextDelta
+from response_cache import ResponseCache, classify_intent
+
+
+@pytest.fixture
+def valuations(monkeypatch):
+    """ticker -> latest dcf_valuations row, served as the database would"""
+    rows = {"NVDA": {"valuation_date": "2026-10-01", "created_at": "2026-10-01T06:00:00",
+                     "intrinsic_value": 120.0, "current_price": 100.0}}
+    monkeypatch.setattr(db, "available", lambda: True)
+    monkeypatch.setattr(db, "latest_valuation", lambda ticker: rows.get(ticker))
+    return rows
+
+
+class Runner:
+    """Stands in for the agent loop; counts live runs"""
+
+    def __init__(self, error=None):
+        self.runs = 0
+        self.error = error
+
+    def __call__(self, query):
+        self.runs += 1
+        yield TextDelta("NVDA looks ")
+        yield TextDelta("fairly valued.")
+        yield Done(iterations=2, plan=None, ttft=1.5, error=self.error)
+
+
+def answer(cache, query, tickers, runner):
+    events = list(cache.run(query, tickers, runner))
+    return "".join(e.content for e in events if isinstance(e, TextDelta)), events[-1]
+
+
+@pytest.mark.parametrize("query, intent", [
+    ("Analyze NVDA", "valuation"),
+    ("What is NVDA's fair value?", "valuation"),
+    ("Is NVDA overvalued?", "valuation"),
+    ("NVDA vs AMD", "compare"),
+    ("Compare the dividend of KO and PEP", "compare"),
+    ("How safe is KO's dividend?", "dividend"),
+    ("What are the main risks for NVDA?", "risk"),
+    ("Tell me a joke about NVDA", None),
+])
+def test_intent_classification(query, intent):
+    assert classify_intent(query) == intent
+
+
+def test_equivalent_queries_share_a_key():
+    cache = ResponseCache()
+    assert cache.key("Analyze NVDA", ["NVDA"]) == cache.key("What is NVDA's fair value?", ["NVDA"])
+    assert cache.key("Compare AAPL and MSFT", ["MSFT", "AAPL", "AAPL"]) == cache.key(
+        "AAPL versus MSFT", ["AAPL", "MSFT"])
+    assert cache.key("Analyze NVDA", ["NVDA"]) != cache.key("NVDA risks", ["NVDA"])
+    assert cache.key("Analyze the market", []) is None
+
+
+@pytest.mark.parametrize("query", [
+    "Analyze NVDA assuming 8% WACC",
+    "What is NVDA worth at a 10 percent discount rate?",
+    "Latest NVDA news",
+    "Is NVDA a buy today?",
+    "What if NVDA's growth slows, is it still undervalued?",
+])
+def test_uncacheable_queries_always_run_live(query, monkeypatch):
+    monkeypatch.setattr(db, "latest_valuation", lambda ticker: pytest.fail("looked up"))
+    cache, runner = ResponseCache(), Runner()
+    assert classify_intent(query) is None
+    answer(cache, query, ["NVDA"], runner)
+    answer(cache, query, ["NVDA"], runner)
+    assert runner.runs == 2
+    assert cache.stats()["misses"] == 0 and cache.stats()["entries"] == 0
+
+
+def test_equivalent_query_is_replayed(valuations):
+    cache, runner = ResponseCache(), Runner()
+    live = answer(cache, "Analyze NVDA", ["NVDA"], runner)
+    replay = answer(cache, "What is NVDA's fair value?", ["NVDA"], runner)
+
+    assert runner.runs == 1
+    assert replay[0] == live[0] == "NVDA looks fairly valued."
+    assert replay[1].cached and replay[1].ttft == 0.0
+    assert cache.stats()["hits"] == 1
+
+
+def test_rewritten_valuation_invalidates_the_answer(valuations):
+    cache, runner = ResponseCache(), Runner()
+    answer(cache, "Analyze NVDA", ["NVDA"], runner)
+
+    # The bootstrap repriced today's row (same valuation_date, new values)
+    valuations["NVDA"] = {**valuations["NVDA"], "created_at": "2026-10-01T18:00:00", "current_price": 110.0}
+    answer(cache, "Analyze NVDA", ["NVDA"], runner)
+    assert runner.runs == 2
+    assert cache.stats()["invalidations"] == 1
+
+    answer(cache, "Analyze NVDA", ["NVDA"], runner)
+    assert runner.runs == 2  # the new answer is cached
+
+
+def test_new_valuation_row_is_not_answered_from_the_old_one(valuations):
+    cache, runner = ResponseCache(), Runner()
+    answer(cache, "Analyze NVDA", ["NVDA"], runner)
+
+    valuations["NVDA"] = {"valuation_date": "2026-10-02", "created_at": "2026-10-02T06:00:00",
+                          "intrinsic_value": 118.0, "current_price": 104.0}
+    answer(cache, "Analyze NVDA", ["NVDA"], runner)
+    assert runner.runs == 2
+    assert cache.stats()["hits"] == 0
+
+
+def test_failed_lookup_runs_live_without_caching(monkeypatch):
+    def unavailable(ticker):
+        raise ConnectionError("database down")
+
+    monkeypatch.setattr(db, "available", lambda: True)
+    monkeypatch.setattr(db, "latest_valuation", unavailable)
+    cache, runner = ResponseCache(), Runner()
+    answer(cache, "Analyze NVDA", ["NVDA"], runner)
+    answer(cache, "Analyze NVDA", ["NVDA"], runner)
+    assert runner.runs == 2 and cache.stats()["entries"] == 0
+
+
+def test_failed_runs_are_not_cached(valuations):
+    cache, runner = ResponseCache(), Runner(error="rate limited")
+    answer(cache, "Analyze NVDA", ["NVDA"], runner)
+    answer(cache, "Analyze NVDA", ["NVDA"], runner)
+    assert runner.runs == 2
@@ -0,0 +1,67 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import agent
+import tools
+from agent import AsyncTradvisorAgent, ToolResult, TradvisorAgent
+
+
+@pytest.fixture
+def slow_tools(monkeypatch):
+    """A "nap" function (sleeps `seconds`) with a 0.5s timeout, on a one-worker pool."""
+    def nap(arguments: str) -> str:
+        time.sleep(json.loads(arguments)["seconds"])
+        return json.dumps({"slept": True})
+
+    monkeypatch.setitem(tools.FUNCTION_HANDLERS, "nap", nap)
+    monkeypatch.setitem(tools.TOOL_TIMEOUTS, "nap", 0.5)
+    pool = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(agent, "_tool_pool", pool)
+    yield pool
+    pool.shutdown(wait=True)
+
+
+def nap_calls(*seconds: float) -> list:
+    return [("nap", json.dumps({"seconds": s}), f"call_{i}") for i, s in enumerate(seconds)]
+
+
+def run_sync(calls: list) -> list:
+    events = []
+    generator = TradvisorAgent(stream=False)._execute_calls(calls)
+    try:
+        while True:
+            events.append(next(generator))
+    except StopIteration:
+        pass
+    return events
+
+
+def test_queued_calls_are_not_timed_out(slow_tools):
+    # Serialized on one worker: the third call starts ~0.6s after submission,
+    # past its 0.5s timeout, but runs for only 0.3s
+    events = run_sync(nap_calls(0.3, 0.3, 0.3))
+    assert [e.error for e in events if isinstance(e, ToolResult)] == [None, None, None]
+
+
+def test_slow_call_still_times_out(slow_tools):
+    events = run_sync(nap_calls(0.2, 1.0))
+    errors = {e.call_id: e.error for e in events if isinstance(e, ToolResult)}
+    assert errors["call_0"] is None
+    assert "timed out" in errors["call_1"]
+
+
+def test_async_queued_calls_are_not_timed_out(slow_tools):
+    async def main():
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=1))
+        results = {}
+        events = [e async for e in AsyncTradvisorAgent(stream=False)._execute_calls(
+            nap_calls(0.3, 0.3, 0.3), results)]
+        return events, results
+
+    events, results = asyncio.run(main())
+    assert [e.error for e in events] == [None, None, None]
+    assert all("slept" in output for output in results.values())
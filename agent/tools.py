@@ -5,13 +5,24 @@ Architecture:
 - Built-in tools (web_search, code_interpreter) run SERVER-SIDE on xAI/Grok
   → No local DuckDuckGo or subprocess needed!
   → Grok browses actual web pages and runs code in a real sandbox
-- Custom function tools (update_plan) run locally
+- Custom function tools (update_plan, run_dcf, run_monte_carlo, screen_stocks,
+  get_stock_data, load_methodology) run locally
   → We handle these in the agentic loop
 
 OpenAI Responses API format.
 """
 
 import json
+import sys
+from pathlib import Path
+
+import db
+from config import TOOL_TIMEOUT
+from dcf import run_dcf
+from prompts import METHODOLOGY
+
+# backend/scripts holds the NumPy valuation engines shared with the bootstrap
+_BACKEND_SCRIPTS = Path(__file__).resolve().parent.parent / "backend" / "scripts"
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -72,11 +83,169 @@ UPDATE_PLAN_TOOL = {
     },
 }
 
-# All tools to pass to the API
+RUN_DCF_TOOL = {
+    "type": "function",
+    "name": "run_dcf",
+    "description": (
+        "Run a full DCF valuation locally (instant, deterministic). "
+        "Returns conservative/base/optimistic scenarios in ONE call: year-by-year "
+        "projection, PV breakdown, terminal value, intrinsic value per share and "
+        "margin of safety. Use this instead of code_interpreter for DCF math. "
+        "All rates are decimals (0.12 = 12%); money values in the same currency units."
+    ),
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "base_fcfe": {
+                "type": "number",
+                "description": "Latest annual free cash flow to equity (OCF + CapEx)",
+            },
+            "growth": {
+                "type": "number",
+                "description": "Initial growth rate, fades linearly to terminal growth",
+            },
+            "wacc": {"type": "number", "description": "Discount rate for the base scenario"},
+            "terminal_growth": {
+                "type": "number",
+                "description": "Long-run growth rate (default 0.025)",
+            },
+            "years": {"type": "integer", "description": "Projection years (default 10)"},
+            "cash": {"type": "number", "description": "Cash and equivalents"},
+            "debt": {"type": "number", "description": "Total debt"},
+            "shares": {"type": "number", "description": "Shares outstanding"},
+            "current_price": {
+                "type": "number",
+                "description": "Current share price, for margin of safety and upside",
+            },
+        },
+        "required": ["base_fcfe", "growth", "wacc", "shares"],
+    },
+}
+
+RUN_MONTE_CARLO_TOOL = {
+    "type": "function",
+    "name": "run_monte_carlo",
+    "description": (
+        "Monte Carlo DCF (local, ~100k draws in well under a second). Samples growth "
+        "and WACC from normal distributions around your estimates and terminal growth "
+        "from 1.5-3%, using the same model as run_dcf. Returns intrinsic value "
+        "percentiles (p5-p95) and the probability the stock is undervalued. "
+        "Use it to show how uncertain a valuation is. All rates are decimals."
+    ),
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "base_fcfe": {"type": "number", "description": "Latest annual FCFE"},
+            "growth": {"type": "number", "description": "Mean initial growth rate"},
+            "growth_std": {"type": "number", "description": "Std dev of growth (default 0.03)"},
+            "wacc": {"type": "number", "description": "Mean discount rate"},
+            "wacc_std": {"type": "number", "description": "Std dev of WACC (default 0.01)"},
+            "years": {"type": "integer", "description": "Projection years (default 10)"},
+            "cash": {"type": "number", "description": "Cash and equivalents"},
+            "debt": {"type": "number", "description": "Total debt"},
+            "shares": {"type": "number", "description": "Shares outstanding"},
+            "current_price": {"type": "number", "description": "Current share price"},
+            "draws": {"type": "integer", "description": "Number of draws (default 100000)"},
+        },
+        "required": ["base_fcfe", "growth", "wacc", "shares", "current_price"],
+    },
+}
+
+SCREEN_STOCKS_TOOL = {
+    "type": "function",
+    "name": "screen_stocks",
+    "description": (
+        "Screen the TradvisorAI stock database (one indexed query, milliseconds). "
+        "Every row already has the latest price, DCF intrinsic value, margin of "
+        "safety, Monte Carlo probability of undervaluation and key ratios. Use this "
+        "FIRST for 'find undervalued stocks' / 'best X stocks' questions instead of "
+        "web_search. Percent fields, including roe, margins, growth and "
+        "dividend_yield, are percentages (15 = 15%), not decimals."
+    ),
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "sector": {"type": "string", "description": "Sector name, partial match (e.g. 'Technology')"},
+            "industry": {"type": "string", "description": "Industry name, partial match"},
+            "min_margin_of_safety": {"type": "number", "description": "Minimum DCF margin of safety, %"},
+            "min_upside": {"type": "number", "description": "Minimum upside to intrinsic value, %"},
+            "min_prob_undervalued": {
+                "type": "number",
+                "description": "Minimum Monte Carlo probability of being undervalued (0-1)",
+            },
+            "max_pe": {"type": "number", "description": "Maximum P/E (negative P/E excluded)"},
+            "max_pb": {"type": "number", "description": "Maximum P/B"},
+            "min_roe": {"type": "number", "description": "Minimum return on equity, %"},
+            "min_net_margin": {"type": "number", "description": "Minimum net margin, %"},
+            "min_revenue_growth": {"type": "number", "description": "Minimum revenue growth, %"},
+            "max_debt_to_equity": {"type": "number", "description": "Maximum debt/equity"},
+            "min_market_cap": {"type": "number", "description": "Minimum market cap, USD"},
+            "min_dividend_yield": {"type": "number", "description": "Minimum dividend yield, %"},
+            "sort_by": {
+                "type": "string",
+                "enum": list(db.SCREEN_SORTS),
+                "description": "Ranking column (default margin_of_safety)",
+            },
+            "limit": {
+                "type": "integer",
+                "description": f"Max results (default 10, max {db.MAX_SCREEN_RESULTS})",
+            },
+        },
+    },
+}
+
+GET_STOCK_DATA_TOOL = {
+    "type": "function",
+    "name": "get_stock_data",
+    "description": (
+        "Read a ticker's stored data from the TradvisorAI database (instant, cached): "
+        "company profile, latest price, key metrics, latest DCF valuation and the latest "
+        "annual financial statement. Every field carries its as-of date and age in days. "
+        "Call this BEFORE web_search; only search the web for what is missing or stale, "
+        "or if the ticker is not covered."
+    ),
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "ticker": {"type": "string", "description": "Stock ticker, e.g. NVDA"},
+            "fields": {
+                "type": "array",
+                "items": {"type": "string", "enum": list(db.STOCK_FIELDS)},
+                "description": "Which data to return (default: company, price, metrics, dcf)",
+            },
+        },
+        "required": ["ticker"],
+    },
+}
+
+LOAD_METHODOLOGY_TOOL = {
+    "type": "function",
+    "name": "load_methodology",
+    "description": (
+        "Load a section of the TradvisorAI methodology that is not already in your instructions: "
+        "dcf (DCF steps, growth and WACC guidelines, scenarios, margin of safety), "
+        "pe (PE cross-check), moat (moat framework) or report (output formats)."
+    ),
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "section": {"type": "string", "enum": list(METHODOLOGY)},
+        },
+        "required": ["section"],
+    },
+}
+
+# All tools to pass to the API.  Sent first in every request, so they are part
+# of the cached prompt prefix: keep the order fixed and add new tools at the end.
 ALL_TOOLS = [
     WEB_SEARCH_TOOL,
     CODE_INTERPRETER_TOOL,
     UPDATE_PLAN_TOOL,
+    RUN_DCF_TOOL,
+    RUN_MONTE_CARLO_TOOL,
+    SCREEN_STOCKS_TOOL,
+    GET_STOCK_DATA_TOOL,
+    LOAD_METHODOLOGY_TOOL,
 ]
 
 
@@ -90,8 +259,113 @@ def handle_update_plan(arguments: str) -> str:
     return json.dumps({"status": "ok", "message": "Plan updated. Continue with next step."})
 
 
+_RUN_DCF_ARGS = (
+    "base_fcfe", "growth", "wacc", "terminal_growth", "years",
+    "cash", "debt", "shares", "current_price",
+)
+
+
+def handle_run_dcf(arguments: str) -> str:
+    """Value a stock with the local DCF engine (all three scenarios)."""
+    try:
+        args = json.loads(arguments)
+        kwargs = {k: args[k] for k in _RUN_DCF_ARGS if args.get(k) is not None}
+        if "years" in kwargs:
+            kwargs["years"] = int(kwargs["years"])
+        result = run_dcf(**kwargs)
+    except (json.JSONDecodeError, TypeError, ValueError, ZeroDivisionError) as e:
+        return json.dumps({"error": f"run_dcf failed: {e}"})
+    return json.dumps(result)
+
+
+MAX_MONTE_CARLO_DRAWS = 200_000
+
+
+def handle_run_monte_carlo(arguments: str) -> str:
+    """Distribution of intrinsic value from the NumPy Monte Carlo engine."""
+    if str(_BACKEND_SCRIPTS) not in sys.path:
+        sys.path.append(str(_BACKEND_SCRIPTS))
+    from monte_carlo import DEFAULT_GROWTH_STD, DEFAULT_WACC_STD, run_monte_carlo
+
+    try:
+        args = json.loads(arguments)
+        result = run_monte_carlo(
+            base_fcfe=float(args["base_fcfe"]),
+            net_debt=float(args.get("debt") or 0) - float(args.get("cash") or 0),
+            shares_outstanding=float(args["shares"]),
+            current_price=float(args["current_price"]),
+            growth={"dist": "normal", "mean": float(args["growth"]),
+                    "std": float(args.get("growth_std") or DEFAULT_GROWTH_STD)},
+            wacc={"dist": "normal", "mean": float(args["wacc"]),
+                  "std": float(args.get("wacc_std") or DEFAULT_WACC_STD)},
+            draws=min(int(args.get("draws") or 100_000), MAX_MONTE_CARLO_DRAWS),
+            years=int(args.get("years") or 10),
+            # Growth fades over the whole projection, matching run_dcf
+            high_growth_years=0,
+        )
+    except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+        return json.dumps({"error": f"run_monte_carlo failed: {e}"})
+    return json.dumps(result)
+
+
+def handle_screen_stocks(arguments: str) -> str:
+    """Filter and rank the precomputed screening table."""
+    try:
+        args = json.loads(arguments or "{}")
+        result = db.screen_stocks(**{k: v for k, v in args.items() if v is not None})
+    except db.DatabaseUnavailable as e:
+        return json.dumps({"error": f"{e}. Use web_search instead."})
+    except Exception as e:
+        return json.dumps({"error": f"screen_stocks failed: {e}"})
+    return json.dumps(result, default=str)
+
+
+def handle_get_stock_data(arguments: str) -> str:
+    """Stored rows for one ticker, through the db.py read-through cache."""
+    try:
+        args = json.loads(arguments)
+        result = db.get_stock_data(args["ticker"], args.get("fields"))
+    except db.DatabaseUnavailable as e:
+        return json.dumps({"error": f"{e}. Use web_search instead."})
+    except Exception as e:
+        return json.dumps({"error": f"get_stock_data failed: {e}"})
+    return json.dumps(result, default=str)
+
+
+def handle_load_methodology(arguments: str) -> str:
+    """Text of one methodology section (prompts.METHODOLOGY)."""
+    try:
+        section = json.loads(arguments)["section"]
+    except (json.JSONDecodeError, KeyError, TypeError) as e:
+        return json.dumps({"error": f"load_methodology failed: {e}"})
+    if section not in METHODOLOGY:
+        return json.dumps({"error": f"Unknown section '{section}' (use {', '.join(METHODOLOGY)})"})
+    return json.dumps({"section": section, "methodology": METHODOLOGY[section]})
+
+
+# Seconds a call may run before the model gets a timeout error instead
+# (others use config.TOOL_TIMEOUT)
+TOOL_TIMEOUTS = {
+    "update_plan": 5,
+    "run_dcf": 10,
+    "run_monte_carlo": 30,
+    "screen_stocks": 15,
+    "get_stock_data": 15,
+    "load_methodology": 5,
+}
+
+
+def tool_timeout(name: str) -> float:
+    return TOOL_TIMEOUTS.get(name, TOOL_TIMEOUT)
+
+
 FUNCTION_HANDLERS = {
     "update_plan": handle_update_plan,
+    "run_dcf": handle_run_dcf,
+    "run_monte_carlo": handle_run_monte_carlo,
+    "screen_stocks": handle_screen_stocks,
+    "get_stock_data": handle_get_stock_data,
+    "load_methodology": handle_load_methodology,
 }
 
 
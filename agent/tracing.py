@@ -0,0 +1,265 @@
+"""
+Latency tracing for the agent loop.
+
+A 60-second analysis spends its time in model turns, server-side tools
+(web_search_call, code_interpreter_call) and local functions.  The agent
+records a span for each of them:
+
+  agent.run                 one per query (coordinator.run for fan-outs)
+    responses.create        one per model turn: input size, tokens, time to first event
+      <output item type>    each streamed output item, e.g. web_search_call
+    tool.<name>             each local function call: argument/result size, errors
+
+Spans are handed to pluggable exporters when they end:
+  - JSONLExporter: one JSON object per line (TRACE_EXPORTER=jsonl, TRACE_FILE)
+  - OTelExporter:  replays each finished trace into OpenTelemetry
+                   (TRACE_EXPORTER=otel, needs opentelemetry-sdk)
+  - MemoryExporter: keeps spans in memory, used by `demo.py --profile`
+
+With no exporter configured spans are still created but go nowhere.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+
+from config import TRACE_EXPORTER, TRACE_FILE
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    start_ns: int
+    end_ns: int | None = None
+    attributes: dict = field(default_factory=dict)
+    _tracer: "Tracer | None" = field(default=None, repr=False, compare=False)
+
+    @property
+    def duration(self) -> float:
+        """Seconds (so far, if still open)."""
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def end(self, **attributes):
+        if self.end_ns is not None:
+            return
+        self.attributes.update(attributes)
+        self.end_ns = time.time_ns()
+        if self._tracer is not None:
+            self._tracer._export(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(self.duration * 1000, 3),
+            "attributes": self.attributes,
+        }
+
+
+class Tracer:
+    """Creates spans and fans finished ones out to the exporters."""
+
+    def __init__(self, exporters: list | None = None):
+        self.exporters = list(exporters or [])
+        self._lock = threading.Lock()
+
+    def start(self, name: str, parent: Span | None = None, **attributes) -> Span:
+        return Span(
+            name=name,
+            trace_id=parent.trace_id if parent else uuid.uuid4().hex,
+            span_id=uuid.uuid4().hex[:16],
+            parent_id=parent.span_id if parent else None,
+            start_ns=time.time_ns(),
+            attributes=attributes,
+            _tracer=self,
+        )
+
+    def add_exporter(self, exporter):
+        with self._lock:
+            self.exporters.append(exporter)
+
+    def remove_exporter(self, exporter):
+        with self._lock:
+            if exporter in self.exporters:
+                self.exporters.remove(exporter)
+
+    def _export(self, span: Span):
+        for exporter in list(self.exporters):
+            try:
+                exporter.export(span)
+            except Exception:
+                pass  # tracing must never break a run
+
+
+# ═══════════════════════════════════════════════════════════════
+# EXPORTERS
+# ═══════════════════════════════════════════════════════════════
+
+
+class JSONLExporter:
+    """Appends each finished span to a JSON-lines file."""
+
+    def __init__(self, path: str = TRACE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock, open(self.path, "a") as f:
+            f.write(line + "\n")
+
+
+class MemoryExporter:
+    """Keeps finished spans in memory, grouped by trace."""
+
+    def __init__(self):
+        self._spans: dict[str, list[Span]] = {}
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        with self._lock:
+            self._spans.setdefault(span.trace_id, []).append(span)
+
+    def take(self, trace_id: str) -> list[Span]:
+        with self._lock:
+            return self._spans.pop(trace_id, [])
+
+    def take_all(self) -> list[Span]:
+        with self._lock:
+            spans = [span for trace in self._spans.values() for span in trace]
+            self._spans.clear()
+        return spans
+
+
+class OTelExporter:
+    """
+    Replays finished traces into OpenTelemetry.
+
+    Children end before their parents, so spans are buffered per trace and
+    re-created, parents first and with their original timestamps, once the
+    root span ends.  Configure the OpenTelemetry SDK (tracer provider and
+    exporter, e.g. OTLP) as usual before the first run.
+    """
+
+    def __init__(self, tracer_provider=None):
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            raise RuntimeError("OTel tracing needs opentelemetry-sdk (pip install opentelemetry-sdk)")
+        self._trace = trace
+        self._tracer = trace.get_tracer("tradvisor.agent", tracer_provider=tracer_provider)
+        self._pending = MemoryExporter()
+
+    def export(self, span: Span):
+        self._pending.export(span)
+        if span.parent_id is None:
+            self._replay(self._pending.take(span.trace_id))
+
+    def _replay(self, spans: list[Span]):
+        otel_spans = {}
+        for span in sorted(spans, key=lambda s: s.start_ns):
+            parent = otel_spans.get(span.parent_id)
+            context = self._trace.set_span_in_context(parent) if parent is not None else None
+            otel_spans[span.span_id] = self._tracer.start_span(
+                span.name,
+                context=context,
+                start_time=span.start_ns,
+                attributes={k: v for k, v in span.attributes.items()
+                            if isinstance(v, (str, bool, int, float))},
+            )
+        for span in spans:
+            otel_spans[span.span_id].end(end_time=span.end_ns)
+
+
+# ═══════════════════════════════════════════════════════════════
+# PROFILE SUMMARY
+# ═══════════════════════════════════════════════════════════════
+
+
+def flame_summary(spans: list[Span], width: int = 30) -> str:
+    """
+    Indented per-query time breakdown: spans with the same name under the
+    same parent path are merged (count and total seconds), with a bar
+    relative to the root span.  Concurrent spans (parallel tool calls,
+    sub-agents) add up, so a row can exceed its parent.
+    """
+    if not spans:
+        return "(no spans recorded)"
+    by_id = {span.span_id: span for span in spans}
+
+    def path(span):
+        names = []
+        while span is not None:
+            names.append(span.name)
+            span = by_id.get(span.parent_id)
+        return tuple(reversed(names))
+
+    totals: dict[tuple, list] = {}
+    for span in sorted(spans, key=lambda s: s.start_ns):
+        entry = totals.setdefault(path(span), [0, 0.0])
+        entry[0] += 1
+        entry[1] += span.duration
+
+    roots = [s for s in spans if s.parent_id not in by_id]
+    total = sum(s.duration for s in roots) or 1e-9
+
+    children: dict[tuple, list] = {}
+    for key in totals:
+        children.setdefault(key[:-1], []).append(key)
+
+    lines = []
+
+    def walk(parent):
+        # Slowest first at every level
+        for key in sorted(children.get(parent, []), key=lambda k: -totals[k][1]):
+            count, seconds = totals[key]
+            label = "  " * (len(key) - 1) + key[-1] + (f" ×{count}" if count > 1 else "")
+            bar = "█" * max(1, round(width * seconds / total)) if seconds else ""
+            lines.append(f"{label:<44} {seconds:8.2f}s  {seconds / total:6.1%}  {bar}")
+            walk(key)
+
+    walk(())
+    return "\n".join(lines)
+
+
+# ═══════════════════════════════════════════════════════════════
+# PROCESS-WIDE TRACER
+# ═══════════════════════════════════════════════════════════════
+
+_tracer: Tracer | None = None
+_tracer_lock = threading.Lock()
+
+
+def _configured_exporters() -> list:
+    exporters = []
+    for name in filter(None, (n.strip().lower() for n in TRACE_EXPORTER.split(","))):
+        if name == "jsonl":
+            exporters.append(JSONLExporter(os.path.expanduser(TRACE_FILE)))
+        elif name == "otel":
+            exporters.append(OTelExporter())
+        else:
+            raise ValueError(f"Unknown TRACE_EXPORTER '{name}' (use jsonl, otel)")
+    return exporters
+
+
+def get_tracer() -> Tracer:
+    """Tracer shared by every agent in the process (exporters from TRACE_EXPORTER)."""
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                _tracer = Tracer(_configured_exporters())
+    return _tracer
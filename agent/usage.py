@@ -0,0 +1,165 @@
+"""
+Token / cost accounting and per-query budgets.
+
+Every Responses API turn reports `usage` (input, cached input, output and
+reasoning tokens); server-side tool calls (web_search, code_interpreter) show
+up as output items.  Usage adds them up per turn and per query and prices
+them with the PRICE_* settings.  It is reported on Done.usage.
+
+A Budget caps tokens, cost and wall-clock time per query.  When a turn
+pushes the run over budget, the agent stops researching: it sends the
+pending tool results with a "give your final answer now" instruction and
+tools disabled, then ends (see TradvisorAgent.run).  TIERS holds the
+budgets per subscription tier.  The coordinator splits what is left of a
+query's budget between its sub-agents (Budget.share) and keeps a reserve for
+the merge turn.
+"""
+
+from dataclasses import dataclass, field
+
+from config import (
+    PRICE_INPUT_PER_M,
+    PRICE_CACHED_INPUT_PER_M,
+    PRICE_OUTPUT_PER_M,
+    PRICE_SERVER_TOOL_CALL,
+    BUDGET_MAX_TOKENS,
+    BUDGET_MAX_COST,
+    BUDGET_MAX_SECONDS,
+)
+
+SERVER_TOOLS = {"web_search_call": "web_search", "code_interpreter_call": "code_execution"}
+
+
+def _get(obj, name, default=0):
+    """Attribute or key access (SDK objects and plain dicts)."""
+    if obj is None:
+        return default
+    if isinstance(obj, dict):
+        value = obj.get(name, default)
+    else:
+        value = getattr(obj, name, default)
+    return default if value is None else value
+
+
+@dataclass
+class Usage:
+    """Tokens and server-side tool calls, for one turn or summed over a query."""
+    input_tokens: int = 0
+    cached_tokens: int = 0       # part of input_tokens served from the prompt cache
+    output_tokens: int = 0
+    reasoning_tokens: int = 0    # part of output_tokens
+    server_tool_calls: int = 0
+    turns: list = field(default_factory=list)  # per-turn Usage (query totals only)
+
+    @classmethod
+    def from_response(cls, response) -> "Usage":
+        usage = _get(response, "usage", None)
+        return cls(
+            input_tokens=_get(usage, "input_tokens"),
+            cached_tokens=_get(_get(usage, "input_tokens_details", None), "cached_tokens"),
+            output_tokens=_get(usage, "output_tokens"),
+            reasoning_tokens=_get(_get(usage, "output_tokens_details", None), "reasoning_tokens"),
+            server_tool_calls=sum(
+                1 for item in (_get(response, "output", None) or [])
+                if _get(item, "type", "") in SERVER_TOOLS
+            ),
+        )
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+    @property
+    def cached_ratio(self) -> float:
+        """Share of input tokens served from the provider's prompt cache."""
+        return self.cached_tokens / self.input_tokens if self.input_tokens else 0.0
+
+    @property
+    def cost(self) -> float:
+        """USD at the configured PRICE_* rates."""
+        uncached = self.input_tokens - self.cached_tokens
+        return (
+            uncached * PRICE_INPUT_PER_M
+            + self.cached_tokens * PRICE_CACHED_INPUT_PER_M
+            + self.output_tokens * PRICE_OUTPUT_PER_M
+        ) / 1_000_000 + self.server_tool_calls * PRICE_SERVER_TOOL_CALL
+
+    def add(self, turn: "Usage", record_turn: bool = True):
+        self.input_tokens += turn.input_tokens
+        self.cached_tokens += turn.cached_tokens
+        self.output_tokens += turn.output_tokens
+        self.reasoning_tokens += turn.reasoning_tokens
+        self.server_tool_calls += turn.server_tool_calls
+        if record_turn:
+            self.turns.append(turn)
+        else:
+            self.turns.extend(turn.turns)
+
+    def summary(self) -> str:
+        text = f"{self.total_tokens:,} tokens ({self.input_tokens:,} in"
+        if self.cached_tokens:
+            text += f", {self.cached_tokens:,} cached ({self.cached_ratio:.0%})"
+        text += f", {self.output_tokens:,} out"
+        if self.reasoning_tokens:
+            text += f", {self.reasoning_tokens:,} reasoning"
+        text += ")"
+        if self.server_tool_calls:
+            text += f" + {self.server_tool_calls} server tool calls"
+        return text + f" ≈ ${self.cost:.4f}"
+
+
+@dataclass
+class Budget:
+    """Per-query limits; None means unlimited."""
+    max_tokens: int | None = None
+    max_cost: float | None = None      # USD
+    max_seconds: float | None = None   # wall clock
+
+    def exceeded(self, usage: Usage, elapsed: float) -> str | None:
+        """Why the budget is used up, or None while there is room left."""
+        if self.max_tokens is not None and usage.total_tokens >= self.max_tokens:
+            return f"token budget ({usage.total_tokens:,}/{self.max_tokens:,})"
+        if self.max_cost is not None and usage.cost >= self.max_cost:
+            return f"cost budget (${usage.cost:.4f}/${self.max_cost:.4f})"
+        if self.max_seconds is not None and elapsed >= self.max_seconds:
+            return f"time budget ({elapsed:.0f}s/{self.max_seconds:.0f}s)"
+        return None
+
+    def remaining(self, usage: Usage, elapsed: float) -> "Budget":
+        """What is left of this budget after `usage` and `elapsed` seconds."""
+        return Budget(
+            max_tokens=None if self.max_tokens is None else max(0, self.max_tokens - usage.total_tokens),
+            max_cost=None if self.max_cost is None else max(0.0, self.max_cost - usage.cost),
+            max_seconds=None if self.max_seconds is None else max(0.0, self.max_seconds - elapsed),
+        )
+
+    def share(self, parts: int, reserve: float = 0.0) -> "Budget":
+        """
+        One of `parts` parallel runs' share, after holding back `reserve` (a
+        fraction) for later.  Tokens and cost are divided; wall-clock time is
+        not, since the runs overlap.
+        """
+        keep = 1 - reserve
+        return Budget(
+            max_tokens=None if self.max_tokens is None else int(self.max_tokens * keep / parts),
+            max_cost=None if self.max_cost is None else self.max_cost * keep / parts,
+            max_seconds=None if self.max_seconds is None else self.max_seconds * keep,
+        )
+
+
+def _limit(value: float):
+    return value if value > 0 else None
+
+
+# From .env; 0 disables a limit
+DEFAULT_BUDGET = Budget(
+    max_tokens=_limit(BUDGET_MAX_TOKENS),
+    max_cost=_limit(BUDGET_MAX_COST),
+    max_seconds=_limit(BUDGET_MAX_SECONDS),
+)
+
+TIERS = {
+    "free": Budget(max_tokens=150_000, max_cost=0.05, max_seconds=90),
+    "pro": Budget(max_tokens=600_000, max_cost=0.25, max_seconds=240),
+    "enterprise": Budget(max_cost=2.00, max_seconds=600),
+}
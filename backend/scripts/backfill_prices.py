@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Backfill historical daily prices
+
+Pulls N years of daily OHLCV for the universe with bulk multi-ticker
+downloads, computes change_amount/change_percent per ticker in one grouped
+pass, and streams the rows into `prices` as large batched upserts on
+(ticker, date).  Tickers are processed in chunks, so memory stays bounded
+by one chunk's history no matter how big the universe is.
+
+Backfilled rows never set is_latest; today's snapshot from the bootstrap
+keeps the flag.
+
+Usage:
+    python backfill_prices.py                       # top 50, 5 years
+    python backfill_prices.py --universe sp500.txt --years 10
+    python backfill_prices.py --tickers AAPL,MSFT --chunk-size 20 --batch-size 5000
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from bootstrap_db import get_supabase, load_company_tickers, resolve_universe
+from bulk_writer import BulkWriter
+from price_history import add_changes, download_bars, price_rows
+
+# Extra days downloaded before the start date so the first backfilled bar
+# has a previous close to compute its change from
+WARMUP_DAYS = 10
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Backfill daily price history into prices')
+    parser.add_argument('--tickers', help='Comma-separated tickers (default: top 50)')
+    parser.add_argument('--universe', help='File with one ticker per line (or CSV, first column)')
+    parser.add_argument('--years', type=float, default=5, help='Years of history')
+    parser.add_argument('--chunk-size', type=int, default=50, help='Tickers per yf.download call')
+    parser.add_argument('--batch-size', type=int, default=2000, help='Rows per upsert')
+    return parser.parse_args()
+
+
+def backfill_chunk(tickers, start, end, writer):
+    """Download, transform and queue one chunk of tickers -> rows written"""
+    bars = download_bars(tickers, start=start - timedelta(days=WARMUP_DAYS), end=end)
+    if bars.empty:
+        return 0
+    bars = add_changes(bars)
+    bars = bars[bars['date'] >= start]
+
+    rows = price_rows(bars)
+    for row in rows:
+        writer.add(row['ticker'], {'prices': row})
+    return len(rows)
+
+
+def main():
+    args = parse_args()
+    supabase = get_supabase()
+
+    known = load_company_tickers(supabase)
+    tickers = [t for t in resolve_universe(args) if t in known]
+    if not tickers:
+        print("❌ None of the tickers are in companies - run bootstrap_db.py first")
+        return
+
+    end = datetime.now()
+    start = (end - timedelta(days=round(args.years * 365.25))).replace(hour=0, minute=0, second=0, microsecond=0)
+    print(f"Backfilling {len(tickers)} tickers from {start.date()} to {end.date()}")
+
+    writer = BulkWriter(supabase, batch_size=args.batch_size)
+    started = time.perf_counter()
+    total_rows = 0
+
+    for i in range(0, len(tickers), args.chunk_size):
+        chunk = tickers[i:i + args.chunk_size]
+        rows = backfill_chunk(chunk, start, end, writer)
+        total_rows += rows
+        print(f"  {chunk[0]}..{chunk[-1]}: {rows:,} bars")
+    writer.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"\n✅ {total_rows:,} bars for {len(tickers)} tickers in {elapsed:.1f}s "
+          f"({writer.round_trips} upserts)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,84 @@
 #!/usr/bin/env python3
 """
-Bootstrap Database - Populate top 50 stocks
+Bootstrap Database - Populate the stock universe
 Fetches data from yfinance and calculates DCF valuations
+
+Runs as a concurrent pipeline (see pipeline.py): fetch -> compute -> write.
+Writes are buffered and flushed as multi-row upserts (see bulk_writer.py).
+
+Usage:
+    python bootstrap_db.py                          # top 50 stocks
+    python bootstrap_db.py --tickers AAPL,MSFT
+    python bootstrap_db.py --universe sp500.txt --workers 16 --rate 5
+    python bootstrap_db.py --universe sp500.txt --batch-size 200 --flush-interval 10
+    python bootstrap_db.py --resume                 # finish the latest run
+    python bootstrap_db.py --retry-failed --run-id 20250101-120000
+    python bootstrap_db.py --offline                # DCF from cached yfinance data only
+    python bootstrap_db.py --mode prices            # daily job: quotes + price-dependent DCF columns
+    python bootstrap_db.py --mode fundamentals      # profile, statements, DCF, metrics (no prices)
 """
 
-import yfinance as yf
+import argparse
 import os
+import time
 from datetime import datetime, timedelta
 from supabase import create_client, Client
-import time
 import numpy as np
+import pandas as pd
 from dotenv import load_dotenv
 
+from dcf_engine import dcf_from_inputs, PROJECTION_YEARS, TERMINAL_GROWTH
+from monte_carlo import default_distributions, run_monte_carlo
+from bulk_writer import BulkWriter
+from checkpoint import Journal
+from yf_cache import YFinanceCache
+from pipeline import Pipeline, TokenBucket, load_universe
+from financials import annual, financial_rows, latest_value, normalize_statements
+from price_history import add_changes, download_bars, latest_bars, price_rows
+
 load_dotenv()
 
-# Supabase connection
+# Supabase connection (created on first use so the stages can be imported without it)
 SUPABASE_URL = os.getenv('SUPABASE_URL')
 SUPABASE_KEY = os.getenv('SUPABASE_KEY')
 
-if not SUPABASE_URL or not SUPABASE_KEY:
-    print("❌ Missing SUPABASE_URL or SUPABASE_KEY in environment")
-    print("Please set these in .env file")
-    exit(1)
+_supabase: Client | None = None
+
+
+def get_supabase() -> Client:
+    """Shared Supabase client"""
+    global _supabase
+    if _supabase is None:
+        if not SUPABASE_URL or not SUPABASE_KEY:
+            print("❌ Missing SUPABASE_URL or SUPABASE_KEY in environment")
+            print("Please set these in .env file")
+            exit(1)
+        _supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+    return _supabase
+
+# Checkpoint journal (SQLite) used to resume interrupted runs
+BOOTSTRAP_JOURNAL = os.getenv('BOOTSTRAP_JOURNAL', 'bootstrap_journal.db')
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# yfinance cache (SQLite) and per-kind TTLs in seconds
+YF_CACHE_PATH = os.getenv('YF_CACHE_PATH', 'yf_cache.db')
+YF_CACHE_TTL = {
+    kind: int(os.environ[f'YF_TTL_{kind.upper()}'])
+    for kind in ('quote', 'profile', 'statements')
+    if os.getenv(f'YF_TTL_{kind.upper()}')
+}
+
+_yf_cache: YFinanceCache | None = None
+
+
+def get_yf_cache() -> YFinanceCache:
+    """Shared yfinance cache (main() replaces it when --offline/--refresh-cache are given)"""
+    global _yf_cache
+    if _yf_cache is None:
+        _yf_cache = YFinanceCache(YF_CACHE_PATH, ttl=YF_CACHE_TTL)
+    return _yf_cache
+
+# Monte Carlo draws per ticker (0 disables the distribution in dcf_valuations.scenarios)
+MONTE_CARLO_DRAWS = int(os.getenv('MONTE_CARLO_DRAWS', '100000'))
 
 # Top 50 S&P 500 stocks by market cap
 TOP_50_STOCKS = [
@@ -39,23 +94,23 @@ TOP_50_STOCKS = [
     'UNP', 'NEE', 'AMD', 'RTX', 'QCOM'
 ]
 
-def calculate_fcfe(stock_data):
-    """Calculate Free Cash Flow to Equity"""
+def calculate_fcfe(annual_rows):
+    """Calculate Free Cash Flow to Equity from normalized annual financials"""
     try:
-        cashflow = stock_data.cashflow
-        
-        if cashflow is None or cashflow.empty:
+        if annual_rows is None or annual_rows.empty:
             return None
             
-        # Get most recent year
-        latest = cashflow.iloc[:, 0]
+        # Most recent fiscal year
+        latest = annual_rows.iloc[0]
         
         # FCFE = Operating Cash Flow - CapEx + Net Borrowing
-        operating_cf = latest.get('Operating Cash Flow', 0)
-        capex = latest.get('Capital Expenditure', 0)
+        if pd.isna(latest['operating_cash_flow']):
+            return None
+        operating_cf = latest['operating_cash_flow']
+        capex = 0 if pd.isna(latest['capex']) else latest['capex']
         
         # Net borrowing (debt issued - debt repaid)
-        financing_cf = latest.get('Issuance Of Debt', 0) - abs(latest.get('Repayment Of Debt', 0))
+        financing_cf = 0 if pd.isna(latest['net_borrowing']) else latest['net_borrowing']
         
         fcfe = operating_cf + capex + financing_cf  # capex is negative
         
@@ -65,7 +120,7 @@ def calculate_fcfe(stock_data):
         print(f"  Error calculating FCFE: {e}")
         return None
 
-def calculate_wacc(stock_data, info):
+def calculate_wacc(annual_rows, info):
     """Calculate Weighted Average Cost of Capital"""
     try:
         # Simple WACC approximation
@@ -89,18 +144,15 @@ def calculate_wacc(stock_data, info):
         print(f"  Error calculating WACC: {e}")
         return 0.10  # Default 10%
 
-def calculate_growth_rate(stock_data):
-    """Calculate historical growth rate from financials"""
+def calculate_growth_rate(annual_rows):
+    """Calculate historical growth rate from normalized annual financials"""
     try:
-        financials = stock_data.financials
-        
-        if financials is None or financials.empty:
+        if annual_rows is None or annual_rows.empty:
             return 0.10  # Default 10%
             
-        # Get revenue over years
-        if 'Total Revenue' in financials.index:
-            revenues = financials.loc['Total Revenue']
-            
+        # Revenue over years, newest first
+        revenues = annual_rows['revenue'].dropna()
+        if len(revenues) > 1:
             # Calculate YoY growth rates
             growth_rates = []
             for i in range(len(revenues) - 1):
@@ -120,258 +172,514 @@ def calculate_growth_rate(stock_data):
         print(f"  Error calculating growth rate: {e}")
         return 0.10
 
-def calculate_dcf(ticker, stock_data, info):
-    """Calculate DCF valuation"""
+def calculate_dcf(ticker, annual_rows, info):
+    """Calculate DCF valuation from normalized annual financials"""
     try:
         # 1. Get base FCFE
-        fcfe = calculate_fcfe(stock_data)
+        fcfe = calculate_fcfe(annual_rows)
         if fcfe is None or fcfe <= 0:
             print(f"  No positive FCFE for {ticker}")
             return None
             
         # 2. Calculate WACC
-        wacc = calculate_wacc(stock_data, info)
+        wacc = calculate_wacc(annual_rows, info)
         
         # 3. Estimate growth rate
-        growth_rate = calculate_growth_rate(stock_data)
+        growth_rate = calculate_growth_rate(annual_rows)
         
         # 4. Terminal growth rate (GDP growth)
-        terminal_growth = 0.025
+        terminal_growth = TERMINAL_GROWTH
+        years = PROJECTION_YEARS
         
-        # 5. Project cash flows (10 years)
-        years = 10
-        projected_fcfe = []
+        # 5. Adjust for net debt
+        net_debt = latest_value(annual_rows, 'total_debt', 0) - latest_value(annual_rows, 'cash', 0)
         
-        # High growth for first 5 years, then fade
-        for year in range(1, years + 1):
-            if year <= 5:
-                growth = growth_rate
-            else:
-                # Fade to terminal growth
-                fade_factor = (year - 5) / 5
-                growth = growth_rate * (1 - fade_factor) + terminal_growth * fade_factor
-            
-            fcfe = fcfe * (1 + growth)
-            discount_factor = (1 + wacc) ** year
-            pv = fcfe / discount_factor
-            projected_fcfe.append(pv)
-        
-        # 6. Calculate terminal value
-        terminal_fcfe = fcfe * (1 + terminal_growth)
-        terminal_value = terminal_fcfe / (wacc - terminal_growth)
-        pv_terminal = terminal_value / ((1 + wacc) ** years)
-        
-        # 7. Sum present values
-        pv_projected = sum(projected_fcfe)
-        enterprise_value = pv_projected + pv_terminal
-        
-        # 8. Adjust for net debt
-        balance_sheet = stock_data.balance_sheet
-        net_debt = 0
-        
-        if balance_sheet is not None and not balance_sheet.empty:
-            latest_balance = balance_sheet.iloc[:, 0]
-            total_debt = latest_balance.get('Total Debt', 0)
-            cash = latest_balance.get('Cash And Cash Equivalents', 0)
-            net_debt = total_debt - cash
-        
-        equity_value = enterprise_value - net_debt
-        
-        # 9. Calculate per-share value
+        # 6. Shares for per-share value
         shares_outstanding = info.get('sharesOutstanding', 0)
         if shares_outstanding <= 0:
             print(f"  No shares outstanding data for {ticker}")
             return None
-            
-        intrinsic_value = equity_value / shares_outstanding
         
-        # 10. Get current price
+        # 7. Get current price
         current_price = info.get('currentPrice', info.get('regularMarketPrice', 0))
         if current_price <= 0:
             print(f"  No current price for {ticker}")
             return None
         
-        # 11. Calculate margin of safety and upside
-        margin_of_safety = ((intrinsic_value - current_price) / intrinsic_value) * 100
-        upside_downside = ((intrinsic_value - current_price) / current_price) * 100
+        # 8. Project, discount and value (dcf_engine holds the model so the
+        #    vectorized kernel can be checked against it)
+        dcf = dcf_from_inputs(fcfe, growth_rate, wacc, terminal_growth, net_debt,
+                              shares_outstanding, current_price, years=years)
+        
+        # 9. Distribution of values around the point estimates
+        scenarios = None
+        if MONTE_CARLO_DRAWS > 0:
+            scenarios = {
+                'monte_carlo': run_monte_carlo(
+                    fcfe, net_debt, shares_outstanding, current_price,
+                    **default_distributions(growth_rate, wacc),
+                    draws=MONTE_CARLO_DRAWS, years=years,
+                )
+            }
         
         return {
             'ticker': ticker,
-            'base_fcfe': int(calculate_fcfe(stock_data) or 0),
+            'base_fcfe': int(fcfe),
             'growth_rate': round(growth_rate * 100, 2),
             'wacc': round(wacc * 100, 2),
             'terminal_growth': round(terminal_growth * 100, 2),
             'projection_years': years,
-            'intrinsic_value': round(intrinsic_value, 2),
+            'intrinsic_value': round(dcf['intrinsic_value'], 2),
             'current_price': round(current_price, 2),
-            'margin_of_safety': round(margin_of_safety, 2),
-            'upside_downside': round(upside_downside, 2),
-            'pv_projected_fcfe': int(pv_projected),
-            'pv_terminal_value': int(pv_terminal),
-            'enterprise_value': int(enterprise_value),
+            'margin_of_safety': round(dcf['margin_of_safety'], 2),
+            'upside_downside': round(dcf['upside_downside'], 2),
+            'pv_projected_fcfe': int(dcf['pv_projected_fcfe']),
+            'pv_terminal_value': int(dcf['pv_terminal_value']),
+            'enterprise_value': int(dcf['enterprise_value']),
             'net_debt': int(net_debt),
-            'equity_value': int(equity_value)
+            'equity_value': int(dcf['equity_value']),
+            'scenarios': scenarios
         }
         
     except Exception as e:
         print(f"  Error calculating DCF: {e}")
         return None
 
-def process_stock(ticker):
-    """Fetch and process a single stock"""
-    print(f"\n{'='*60}")
-    print(f"Processing {ticker}...")
-    print(f"{'='*60}")
+class FetchedStock:
+    """yfinance data for one ticker, loaded eagerly so the network time stays in the fetch stage"""
+
+    def __init__(self, ticker, info, statements):
+        self.ticker = ticker
+        self.info = info
+        self.statements = statements  # annual + quarterly, see yf_cache.fetch_statements
+
+
+def fetch_stock(ticker):
+    """Fetch stage: profile/quote + statements from yfinance (through the cache)"""
+    cache = get_yf_cache()
+    info = cache.info(ticker)
+    
+    if not info or 'longName' not in info:
+        print(f"  ❌ No data available for {ticker}")
+        return None
+    
+    return FetchedStock(ticker, info, cache.statements(ticker))
+
+
+def build_company_row(ticker, info):
+    return {
+        'ticker': ticker,
+        'name': info.get('longName', ticker),
+        'sector': info.get('sector', 'Unknown'),
+        'industry': info.get('industry', 'Unknown'),
+        'description': info.get('longBusinessSummary', '')[:500],  # Limit length
+        'employees': info.get('fullTimeEmployees'),
+        'market_cap': info.get('marketCap'),
+        'shares_outstanding': info.get('sharesOutstanding'),
+        'exchange': info.get('exchange', 'NASDAQ'),
+        'currency': info.get('currency', 'USD'),
+        'website': info.get('website'),
+        'data_verified': True,
+        'data_source': 'yfinance',
+        # The column default only fires on insert; upserts must bump it
+        'last_updated': datetime.now().isoformat()
+    }
+
+
+def build_price_row(ticker, info):
+    current_price = info.get('currentPrice', info.get('regularMarketPrice', 0))
+    previous_close = info.get('previousClose', current_price)
+    
+    return {
+        'ticker': ticker,
+        'date': datetime.now().date().isoformat(),
+        'close': float(current_price),
+        'open': float(info.get('regularMarketOpen', current_price)),
+        'high': float(info.get('dayHigh', current_price)),
+        'low': float(info.get('dayLow', current_price)),
+        'volume': int(info.get('volume', 0)),
+        'change_amount': float(current_price - previous_close),
+        'change_percent': float(((current_price - previous_close) / previous_close * 100) if previous_close > 0 else 0),
+        'is_latest': True
+    }
+
+
+def _ratio(numerator, denominator, scale=1.0, limit=None):
+    """numerator / denominator * scale, None when missing or outside the column's range"""
+    if numerator is None or not denominator:
+        return None
+    value = numerator / denominator * scale
+    if limit is not None and abs(value) >= limit:
+        return None
+    return round(value, 2)
+
+
+def build_metrics_row(ticker, info, annual_rows=None):
+    """Ratios from info, plus the ones only the statements have"""
+    row = {
+        'ticker': ticker,
+        'metric_date': datetime.now().date().isoformat(),
+        'pe_ratio': info.get('trailingPE'),
+        'pb_ratio': info.get('priceToBook'),
+        'ps_ratio': info.get('priceToSalesTrailing12Months'),
+        'roe': info.get('returnOnEquity', 0) * 100 if info.get('returnOnEquity') else None,
+        'gross_margin': info.get('grossMargins', 0) * 100 if info.get('grossMargins') else None,
+        'operating_margin': info.get('operatingMargins', 0) * 100 if info.get('operatingMargins') else None,
+        'net_margin': info.get('profitMargins', 0) * 100 if info.get('profitMargins') else None,
+        'revenue_growth': info.get('revenueGrowth', 0) * 100 if info.get('revenueGrowth') else None,
+        'earnings_growth': info.get('earningsGrowth', 0) * 100 if info.get('earningsGrowth') else None,
+        'debt_to_equity': info.get('debtToEquity'),
+        'current_ratio': info.get('currentRatio'),
+        'dividend_yield': info.get('dividendYield', 0) * 100 if info.get('dividendYield') else None
+    }
+    
+    # Always set, so every row of a bulk upsert has the same keys
+    annual_rows = annual_rows if annual_rows is not None else pd.DataFrame()
+    latest = lambda column: latest_value(annual_rows, column)
+    row.update({
+        'roa': _ratio(latest('net_income'), latest('total_assets'), 100, limit=1e6),
+        'asset_turnover': _ratio(latest('revenue'), latest('total_assets'), limit=1e3),
+        'debt_to_assets': _ratio(latest('total_debt'), latest('total_assets'), 100, limit=1e3),
+        'interest_coverage': _ratio(latest('ebit'), latest('interest_expense'), limit=1e6),
+    })
+    if row['gross_margin'] is None:
+        row['gross_margin'] = _ratio(latest('gross_profit'), latest('revenue'), 100, limit=1e3)
+    if row['operating_margin'] is None:
+        row['operating_margin'] = _ratio(latest('operating_income'), latest('revenue'), 100, limit=1e3)
+    
+    return row
+
+
+def compute_stock(ticker, stock):
+    """Compute stage: normalized financials, DCF, Monte Carlo and metrics -> rows per table"""
+    info = stock.info
+    financials = normalize_statements({ticker: stock.statements})
+    annual_rows = annual(financials, ticker)
+    rows = {
+        'companies': build_company_row(ticker, info),
+        'financials': financial_rows(financials),
+        'prices': build_price_row(ticker, info),
+        'metrics': build_metrics_row(ticker, info, annual_rows),
+        'dcf_valuations': None,
+    }
+    
+    dcf_result = calculate_dcf(ticker, annual_rows, info)
+    if dcf_result:
+        rows['dcf_valuations'] = {
+            **dcf_result,
+            'valuation_date': datetime.now().date().isoformat(),
+            'ai_growth_explanation': f"Historical revenue growth rate calculated from financial statements",
+            'ai_confidence': 0.75
+        }
     
+    return rows
+
+
+def write_stock(ticker, rows):
+    """Save one ticker's rows right away (single-stock path; the pipeline batches them)"""
+    writer = BulkWriter(get_supabase(), batch_size=1)
+    writer.add(ticker, rows)
+
+
+def print_result(ticker, rows):
+    """One summary line per ticker (stages run concurrently, so no multi-line blocks)"""
+    dcf = rows['dcf_valuations']
+    if not dcf:
+        price = f"${rows['prices']['close']:>9.2f}" if rows['prices'] else ' ' * 10
+        print(f"  ✓ {ticker:<6} {price}   ⚠️  no DCF (missing financial data)")
+        return
+    line = (f"  ✓ {ticker:<6} ${dcf['current_price']:>9.2f}   intrinsic ${dcf['intrinsic_value']:>9.2f}"
+            f"   upside {dcf['upside_downside']:>7.1f}%   MoS {dcf['margin_of_safety']:>7.1f}%")
+    if dcf.get('scenarios'):
+        mc = dcf['scenarios']['monte_carlo']
+        line += f"   P(undervalued) {mc['prob_undervalued']:.0%}"
+    print(line)
+
+
+def process_stock(ticker):
+    """Fetch, compute and write a single stock (no pipeline)"""
     try:
-        # 1. Fetch stock data
-        print(f"  Fetching data from yfinance...")
-        stock = yf.Ticker(ticker)
-        info = stock.info
-        
-        if not info or 'longName' not in info:
-            print(f"  ❌ No data available for {ticker}")
+        stock = fetch_stock(ticker)
+        if stock is None:
             return False
-        
-        # 2. Insert company info
-        print(f"  Inserting company: {info.get('longName')}")
-        
-        company_data = {
-            'ticker': ticker,
-            'name': info.get('longName', ticker),
-            'sector': info.get('sector', 'Unknown'),
-            'industry': info.get('industry', 'Unknown'),
-            'description': info.get('longBusinessSummary', '')[:500],  # Limit length
-            'employees': info.get('fullTimeEmployees'),
-            'market_cap': info.get('marketCap'),
-            'shares_outstanding': info.get('sharesOutstanding'),
-            'exchange': info.get('exchange', 'NASDAQ'),
-            'currency': info.get('currency', 'USD'),
-            'website': info.get('website'),
-            'data_verified': True,
-            'data_source': 'yfinance'
-        }
-        
-        result = supabase.table('companies').upsert(company_data).execute()
-        print(f"  ✓ Company data saved")
-        
-        # 3. Insert current price
-        print(f"  Inserting price data...")
-        
-        current_price = info.get('currentPrice', info.get('regularMarketPrice', 0))
-        previous_close = info.get('previousClose', current_price)
-        
-        price_data = {
-            'ticker': ticker,
-            'date': datetime.now().date().isoformat(),
-            'close': float(current_price),
-            'open': float(info.get('regularMarketOpen', current_price)),
-            'high': float(info.get('dayHigh', current_price)),
-            'low': float(info.get('dayLow', current_price)),
-            'volume': int(info.get('volume', 0)),
-            'change_amount': float(current_price - previous_close),
-            'change_percent': float(((current_price - previous_close) / previous_close * 100) if previous_close > 0 else 0),
-            'is_latest': True
-        }
-        
-        # Update any existing latest price to false first
-        supabase.table('prices').update({'is_latest': False}).eq('ticker', ticker).execute()
-        
-        # Insert new price
-        result = supabase.table('prices').insert(price_data).execute()
-        print(f"  ✓ Price data saved: ${current_price}")
-        
-        # 4. Calculate and insert DCF valuation
-        print(f"  Calculating DCF valuation...")
-        
-        dcf_result = calculate_dcf(ticker, stock, info)
-        
-        if dcf_result:
-            dcf_data = {
-                **dcf_result,
-                'valuation_date': datetime.now().date().isoformat(),
-                'ai_growth_explanation': f"Historical revenue growth rate calculated from financial statements",
-                'ai_confidence': 0.75
-            }
-            
-            result = supabase.table('dcf_valuations').upsert(dcf_data).execute()
-            
-            print(f"  ✓ DCF Valuation:")
-            print(f"    Intrinsic Value: ${dcf_result['intrinsic_value']}")
-            print(f"    Current Price: ${dcf_result['current_price']}")
-            print(f"    Upside/Downside: {dcf_result['upside_downside']:.1f}%")
-            print(f"    Margin of Safety: {dcf_result['margin_of_safety']:.1f}%")
-        else:
-            print(f"  ⚠️  Could not calculate DCF (missing financial data)")
-        
-        # 5. Calculate basic metrics
-        print(f"  Calculating metrics...")
-        
-        metrics_data = {
-            'ticker': ticker,
-            'metric_date': datetime.now().date().isoformat(),
-            'pe_ratio': info.get('trailingPE'),
-            'pb_ratio': info.get('priceToBook'),
-            'ps_ratio': info.get('priceToSalesTrailing12Months'),
-            'roe': info.get('returnOnEquity', 0) * 100 if info.get('returnOnEquity') else None,
-            'gross_margin': info.get('grossMargins', 0) * 100 if info.get('grossMargins') else None,
-            'operating_margin': info.get('operatingMargins', 0) * 100 if info.get('operatingMargins') else None,
-            'net_margin': info.get('profitMargins', 0) * 100 if info.get('profitMargins') else None,
-            'revenue_growth': info.get('revenueGrowth', 0) * 100 if info.get('revenueGrowth') else None,
-            'earnings_growth': info.get('earningsGrowth', 0) * 100 if info.get('earningsGrowth') else None,
-            'debt_to_equity': info.get('debtToEquity'),
-            'current_ratio': info.get('currentRatio'),
-            'dividend_yield': info.get('dividendYield', 0) * 100 if info.get('dividendYield') else None
-        }
-        
-        result = supabase.table('metrics').upsert(metrics_data).execute()
-        print(f"  ✓ Metrics saved")
-        
-        print(f"\n✅ {ticker} processed successfully!")
+        rows = compute_stock(ticker, stock)
+        write_stock(ticker, rows)
+        print_result(ticker, rows)
         return True
-        
     except Exception as e:
         print(f"\n❌ Error processing {ticker}: {e}")
         import traceback
         traceback.print_exc()
         return False
 
+
+# Page size for reads (PostgREST caps responses at 1000 rows by default)
+PAGE_SIZE = 1000
+
+
+def load_company_tickers(supabase):
+    """Tickers already in companies (prices rows reference them)"""
+    tickers, offset = set(), 0
+    while True:
+        page = supabase.table('companies').select('ticker').range(offset, offset + PAGE_SIZE - 1).execute().data
+        tickers.update(row['ticker'] for row in page)
+        if len(page) < PAGE_SIZE:
+            return tickers
+        offset += PAGE_SIZE
+
+
+def load_latest_valuations(supabase, tickers, chunk_size=100):
+    """{ticker: newest dcf_valuations row} with just the columns repricing needs"""
+    latest = {}
+    for start in range(0, len(tickers), chunk_size):
+        chunk = tickers[start:start + chunk_size]
+        offset = 0
+        while True:
+            page = (supabase.table('dcf_valuations')
+                    .select('ticker, valuation_date, intrinsic_value')
+                    .in_('ticker', chunk)
+                    .order('valuation_date', desc=True)
+                    .range(offset, offset + PAGE_SIZE - 1)
+                    .execute()).data
+            for row in page:
+                latest.setdefault(row['ticker'], row)
+            if len(page) < PAGE_SIZE:
+                break
+            offset += PAGE_SIZE
+    return latest
+
+
+def reprice_valuations(valuations, prices):
+    """
+    Recompute only the price-dependent DCF columns (current_price,
+    margin_of_safety, upside_downside) from the stored intrinsic value.
+    FCFE, growth and WACC are left alone.  Returns {ticker: partial row}.
+    """
+    tickers = [t for t in prices if t in valuations and valuations[t]['intrinsic_value'] is not None]
+    if not tickers:
+        return {}
+    intrinsic = np.array([float(valuations[t]['intrinsic_value']) for t in tickers])
+    price = np.array([float(prices[t]) for t in tickers])
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        margin_of_safety = (intrinsic - price) / intrinsic * 100
+        upside_downside = (intrinsic - price) / price * 100
+    
+    return {
+        ticker: {
+            'ticker': ticker,
+            'valuation_date': valuations[ticker]['valuation_date'],
+            'current_price': round(float(price[i]), 2),
+            'margin_of_safety': round(float(margin_of_safety[i]), 2) if np.isfinite(margin_of_safety[i]) else None,
+            'upside_downside': round(float(upside_downside[i]), 2) if np.isfinite(upside_downside[i]) else None,
+        }
+        for i, ticker in enumerate(tickers)
+    }
+
+
+def refresh_screening(supabase):
+    """Rebuild the denormalized screening table the agent's screen_stocks reads"""
+    started = time.perf_counter()
+    try:
+        supabase.rpc('refresh_screening').execute()
+    except Exception as e:
+        print(f"⚠️  Could not refresh screening (run the latest database/schema.sql?): {e}")
+        return
+    print(f"Screening table refreshed in {time.perf_counter() - started:.1f}s")
+
+
+def refresh_prices(args, tickers):
+    """Prices mode: one batched download, prices upsert, DCF repricing"""
+    supabase = get_supabase()
+    started = time.perf_counter()
+    
+    known = load_company_tickers(supabase)
+    unknown = [t for t in tickers if t not in known]
+    tickers = [t for t in tickers if t in known]
+    if unknown:
+        print(f"⚠️  Skipping {len(unknown)} tickers not in companies (run --mode full first): "
+              f"{', '.join(unknown[:10])}{' ...' if len(unknown) > 10 else ''}")
+    if not tickers:
+        return
+    print(f"Downloading latest quotes for {len(tickers)} tickers...")
+    
+    bars = latest_bars(add_changes(download_bars(tickers, period='5d')))
+    closes = dict(zip(bars['ticker'], bars['close']))
+    missing = [t for t in tickers if t not in closes]
+    downloaded = time.perf_counter()
+    
+    valuations = load_latest_valuations(supabase, list(closes))
+    repriced = reprice_valuations(valuations, closes)
+    
+    writer = BulkWriter(supabase, batch_size=args.batch_size, flush_interval=args.flush_interval)
+    for row in price_rows(bars, is_latest=True):
+        writer.add(row['ticker'], {'prices': row, 'dcf_valuations': repriced.get(row['ticker'])})
+    writer.close()
+    
+    print(f"\n{'='*60}")
+    print(f"Price Refresh Complete!")
+    print(f"{'='*60}")
+    print(f"✅ Prices updated: {len(closes)}")
+    print(f"✅ DCF valuations repriced: {len(repriced)}")
+    if missing:
+        print(f"❌ No quote: {', '.join(missing)}")
+    print(f"Download {downloaded - started:.1f}s, total {time.perf_counter() - started:.1f}s, "
+          f"{writer.round_trips} database round trips")
+    refresh_screening(supabase)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Populate the database from yfinance')
+    parser.add_argument('--mode', choices=('prices', 'fundamentals', 'full'), default='full',
+                        help='prices: quotes + price-dependent DCF columns only; '
+                             'fundamentals: everything except prices; full: both')
+    parser.add_argument('--tickers', help='Comma-separated tickers (default: top 50)')
+    parser.add_argument('--universe', help='File with one ticker per line (or CSV, first column)')
+    parser.add_argument('--workers', type=int, default=8, help='Concurrent yfinance fetches')
+    parser.add_argument('--compute-workers', type=int, default=2, help='DCF/metrics worker threads')
+    parser.add_argument('--rate', type=float, default=2.0,
+                        help='Max yfinance requests per second (cache hits are not throttled)')
+    parser.add_argument('--burst', type=float, default=None, help='Token bucket size (default: rate)')
+    parser.add_argument('--batch-size', type=int, default=100, help='Tickers per bulk upsert')
+    parser.add_argument('--flush-interval', type=float, default=5.0,
+                        help='Flush a partial batch after this many seconds')
+    parser.add_argument('--run-id', help='Checkpoint run ID (default: new timestamped run)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue --run-id (or the latest run): only tickers not written yet')
+    parser.add_argument('--retry-failed', action='store_true',
+                        help='Like --resume, but only tickers that failed a stage')
+    parser.add_argument('--journal', default=BOOTSTRAP_JOURNAL, help='Checkpoint journal file')
+    parser.add_argument('--cache', default=YF_CACHE_PATH, help='yfinance cache file')
+    parser.add_argument('--offline', action='store_true',
+                        help='Use cached yfinance data only (any age), no network')
+    parser.add_argument('--refresh-cache', action='store_true',
+                        help='Ignore cached yfinance data and refetch everything')
+    return parser.parse_args()
+
+
+def resolve_universe(args):
+    if args.universe:
+        return load_universe(args.universe)
+    if args.tickers:
+        return [t.strip().upper() for t in args.tickers.split(',') if t.strip()]
+    return TOP_50_STOCKS
+
+
+def resolve_run(args, journal):
+    """(run_id, tickers to fetch, {ticker: rows} to write without refetching)"""
+    if not (args.resume or args.retry_failed):
+        run_id = args.run_id or datetime.now().strftime('%Y%m%d-%H%M%S')
+        tickers = resolve_universe(args)
+        journal.start_run(run_id, tickers)
+        return run_id, tickers, {}
+    
+    run_id = args.run_id or journal.latest_run()
+    if not run_id or journal.run_tickers(run_id) is None:
+        print(f"❌ No checkpointed run to resume in {args.journal}")
+        exit(1)
+    pending = journal.pending(run_id, failed_only=args.retry_failed)
+    computed = journal.computed_rows(run_id, pending)
+    return run_id, [t for t in pending if t not in computed], computed
+
+
 def main():
     """Main bootstrap process"""
+    args = parse_args()
+    if args.mode == 'prices':
+        if args.offline:
+            print("❌ --mode prices downloads fresh quotes and cannot run --offline")
+            exit(1)
+        return refresh_prices(args, resolve_universe(args))
+    
+    global _yf_cache
+    _yf_cache = YFinanceCache(
+        args.cache, ttl=YF_CACHE_TTL, offline=args.offline, refresh=args.refresh_cache,
+        rate_limiter=TokenBucket(args.rate, args.burst),
+    )
+    journal = Journal(args.journal)
+    run_id, tickers, computed = resolve_run(args, journal)
+    supabase = get_supabase()
+    
     print("""
 ╔═══════════════════════════════════════════════════════════╗
 ║         TradvisorAI Database Bootstrap                     ║
-║         Fetching Top 50 Stocks from yfinance              ║
+║         Fetching stocks from yfinance                     ║
 ╚═══════════════════════════════════════════════════════════╝
 """)
     
     print(f"Starting at: {datetime.now()}")
-    print(f"Stocks to process: {len(TOP_50_STOCKS)}")
-    print(f"Estimated time: ~15 minutes\n")
+    print(f"Mode: {args.mode}")
+    print(f"Run ID: {run_id} (journal: {args.journal})")
+    print(f"Stocks to process: {len(tickers) + len(computed)}"
+          + (f" ({len(computed)} already computed, resuming at write)" if computed else ""))
+    print(f"Fetch workers: {args.workers}, rate limit: {args.rate}/sec")
+    print(f"Batch size: {args.batch_size}, flush interval: {args.flush_interval}s\n")
     
-    successful = 0
-    failed = 0
+    def fetch_and_checkpoint(ticker):
+        stock = fetch_stock(ticker)
+        if stock is not None:
+            journal.done(run_id, ticker, 'fetch')
+        return stock
     
-    for i, ticker in enumerate(TOP_50_STOCKS, 1):
-        print(f"\n[{i}/{len(TOP_50_STOCKS)}] Processing {ticker}...")
-        
-        if process_stock(ticker):
-            successful += 1
-        else:
-            failed += 1
-        
-        # Rate limiting - be nice to yfinance
-        if i < len(TOP_50_STOCKS):
-            print(f"  Waiting 2 seconds...")
-            time.sleep(2)
+    def compute_and_checkpoint(ticker, stock):
+        rows = compute_stock(ticker, stock)
+        if args.mode == 'fundamentals':
+            rows['prices'] = None  # left to --mode prices
+        journal.done(run_id, ticker, 'compute', rows)
+        return rows
+    
+    def report_batch(batch):
+        journal.done_many(run_id, [ticker for ticker, _ in batch], 'write')
+        for ticker, rows in batch:
+            print_result(ticker, rows)
+    
+    def report_batch_failure(batch, error):
+        # The tickers already passed the write stage; mark them failed now
+        for ticker, _ in batch:
+            pipeline.stats.fail(ticker, 'write', error)
+            journal.failed(run_id, ticker, 'write', error)
+            print(f"  ❌ {ticker:<6} failed at write: {error}")
+    
+    def report_failure(ticker, ok, stage, error):
+        if not ok:
+            journal.failed(run_id, ticker, stage, error)
+            print(f"  ❌ {ticker:<6} failed at {stage}: {error}")
+    
+    writer = BulkWriter(
+        supabase,
+        batch_size=args.batch_size,
+        flush_interval=args.flush_interval,
+        on_flush=report_batch,
+        on_error=report_batch_failure,
+    )
+    pipeline = Pipeline(
+        fetch=fetch_and_checkpoint,
+        compute=compute_and_checkpoint,
+        write=writer.add,
+        flush=writer.flush,
+        flush_interval=args.flush_interval,
+        fetch_workers=args.workers,
+        compute_workers=args.compute_workers,
+        rate=0,  # yfinance calls are paced inside the cache, so hits run unthrottled
+        on_result=report_failure,
+    )
+    stats = pipeline.run(tickers, computed=computed)
     
     print(f"\n{'='*60}")
     print(f"Bootstrap Complete!")
     print(f"{'='*60}")
-    print(f"✅ Successful: {successful}")
-    print(f"❌ Failed: {failed}")
+    print(f"✅ Successful: {stats.succeeded}")
+    print(f"❌ Failed: {len(stats.failures)}")
+    print(stats.report())
+    print(f"Database round trips: {writer.round_trips}")
+    print(f"yfinance cache: {_yf_cache.report()}")
+    remaining = journal.pending(run_id)
+    if remaining:
+        print(f"Incomplete: {len(remaining)} tickers - rerun with --resume --run-id {run_id}")
     print(f"Finished at: {datetime.now()}\n")
     
+    refresh_screening(supabase)
+    
     # Verify database
     print("Verifying database...")
     companies = supabase.table('companies').select('ticker').execute()
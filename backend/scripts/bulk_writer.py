@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Buffered bulk writer for the bootstrap
+
+Writing one ticker took five Supabase round trips: the companies upsert,
+the is_latest reset, the prices insert and the dcf_valuations and metrics
+upserts.  BulkWriter collects rows across tickers instead, and flushes each
+table with ONE multi-row upsert per batch.  The is_latest flip becomes a
+single set-based UPDATE for the whole batch, so 100 tickers take 5 round
+trips instead of 500.
+
+A table's entry may also be a list of rows (financials has one row per
+period).
+
+A batch is flushed when it reaches `batch_size` tickers, when
+`flush_interval` seconds have passed since the last flush (checked via
+flush()), or on close().
+"""
+
+import time
+
+# Flush order matters: the other tables reference companies(ticker)
+TABLES = ('companies', 'financials', 'prices', 'dcf_valuations', 'metrics')
+
+# Conflict targets for the multi-row upserts (the tables' unique keys)
+ON_CONFLICT = {
+    'companies': 'ticker',
+    'financials': 'ticker,period_end,period_type',
+    'prices': 'ticker,date',
+    'dcf_valuations': 'ticker,valuation_date',
+    'metrics': 'ticker,metric_date',
+}
+
+
+class BulkWriter:
+    """
+    add(ticker, rows) buffers {table: row | [rows] | None}; flush() writes the batch.
+
+    on_flush(batch) is called with [(ticker, rows), ...] after a successful
+    flush; on_error(batch, error) if any statement in the flush fails.  Then
+    flush() returns False, and so does add() when its ticker was in the failed
+    batch, so the caller doesn't also count it as written.
+    """
+
+    def __init__(self, client, batch_size=100, flush_interval=5.0, on_flush=None, on_error=None):
+        self.client = client
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_flush = on_flush
+        self.on_error = on_error
+        self.pending = []
+        self.last_flush = time.monotonic()
+        self.round_trips = 0
+
+    def add(self, ticker, rows):
+        """Buffer a ticker's rows; False if they were flushed right away and the write failed"""
+        self.pending.append((ticker, rows))
+        if len(self.pending) >= self.batch_size:
+            return self.flush(force=True)
+        return True
+
+    def flush(self, force=False):
+        """Write the pending batch (if full, overdue or forced); False if it failed"""
+        if not self.pending:
+            return True
+        if not force and time.monotonic() - self.last_flush < self.flush_interval:
+            return True
+
+        batch, self.pending = self.pending, []
+        self.last_flush = time.monotonic()
+        try:
+            self._write_batch(batch)
+        except Exception as e:
+            if self.on_error:
+                self.on_error(batch, e)
+                return False
+            raise
+        if self.on_flush:
+            self.on_flush(batch)
+        return True
+
+    def close(self):
+        self.flush(force=True)
+
+    def _write_batch(self, batch):
+        by_table = {table: [] for table in TABLES}
+        for _, rows in batch:
+            for table in TABLES:
+                row = rows.get(table)
+                if isinstance(row, list):
+                    by_table[table].extend(row)
+                elif row:
+                    by_table[table].append(row)
+
+        for table in TABLES:
+            table_rows = by_table[table]
+            if not table_rows:
+                continue
+            if table == 'prices':
+                self._reset_latest_prices(table_rows)
+            self.client.table(table).upsert(table_rows, on_conflict=ON_CONFLICT[table]).execute()
+            self.round_trips += 1
+
+    def _reset_latest_prices(self, price_rows):
+        """One UPDATE per batch: older rows of these tickers stop being the latest"""
+        by_date = {}
+        for row in price_rows:
+            if row.get('is_latest'):
+                by_date.setdefault(row['date'], []).append(row['ticker'])
+
+        for date, tickers in by_date.items():
+            (self.client.table('prices')
+                .update({'is_latest': False})
+                .in_('ticker', tickers)
+                .lt('date', date)
+                .execute())
+            self.round_trips += 1
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Checkpoint journal for resumable bootstrap runs
+
+A local SQLite file records, per run ID, which tickers finished which stage
+(fetch, compute, write) and why the others failed.  The compute stage also
+stores the rows it produced, so a ticker that was computed but never
+written resumes straight at the write stage instead of refetching.
+
+    journal = Journal('bootstrap_journal.db')
+    journal.start_run(run_id, tickers)
+    journal.done(run_id, 'AAPL', 'fetch')
+    journal.failed(run_id, 'MSFT', 'compute', 'no cashflow')
+    journal.pending(run_id)           # tickers not written yet
+    journal.pending(run_id, failed_only=True)
+"""
+
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+STAGES = ('fetch', 'compute', 'write')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    started_at TEXT NOT NULL,
+    tickers TEXT NOT NULL            -- JSON list, the run's universe in order
+);
+CREATE TABLE IF NOT EXISTS stages (
+    run_id TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    stage TEXT NOT NULL,             -- fetch | compute | write
+    status TEXT NOT NULL,            -- done | failed
+    error TEXT,
+    rows TEXT,                       -- JSON rows from the compute stage
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (run_id, ticker, stage)
+);
+"""
+
+
+def _to_json(value):
+    # NumPy scalars (np.float64, np.int64) -> plain Python numbers
+    return json.dumps(value, default=lambda o: o.item() if hasattr(o, 'item') else str(o))
+
+
+class Journal:
+    """Thread-safe: fetch, compute and writer threads all record into it"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(SCHEMA)
+
+    def _execute(self, sql, params=()):
+        with self.lock:
+            cursor = self.conn.execute(sql, params)
+            rows = cursor.fetchall()
+            self.conn.commit()
+            return rows
+
+    def start_run(self, run_id, tickers):
+        """Register a run (keeps the original universe when the run already exists)"""
+        self._execute(
+            'INSERT OR IGNORE INTO runs (run_id, started_at, tickers) VALUES (?, ?, ?)',
+            (run_id, datetime.now().isoformat(), json.dumps(list(tickers))),
+        )
+
+    def latest_run(self):
+        rows = self._execute('SELECT run_id FROM runs ORDER BY started_at DESC LIMIT 1')
+        return rows[0][0] if rows else None
+
+    def run_tickers(self, run_id):
+        rows = self._execute('SELECT tickers FROM runs WHERE run_id = ?', (run_id,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def _record(self, run_id, ticker, stage, status, error=None, rows=None):
+        self._execute(
+            'INSERT OR REPLACE INTO stages (run_id, ticker, stage, status, error, rows, updated_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (run_id, ticker, stage, status, error, rows, datetime.now().isoformat()),
+        )
+
+    def done(self, run_id, ticker, stage, rows=None):
+        self._record(run_id, ticker, stage, 'done', rows=_to_json(rows) if rows is not None else None)
+
+    def done_many(self, run_id, tickers, stage):
+        now = datetime.now().isoformat()
+        with self.lock:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO stages (run_id, ticker, stage, status, error, rows, updated_at) '
+                "VALUES (?, ?, ?, 'done', NULL, NULL, ?)",
+                [(run_id, ticker, stage, now) for ticker in tickers],
+            )
+            self.conn.commit()
+
+    def failed(self, run_id, ticker, stage, error):
+        self._record(run_id, ticker, stage, 'failed', error=str(error))
+
+    def status(self, run_id):
+        """{ticker: {stage: status}}"""
+        status = {}
+        for ticker, stage, state in self._execute(
+            'SELECT ticker, stage, status FROM stages WHERE run_id = ?', (run_id,)
+        ):
+            status.setdefault(ticker, {})[stage] = state
+        return status
+
+    def pending(self, run_id, failed_only=False):
+        """Tickers of the run that are not written yet, in universe order"""
+        status = self.status(run_id)
+        pending = []
+        for ticker in self.run_tickers(run_id) or []:
+            stages = status.get(ticker, {})
+            if stages.get('write') == 'done':
+                continue
+            if failed_only and 'failed' not in stages.values():
+                continue
+            pending.append(ticker)
+        return pending
+
+    def computed_rows(self, run_id, tickers):
+        """{ticker: rows} for tickers whose compute stage finished (resume at write)"""
+        wanted = set(tickers)
+        return {
+            ticker: json.loads(rows)
+            for ticker, rows in self._execute(
+                "SELECT ticker, rows FROM stages WHERE run_id = ? AND stage = 'compute' "
+                "AND status = 'done' AND rows IS NOT NULL", (run_id,)
+            )
+            if ticker in wanted
+        }
+
+    def summary(self, run_id):
+        """{stage: {status: count}}"""
+        summary = {stage: {} for stage in STAGES}
+        for stage, state, count in self._execute(
+            'SELECT stage, status, COUNT(*) FROM stages WHERE run_id = ? GROUP BY stage, status',
+            (run_id,),
+        ):
+            summary.setdefault(stage, {})[state] = count
+        return summary
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
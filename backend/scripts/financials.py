@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Statements -> financials table
+
+FIELD_MAP declares where every `financials` column comes from: the
+statement and the yfinance row labels to try, in order (labels vary between
+companies and yfinance versions).  normalize_statements() applies the whole
+map to the annual and quarterly statements of any number of tickers at
+once: each statement is transposed to periods x labels, stacked across
+tickers, and every column is picked with one vectorized first-non-null
+across its candidate labels.
+
+The normalized frame is what calculate_dcf and the metrics read; they no
+longer dig single cells out of the raw yfinance DataFrames.
+
+Signs follow yfinance: capex, debt repayments and dividends are negative.
+
+Usage (normalize the cached statements of a universe in one pass):
+    python financials.py --tickers AAPL,MSFT
+    python financials.py --universe sp500.txt --offline
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# (column, statement, yfinance labels in order of preference)
+# Columns starting with '_' are inputs for derived columns, not stored.
+FIELD_MAP = [
+    # Income statement
+    ('revenue', 'income', ['Total Revenue', 'Operating Revenue']),
+    ('cost_of_revenue', 'income', ['Cost Of Revenue', 'Reconciled Cost Of Revenue']),
+    ('gross_profit', 'income', ['Gross Profit']),
+    ('operating_expenses', 'income', ['Operating Expense']),
+    ('operating_income', 'income', ['Operating Income', 'Total Operating Income As Reported']),
+    ('interest_expense', 'income', ['Interest Expense', 'Interest Expense Non Operating']),
+    ('tax_expense', 'income', ['Tax Provision']),
+    ('net_income', 'income', ['Net Income', 'Net Income Common Stockholders']),
+    ('eps', 'income', ['Basic EPS']),
+    ('eps_diluted', 'income', ['Diluted EPS']),
+    ('shares_basic', 'income', ['Basic Average Shares']),
+    ('shares_diluted', 'income', ['Diluted Average Shares']),
+    ('ebitda', 'income', ['EBITDA', 'Normalized EBITDA']),
+    ('ebit', 'income', ['EBIT']),
+
+    # Balance sheet
+    ('total_assets', 'balance', ['Total Assets']),
+    ('current_assets', 'balance', ['Current Assets']),
+    ('cash', 'balance', ['Cash And Cash Equivalents', 'Cash Cash Equivalents And Short Term Investments']),
+    ('accounts_receivable', 'balance', ['Accounts Receivable', 'Receivables']),
+    ('inventory', 'balance', ['Inventory']),
+    ('total_liabilities', 'balance', ['Total Liabilities Net Minority Interest']),
+    ('current_liabilities', 'balance', ['Current Liabilities']),
+    ('total_debt', 'balance', ['Total Debt']),
+    ('long_term_debt', 'balance', ['Long Term Debt']),
+    ('short_term_debt', 'balance', ['Current Debt', 'Current Debt And Capital Lease Obligation']),
+    ('shareholders_equity', 'balance', ['Stockholders Equity', 'Common Stock Equity']),
+    ('retained_earnings', 'balance', ['Retained Earnings']),
+
+    # Cash flow statement
+    ('operating_cash_flow', 'cashflow', ['Operating Cash Flow']),
+    ('investing_cash_flow', 'cashflow', ['Investing Cash Flow']),
+    ('financing_cash_flow', 'cashflow', ['Financing Cash Flow']),
+    ('capex', 'cashflow', ['Capital Expenditure']),
+    ('free_cash_flow', 'cashflow', ['Free Cash Flow']),
+    ('dividends_paid', 'cashflow', ['Cash Dividends Paid', 'Common Stock Dividend Paid']),
+    ('_debt_issued', 'cashflow', ['Issuance Of Debt']),
+    ('_debt_repaid', 'cashflow', ['Repayment Of Debt']),
+]
+
+FREQUENCIES = ('annual', 'quarterly')
+
+# Per-share columns are DECIMAL; everything else is BIGINT
+DECIMAL_COLUMNS = ('eps', 'eps_diluted')
+
+COLUMNS = [column for column, _, _ in FIELD_MAP if not column.startswith('_')] + ['net_borrowing']
+
+
+def _first_available(wide, labels):
+    """First non-null value across candidate labels, row-wise"""
+    present = [label for label in labels if label in wide.columns]
+    if not present:
+        return pd.Series(np.nan, index=wide.index)
+    values = wide[present].apply(pd.to_numeric, errors='coerce')
+    return values.bfill(axis=1).iloc[:, 0]
+
+
+def _stack(statements_by_ticker, frequency, statement):
+    """One statement for all tickers -> (ticker, period_end) x label frame"""
+    parts = {}
+    for ticker, statements in statements_by_ticker.items():
+        frame = (statements or {}).get(frequency, {}).get(statement)
+        if frame is not None and not frame.empty:
+            parts[ticker] = frame.T
+    if not parts:
+        return None
+    wide = pd.concat(parts, names=['ticker', 'period_end'])
+    return wide[~wide.index.duplicated()]
+
+
+def normalize_statements(statements_by_ticker):
+    """
+    {ticker: {'annual'|'quarterly': {'income'|'balance'|'cashflow': DataFrame}}}
+      -> DataFrame with one row per (ticker, period_type, period_end).
+
+    period_type is 'FY' for annual statements and the calendar quarter of
+    period_end ('Q1'..'Q4') for quarterly ones.
+    """
+    frames = []
+    for frequency in FREQUENCIES:
+        mapped = []
+        for statement in ('income', 'balance', 'cashflow'):
+            wide = _stack(statements_by_ticker, frequency, statement)
+            if wide is None:
+                continue
+            mapped.append(pd.DataFrame({
+                column: _first_available(wide, labels)
+                for column, source, labels in FIELD_MAP if source == statement
+            }, index=wide.index))
+        if not mapped:
+            continue
+        frame = pd.concat(mapped, axis=1).reset_index()
+        frame['frequency'] = frequency
+        frames.append(frame)
+
+    if not frames:
+        return pd.DataFrame(columns=['ticker', 'period_end', 'period_type', 'fiscal_year'] + COLUMNS)
+
+    frame = pd.concat(frames, ignore_index=True)
+    for column, _, _ in FIELD_MAP:
+        if column not in frame:
+            frame[column] = np.nan
+
+    frame['period_end'] = pd.to_datetime(frame['period_end'])
+    frame['fiscal_year'] = frame['period_end'].dt.year
+    frame['period_type'] = np.where(
+        frame['frequency'] == 'annual', 'FY', 'Q' + frame['period_end'].dt.quarter.astype(str)
+    )
+
+    # Derived columns
+    frame['free_cash_flow'] = frame['free_cash_flow'].fillna(frame['operating_cash_flow'] + frame['capex'])
+    frame['net_borrowing'] = (
+        frame['_debt_issued'].fillna(0) - frame['_debt_repaid'].abs().fillna(0)
+    ).where(frame['_debt_issued'].notna() | frame['_debt_repaid'].notna())
+
+    frame = frame.drop(columns=['frequency', '_debt_issued', '_debt_repaid'])
+    # yfinance pads statements with empty older periods
+    frame = frame.dropna(subset=COLUMNS, how='all')
+    return frame.sort_values(['ticker', 'period_type', 'period_end'], ascending=[True, True, False],
+                             ignore_index=True)
+
+
+def annual(frame, ticker):
+    """A ticker's fiscal-year rows, newest first"""
+    rows = frame[(frame['ticker'] == ticker) & (frame['period_type'] == 'FY')]
+    return rows.sort_values('period_end', ascending=False, ignore_index=True)
+
+
+def latest_value(rows, column, default=None):
+    """Newest non-null value of a column (rows newest first)"""
+    values = rows[column].dropna() if column in rows else ()
+    return float(values.iloc[0]) if len(values) else default
+
+
+def financial_rows(frame):
+    """financials table rows (plain Python values, NaN -> None)"""
+    out = frame[['ticker', 'period_end', 'period_type', 'fiscal_year'] + COLUMNS].copy()
+    out['period_end'] = out['period_end'].dt.strftime('%Y-%m-%d')
+    for column in COLUMNS:
+        if column in DECIMAL_COLUMNS:
+            out[column] = out[column].round(4)
+        else:
+            out[column] = out[column].round().astype('Int64')
+    out = out.astype(object)
+    return out.where(out.notna(), None).to_dict('records')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Normalize yfinance statements into financials')
+    parser.add_argument('--tickers', help='Comma-separated tickers (default: top 50)')
+    parser.add_argument('--universe', help='File with one ticker per line (or CSV, first column)')
+    parser.add_argument('--offline', action='store_true', help='Use cached statements only')
+    parser.add_argument('--batch-size', type=int, default=2000, help='Rows per upsert')
+    return parser.parse_args()
+
+
+def main():
+    # Imported here: bootstrap_db imports this module
+    from bootstrap_db import YF_CACHE_PATH, YF_CACHE_TTL, get_supabase, load_company_tickers, resolve_universe
+    from bulk_writer import BulkWriter
+    from yf_cache import YFinanceCache
+
+    args = parse_args()
+    supabase = get_supabase()
+    known = load_company_tickers(supabase)
+    tickers = [t for t in resolve_universe(args) if t in known]
+
+    cache = YFinanceCache(YF_CACHE_PATH, ttl=YF_CACHE_TTL, offline=args.offline)
+    statements = {ticker: cache.statements(ticker) for ticker in tickers}
+
+    frame = normalize_statements(statements)
+    rows = financial_rows(frame)
+    print(f"Normalized {len(rows):,} periods for {frame['ticker'].nunique()} tickers")
+
+    writer = BulkWriter(supabase, batch_size=args.batch_size)
+    for row in rows:
+        writer.add(row['ticker'], {'financials': row})
+    writer.close()
+    print(f"✅ Written in {writer.round_trips} upserts ({cache.report()})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Monte Carlo DCF valuation
+
+Instead of three hand-picked scenarios, sample growth, WACC and terminal
+growth from distributions and value every draw with the dcf_engine model.
+Draws are processed in fixed-size chunks, so temporaries stay bounded no
+matter how many draws are requested; only one float per draw is kept for
+the percentiles.
+
+Distribution specs (all rates are decimals):
+    0.10                                          fixed value
+    {'dist': 'normal', 'mean': 0.10, 'std': 0.03}
+    {'dist': 'uniform', 'low': 0.08, 'high': 0.12}
+    {'dist': 'triangular', 'low': 0.015, 'mode': 0.025, 'high': 0.03}
+
+Used by bootstrap_db (stored in dcf_valuations.scenarios) and by the
+agent's run_monte_carlo tool.  `python monte_carlo.py` times 100k draws.
+"""
+
+import time
+
+import numpy as np
+
+from dcf_engine import valuation_factors, PROJECTION_YEARS, HIGH_GROWTH_YEARS, TERMINAL_GROWTH
+
+DEFAULT_DRAWS = 100_000
+DEFAULT_CHUNK_SIZE = 25_000
+PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+
+# Spread around the point estimates when no distributions are given
+DEFAULT_GROWTH_STD = 0.03
+DEFAULT_WACC_STD = 0.01
+DEFAULT_TERMINAL_GROWTH = {'dist': 'triangular', 'low': 0.015, 'mode': TERMINAL_GROWTH, 'high': 0.03}
+
+
+def default_distributions(growth_rate, wacc):
+    """Normal around the point estimates + triangular terminal growth"""
+    return {
+        'growth': {'dist': 'normal', 'mean': growth_rate, 'std': DEFAULT_GROWTH_STD},
+        'wacc': {'dist': 'normal', 'mean': wacc, 'std': DEFAULT_WACC_STD},
+        'terminal_growth': DEFAULT_TERMINAL_GROWTH,
+    }
+
+
+def sample(spec, n, rng):
+    """Draw n values from a distribution spec"""
+    if not isinstance(spec, dict):
+        return np.full(n, float(spec))
+
+    dist = spec.get('dist', 'normal')
+    if dist == 'normal':
+        return rng.normal(spec['mean'], spec['std'], n)
+    if dist == 'uniform':
+        return rng.uniform(spec['low'], spec['high'], n)
+    if dist == 'triangular':
+        return rng.triangular(spec['low'], spec['mode'], spec['high'], n)
+    raise ValueError(f"Unknown distribution: {dist}")
+
+
+def run_monte_carlo(base_fcfe, net_debt, shares_outstanding, current_price,
+                    growth, wacc, terminal_growth=DEFAULT_TERMINAL_GROWTH,
+                    draws=DEFAULT_DRAWS, chunk_size=DEFAULT_CHUNK_SIZE, seed=None,
+                    years=PROJECTION_YEARS, high_growth_years=HIGH_GROWTH_YEARS):
+    """
+    Distribution of intrinsic value per share for one ticker.
+
+    Returns percentiles, mean/std, the probability that the stock is
+    undervalued (intrinsic value > current price) and the probability of a
+    margin of safety of 30% or more.  Draws where WACC <= terminal growth
+    have no finite value and are dropped (see valid_draws).
+    """
+    if shares_outstanding <= 0:
+        raise ValueError("shares_outstanding must be positive")
+
+    rng = np.random.default_rng(seed)
+    values = np.empty(draws)
+
+    for start in range(0, draws, chunk_size):
+        n = min(chunk_size, draws - start)
+        growth_draws = sample(growth, n, rng)
+        wacc_draws = sample(wacc, n, rng)
+        terminal_draws = sample(terminal_growth, n, rng)
+
+        pv_factor, terminal_factor = valuation_factors(
+            growth_draws, wacc_draws, terminal_draws, years, high_growth_years
+        )
+        chunk = (base_fcfe * (pv_factor + terminal_factor) - net_debt) / shares_outstanding
+        chunk[wacc_draws <= terminal_draws] = np.nan
+        values[start:start + n] = chunk
+
+    values = values[np.isfinite(values)]
+    if values.size == 0:
+        raise ValueError("No valid draws (WACC never exceeded terminal growth)")
+
+    result = {
+        'draws': draws,
+        'valid_draws': int(values.size),
+        'percentiles': {
+            f'p{p}': round(float(v), 2)
+            for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))
+        },
+        'mean': round(float(values.mean()), 2),
+        'std': round(float(values.std()), 2),
+        'distributions': {'growth': growth, 'wacc': wacc, 'terminal_growth': terminal_growth},
+    }
+
+    if current_price and current_price > 0:
+        result['current_price'] = round(float(current_price), 2)
+        result['prob_undervalued'] = round(float((values > current_price).mean()), 4)
+        # MoS >= 30%  <=>  intrinsic >= price / 0.7 (for positive intrinsic values)
+        result['prob_margin_of_safety_30'] = round(float((values >= current_price / 0.7).mean()), 4)
+
+    return result
+
+
+def main():
+    print(f"Monte Carlo DCF: {DEFAULT_DRAWS:,} draws per ticker")
+    args = dict(
+        base_fcfe=100e9, net_debt=40e9, shares_outstanding=15e9, current_price=180.0,
+        **default_distributions(growth_rate=0.10, wacc=0.09), seed=0,
+    )
+    run_monte_carlo(**args)  # warm-up
+
+    runs = 20
+    start = time.perf_counter()
+    for _ in range(runs):
+        result = run_monte_carlo(**args)
+    elapsed = (time.perf_counter() - start) / runs
+
+    print(f"  {elapsed * 1000:.1f} ms per ticker")
+    print(f"  Percentiles: {result['percentiles']}")
+    print(f"  P(undervalued): {result['prob_undervalued']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Concurrent ingestion pipeline for the bootstrap
+
+Three stages connected by bounded queues:
+  fetch   - thread pool doing the network-bound yfinance calls, paced by a
+            token bucket instead of a fixed sleep between tickers
+  compute - worker threads for DCF / Monte Carlo / metrics (CPU-bound)
+  write   - a single writer thread that owns the database calls
+
+The bounded queues give backpressure: if writes fall behind, fetching
+slows down instead of piling results up in memory.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+_DONE = object()  # queue sentinel: no more work for this stage
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens=1.0):
+        """Block until `tokens` are available, then spend them"""
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+@dataclass
+class PipelineStats:
+    """Counts and timings for one pipeline run"""
+    total: int = 0
+    done: set = field(default_factory=set)             # tickers that made it through every stage
+    failures: dict = field(default_factory=dict)      # ticker -> (stage, error)
+    stage_seconds: dict = field(default_factory=dict)  # stage -> busy seconds (summed across workers)
+    stage_counts: dict = field(default_factory=dict)
+    elapsed: float = 0.0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, stage, seconds):
+        with self.lock:
+            self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+            self.stage_counts[stage] = self.stage_counts.get(stage, 0) + 1
+
+    def fail(self, ticker, stage, error):
+        with self.lock:
+            # A buffered write can still fail after the ticker was handed off
+            self.done.discard(ticker)
+            self.failures[ticker] = (stage, str(error))
+
+    def succeed(self, ticker):
+        with self.lock:
+            self.done.add(ticker)
+
+    @property
+    def succeeded(self):
+        return len(self.done)
+
+    @property
+    def throughput(self):
+        """Successfully processed tickers per second"""
+        return self.succeeded / self.elapsed if self.elapsed else 0.0
+
+    def report(self):
+        lines = [
+            f"Processed {self.succeeded}/{self.total} tickers in {self.elapsed:.1f}s "
+            f"({self.throughput:.2f} tickers/sec)",
+        ]
+        for stage, seconds in self.stage_seconds.items():
+            count = self.stage_counts[stage]
+            lines.append(f"  {stage:<8} {count:>5} items, avg {seconds / count * 1000:8.1f} ms")
+        return "\n".join(lines)
+
+
+class Pipeline:
+    """
+    fetch(ticker) -> payload | None
+    compute(ticker, payload) -> rows | None
+    write(ticker, rows) -> None | False
+    flush(force) -> None   (optional, for buffered writers)
+
+    Each stage raises or returns None to mark a ticker as failed at that stage,
+    except write: it returns False when a buffered writer flushed the ticker
+    right away and the failure has already been reported (e.g. through
+    stats.fail), so the ticker is not also counted as written.
+    When `flush` is given, the writer thread calls flush(force=False) whenever
+    it has been idle for `flush_interval` seconds and flush(force=True) once
+    the last ticker has been written, so buffered rows never wait for more
+    input and every database call stays on the writer thread.
+    """
+
+    def __init__(self, fetch, compute, write, fetch_workers=8, compute_workers=2,
+                 rate=2.0, burst=None, queue_size=32, on_result=None,
+                 flush=None, flush_interval=1.0):
+        self.fetch = fetch
+        self.compute = compute
+        self.write = write
+        self.flush = flush
+        self.flush_interval = flush_interval
+        self.fetch_workers = fetch_workers
+        self.compute_workers = compute_workers
+        self.rate_limiter = TokenBucket(rate, burst)
+        self.queue_size = queue_size
+        # Called as on_result(ticker, ok, stage, error) after each ticker finishes
+        self.on_result = on_result
+
+    def run(self, tickers, computed=None):
+        """
+        Run every ticker through the stages.  `computed` ({ticker: rows}) holds
+        tickers whose rows are already known (e.g. from a checkpoint journal);
+        they go straight to the write stage.
+        """
+        computed = computed or {}
+        # Exposed so buffered writers can report late write failures
+        self.stats = stats = PipelineStats(total=len(tickers) + len(computed))
+        compute_queue = queue.Queue(maxsize=self.queue_size)
+        write_queue = queue.Queue(maxsize=self.queue_size)
+        started = time.perf_counter()
+
+        def finish(ticker, ok, stage=None, error=None):
+            if ok:
+                stats.succeed(ticker)
+            else:
+                stats.fail(ticker, stage, error)
+            if self.on_result:
+                self.on_result(ticker, ok, stage, error)
+
+        def run_stage(stage, func, ticker, *args):
+            start = time.perf_counter()
+            try:
+                result, error = func(ticker, *args), None
+            except Exception as e:
+                result, error = None, e
+            stats.record(stage, time.perf_counter() - start)
+            if result is None:
+                finish(ticker, False, stage, error or 'no data')
+            return result
+
+        def fetch_one(ticker):
+            self.rate_limiter.acquire()
+            payload = run_stage('fetch', self.fetch, ticker)
+            if payload is not None:
+                compute_queue.put((ticker, payload))
+
+        def compute_worker():
+            while (item := compute_queue.get()) is not _DONE:
+                ticker, payload = item
+                rows = run_stage('compute', self.compute, ticker, payload)
+                if rows is not None:
+                    write_queue.put((ticker, rows))
+
+        def next_write():
+            if self.flush is None:
+                return write_queue.get()
+            while True:
+                try:
+                    return write_queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    self.flush(force=False)
+
+        def write_worker():
+            while (item := next_write()) is not _DONE:
+                ticker, rows = item
+                start = time.perf_counter()
+                try:
+                    written = self.write(ticker, rows)
+                except Exception as e:
+                    stats.record('write', time.perf_counter() - start)
+                    finish(ticker, False, 'write', e)
+                else:
+                    stats.record('write', time.perf_counter() - start)
+                    if written is not False:
+                        finish(ticker, True)
+                if self.flush is not None:
+                    self.flush(force=False)
+            if self.flush is not None:
+                self.flush(force=True)
+
+        compute_threads = [
+            threading.Thread(target=compute_worker, name=f'compute-{i}', daemon=True)
+            for i in range(self.compute_workers)
+        ]
+        writer = threading.Thread(target=write_worker, name='writer', daemon=True)
+        for thread in compute_threads + [writer]:
+            thread.start()
+
+        for ticker, rows in computed.items():
+            write_queue.put((ticker, rows))
+
+        with ThreadPoolExecutor(max_workers=self.fetch_workers, thread_name_prefix='fetch') as executor:
+            list(executor.map(fetch_one, tickers))
+
+        for _ in compute_threads:
+            compute_queue.put(_DONE)
+        for thread in compute_threads:
+            thread.join()
+        write_queue.put(_DONE)
+        writer.join()
+
+        stats.elapsed = time.perf_counter() - started
+        return stats
+
+
+def load_universe(path):
+    """Tickers from a file: one per line (or CSV, first column); '#' starts a comment"""
+    tickers = []
+    with open(path) as f:
+        for line in f:
+            symbol = line.split('#', 1)[0].split(',', 1)[0].strip().upper()
+            if symbol and symbol not in ('TICKER', 'SYMBOL') and symbol not in tickers:
+                tickers.append(symbol)
+    return tickers
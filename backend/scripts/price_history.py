@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Daily price bars for many tickers at once
+
+`yf.download` fetches the whole universe in one batched call (yfinance
+splits it into threaded requests internally).  The result is reshaped into
+a long frame, one row per (ticker, date), and change_amount/change_percent
+are computed with a grouped shift instead of a Python loop per ticker.
+
+Used by bootstrap_db's prices mode (latest bar per ticker) and by
+backfill_prices (years of history).
+"""
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+# yfinance column -> prices table column
+FIELDS = {
+    'Open': 'open',
+    'High': 'high',
+    'Low': 'low',
+    'Close': 'close',
+    'Volume': 'volume',
+}
+
+COLUMNS = ['ticker', 'date', 'open', 'high', 'low', 'close', 'volume']
+
+
+def download_bars(tickers, **kwargs):
+    """
+    Daily OHLCV for `tickers` in one yf.download call -> long DataFrame.
+
+    kwargs go to yf.download (period='5d', start=..., end=...).  Days a
+    ticker did not trade (NaN close) are dropped.
+    """
+    data = yf.download(
+        list(tickers), interval='1d', group_by='column', auto_adjust=False,
+        progress=False, threads=True, **kwargs,
+    )
+    if data is None or data.empty:
+        return pd.DataFrame(columns=COLUMNS)
+
+    if not isinstance(data.columns, pd.MultiIndex):
+        # Older yfinance returns flat columns for a single ticker
+        data.columns = pd.MultiIndex.from_product([data.columns, [tickers[0]]])
+
+    symbols = data['Close'].columns
+    dates = pd.DatetimeIndex(data.index).tz_localize(None)
+
+    # dates x tickers matrices, raveled row-major: (date0, t0), (date0, t1), ...
+    bars = pd.DataFrame({
+        'ticker': np.tile(np.asarray(symbols, dtype=object), len(dates)),
+        'date': np.repeat(dates.values, len(symbols)),
+        **{
+            column: data[field].reindex(columns=symbols).to_numpy(dtype=float).ravel()
+            for field, column in FIELDS.items()
+        },
+    })
+    return bars.dropna(subset=['close']).reset_index(drop=True)
+
+
+def add_changes(bars):
+    """change_amount / change_percent vs the previous bar of the same ticker"""
+    bars = bars.sort_values(['ticker', 'date'], kind='stable').reset_index(drop=True)
+    previous_close = bars.groupby('ticker', sort=False)['close'].shift(1)
+    bars['change_amount'] = bars['close'] - previous_close
+    with np.errstate(divide='ignore', invalid='ignore'):
+        bars['change_percent'] = bars['change_amount'] / previous_close * 100
+    bars['change_percent'] = bars['change_percent'].replace([np.inf, -np.inf], np.nan)
+    return bars
+
+
+def latest_bars(bars):
+    """Last bar per ticker"""
+    return bars.sort_values('date').groupby('ticker', sort=False).tail(1).reset_index(drop=True)
+
+
+def price_rows(bars, is_latest=None):
+    """
+    prices table rows (plain Python values, NaN -> None).
+
+    is_latest=None leaves the column out, so upserting historical bars never
+    touches the flag on existing rows.
+    """
+    frame = bars.copy()
+    frame['date'] = pd.to_datetime(frame['date']).dt.strftime('%Y-%m-%d')
+    # Scales match the DECIMAL(12,4) / DECIMAL(5,2) columns
+    for column in ('open', 'high', 'low', 'close', 'change_amount'):
+        frame[column] = frame[column].round(4)
+    frame['change_percent'] = frame['change_percent'].round(2)
+    frame['volume'] = frame['volume'].round().astype('Int64')
+    if is_latest is not None:
+        frame['is_latest'] = is_latest
+    frame = frame.astype(object)
+    return frame.where(frame.notna(), None).to_dict('records')
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+On-disk cache for yfinance data
+
+Fundamentals change quarterly, prices change all the time, so every kind of
+data gets its own TTL:
+  quote       price, day range, volume, market cap    (minutes)
+  profile     Ticker.info: name, sector, ratios...    (a day)
+  statements  income, balance sheet, cash flow        (a week)
+              annual and quarterly
+
+Only stale kinds are refetched.  When the profile is fresh but the quote is
+not, the quote is refreshed from the lightweight `fast_info` endpoint and
+overlaid on the cached profile instead of downloading `.info` again.
+
+Entries live in a SQLite file (pickled payloads, so DataFrames round-trip
+exactly).  Offline mode never touches the network and serves whatever is
+cached regardless of age, so the whole DCF pipeline can run from disk.
+"""
+
+import pickle
+import sqlite3
+import threading
+import time
+
+import yfinance as yf
+
+# Default TTLs in seconds
+DEFAULT_TTL = {
+    'quote': 15 * 60,
+    'profile': 24 * 3600,
+    'statements': 7 * 24 * 3600,
+}
+
+# Ticker.info keys that come from the quote rather than the profile
+QUOTE_FIELDS = (
+    'currentPrice', 'regularMarketPrice', 'previousClose', 'regularMarketOpen',
+    'dayHigh', 'dayLow', 'volume', 'marketCap',
+)
+
+# fast_info attribute -> Ticker.info key
+FAST_INFO_FIELDS = {
+    'last_price': 'currentPrice',
+    'previous_close': 'previousClose',
+    'open': 'regularMarketOpen',
+    'day_high': 'dayHigh',
+    'day_low': 'dayLow',
+    'last_volume': 'volume',
+    'market_cap': 'marketCap',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS yf_cache (
+    ticker TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    payload BLOB NOT NULL,
+    PRIMARY KEY (ticker, kind)
+);
+"""
+
+
+def fetch_quote(ticker):
+    """Quote fields from fast_info, keyed like Ticker.info"""
+    fast = yf.Ticker(ticker).fast_info
+    quote = {}
+    for attr, key in FAST_INFO_FIELDS.items():
+        try:
+            quote[key] = fast[attr]
+        except (KeyError, TypeError):
+            quote[key] = None
+    quote['regularMarketPrice'] = quote['currentPrice']
+    return quote
+
+
+# Statement -> yfinance Ticker attribute (quarterly ones are prefixed 'quarterly_')
+STATEMENTS = {
+    'income': 'financials',
+    'balance': 'balance_sheet',
+    'cashflow': 'cashflow',
+}
+
+
+def fetch_statements(ticker):
+    """{'annual'|'quarterly': {'income'|'balance'|'cashflow': DataFrame}}"""
+    stock = yf.Ticker(ticker)
+    return {
+        'annual': {name: getattr(stock, attr) for name, attr in STATEMENTS.items()},
+        'quarterly': {name: getattr(stock, f'quarterly_{attr}') for name, attr in STATEMENTS.items()},
+    }
+
+
+class YFinanceCache:
+    """
+    Thread-safe (the bootstrap fetches from a thread pool).
+
+    refresh=True ignores cached entries (but still stores new ones);
+    offline=True never calls yfinance.  `rate_limiter` (anything with
+    .acquire(), e.g. pipeline.TokenBucket) paces the network calls only,
+    so cache hits are never throttled.
+    """
+
+    def __init__(self, path, ttl=None, offline=False, refresh=False, rate_limiter=None):
+        self.path = path
+        self.ttl = {**DEFAULT_TTL, **(ttl or {})}
+        self.offline = offline
+        self.refresh = refresh
+        self.rate_limiter = rate_limiter
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(SCHEMA)
+        self.hits = {kind: 0 for kind in self.ttl}
+        self.misses = {kind: 0 for kind in self.ttl}
+
+    def _read(self, ticker, kind):
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT fetched_at, payload FROM yf_cache WHERE ticker = ? AND kind = ?',
+                (ticker, kind),
+            ).fetchone()
+        if row is None:
+            return None, None
+        return row[0], pickle.loads(row[1])
+
+    def _store(self, ticker, kind, payload):
+        with self.lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO yf_cache (ticker, kind, fetched_at, payload) VALUES (?, ?, ?, ?)',
+                (ticker, kind, time.time(), pickle.dumps(payload)),
+            )
+            self.conn.commit()
+
+    def get(self, ticker, kind, loader, valid=None):
+        """
+        Cached value if fresh (any age when offline), else loader() -> stored.
+        valid(payload) -> False treats an entry as missing (old cache formats).
+        """
+        fetched_at, payload = self._read(ticker, kind)
+        if payload is not None and (valid is None or valid(payload)):
+            fresh = time.time() - fetched_at < self.ttl[kind]
+            if self.offline or (fresh and not self.refresh):
+                self.hits[kind] += 1
+                return payload
+
+        self.misses[kind] += 1
+        if self.offline:
+            return None
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+        payload = loader()
+        if payload:
+            self._store(ticker, kind, payload)
+        return payload
+
+    def info(self, ticker):
+        """Ticker.info with the quote fields kept within the quote TTL"""
+        loaded = []
+
+        def load_profile():
+            loaded.append(True)
+            return yf.Ticker(ticker).info
+
+        profile = self.get(ticker, 'profile', load_profile)
+        if not profile:
+            return profile
+
+        if loaded:
+            # A fresh .info already carries a fresh quote
+            self._store(ticker, 'quote', {key: profile.get(key) for key in QUOTE_FIELDS})
+            return profile
+
+        quote = self.get(ticker, 'quote', lambda: fetch_quote(ticker)) or {}
+        return {**profile, **{key: value for key, value in quote.items() if value is not None}}
+
+    def statements(self, ticker):
+        """Annual + quarterly statements (see fetch_statements)"""
+        return self.get(ticker, 'statements', lambda: fetch_statements(ticker),
+                        valid=lambda payload: isinstance(payload, dict)) or {}
+
+    def report(self):
+        return ", ".join(
+            f"{kind} {self.hits[kind]} hits / {self.misses[kind]} misses" for kind in self.ttl
+        )
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
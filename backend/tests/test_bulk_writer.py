@@ -0,0 +1,186 @@
+import re
+from pathlib import Path
+
+import pytest
+
+from bulk_writer import ON_CONFLICT, TABLES, BulkWriter
+from pipeline import Pipeline
+
+SCHEMA = Path(__file__).resolve().parents[2] / "database" / "schema.sql"
+
+
+class FakeQuery:
+    """Records the statement built on it; execute() appends it to client.calls"""
+
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.call = None
+
+    def upsert(self, rows, on_conflict):
+        self.call = ("upsert", self.table, [row["ticker"] for row in rows], on_conflict)
+        return self
+
+    def update(self, values):
+        assert values == {"is_latest": False}
+        self.call = ("reset", self.table)
+        return self
+
+    def in_(self, column, values):
+        assert column == "ticker"
+        self.call += (sorted(values),)
+        return self
+
+    def lt(self, column, value):
+        assert column == "date"
+        self.call += (value,)
+        return self
+
+    def execute(self):
+        if self.client.fail_on & set(self.call[2]):
+            raise RuntimeError("constraint violation")
+        self.client.calls.append(self.call)
+
+
+class FakeClient:
+    def __init__(self, fail_on=()):
+        self.calls = []
+        self.fail_on = set(fail_on)  # any statement touching these tickers fails
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+
+def stock_rows(ticker, date="2026-10-16", periods=2):
+    return {
+        "companies": {"ticker": ticker},
+        "financials": [{"ticker": ticker, "period_end": f"{2025 - i}-12-31"} for i in range(periods)],
+        "prices": {"ticker": ticker, "date": date, "is_latest": True},
+        "dcf_valuations": None,  # e.g. no positive FCFE
+        "metrics": {"ticker": ticker},
+    }
+
+
+def upserts(client, table):
+    return [call[2] for call in client.calls if call[:2] == ("upsert", table)]
+
+
+def test_batches_split_at_batch_size():
+    client = FakeClient()
+    flushed = []
+    writer = BulkWriter(client, batch_size=2, flush_interval=3600,
+                        on_flush=lambda batch: flushed.append([t for t, _ in batch]))
+    for ticker in ("AAA", "BBB", "CCC", "DDD", "EEE"):
+        assert writer.add(ticker, stock_rows(ticker)) is True
+
+    assert flushed == [["AAA", "BBB"], ["CCC", "DDD"]]
+    assert writer.flush() is True  # not due yet
+    assert [t for t, _ in writer.pending] == ["EEE"]
+    writer.close()
+    assert flushed[-1] == ["EEE"]
+
+    # One multi-row upsert per table per batch; list entries are spread out
+    assert upserts(client, "companies") == [["AAA", "BBB"], ["CCC", "DDD"], ["EEE"]]
+    assert upserts(client, "financials")[0] == ["AAA", "AAA", "BBB", "BBB"]
+    assert upserts(client, "dcf_valuations") == []
+    # Per full batch: companies, financials, one reset, prices, metrics
+    assert writer.round_trips == len(client.calls) == 3 * 5
+
+
+def test_latest_price_reset_runs_per_date_before_the_prices_upsert():
+    client = FakeClient()
+    writer = BulkWriter(client, batch_size=10)
+    writer.add("AAA", stock_rows("AAA", date="2026-10-16"))
+    writer.add("BBB", stock_rows("BBB", date="2026-10-15"))
+    writer.add("CCC", stock_rows("CCC", date="2026-10-16"))
+    historical = stock_rows("DDD", date="2026-10-14")
+    historical["prices"]["is_latest"] = False
+    writer.add("DDD", historical)
+    writer.close()
+
+    assert [call[:2] for call in client.calls] == [
+        ("upsert", "companies"),
+        ("upsert", "financials"),
+        ("reset", "prices"),
+        ("reset", "prices"),
+        ("upsert", "prices"),
+        ("upsert", "metrics"),
+    ]
+    resets = [call[2:] for call in client.calls if call[0] == "reset"]
+    # Each ticker only clears rows older than its own new date; DDD isn't a latest row
+    assert resets == [(["AAA", "CCC"], "2026-10-16"), (["BBB"], "2026-10-15")]
+
+
+def unique_keys(schema: str) -> dict:
+    """table -> set of column tuples with a PRIMARY KEY or UNIQUE constraint"""
+    keys = {}
+    for table, body in re.findall(r"CREATE TABLE (\w+) \((.*?)\n\);", schema, re.S):
+        found = keys.setdefault(table, set())
+        for columns in re.findall(r"(?:PRIMARY KEY|UNIQUE)\s*\(([^)]*)\)", body):
+            found.add(tuple(column.strip() for column in columns.split(",")))
+        for column in re.findall(r"^\s*(\w+)\s[^,\n]*\bPRIMARY KEY\b", body, re.M):
+            found.add((column,))
+    return keys
+
+
+def test_on_conflict_targets_are_unique_keys_in_the_schema():
+    keys = unique_keys(SCHEMA.read_text())
+    assert set(ON_CONFLICT) == set(TABLES)
+    for table, target in ON_CONFLICT.items():
+        assert tuple(target.split(",")) in keys[table], table
+
+
+def test_failed_flush_reports_the_batch():
+    client = FakeClient(fail_on={"BBB"})
+    flushed, failed = [], []
+    writer = BulkWriter(client, batch_size=2,
+                        on_flush=lambda batch: flushed.append([t for t, _ in batch]),
+                        on_error=lambda batch, error: failed.append([t for t, _ in batch]))
+
+    assert writer.add("AAA", stock_rows("AAA")) is True
+    assert writer.add("BBB", stock_rows("BBB")) is False
+    assert failed == [["AAA", "BBB"]] and flushed == []
+    assert writer.pending == []  # not retried with the next batch
+
+    assert writer.add("CCC", stock_rows("CCC")) is True
+    assert writer.add("DDD", stock_rows("DDD")) is True
+    assert flushed == [["CCC", "DDD"]]
+
+
+def test_failed_flush_raises_without_on_error():
+    writer = BulkWriter(FakeClient(fail_on={"AAA"}), batch_size=10)
+    writer.add("AAA", stock_rows("AAA"))
+    with pytest.raises(RuntimeError):
+        writer.close()
+
+
+def run_pipeline(client, tickers, batch_size):
+    """Wire BulkWriter into the pipeline the way bootstrap_db.main does"""
+    def report_batch_failure(batch, error):
+        for ticker, _ in batch:
+            pipeline.stats.fail(ticker, "write", error)
+
+    writer = BulkWriter(client, batch_size=batch_size, flush_interval=3600,
+                        on_error=report_batch_failure)
+    pipeline = Pipeline(
+        fetch=lambda ticker: ticker,
+        compute=lambda ticker, _: stock_rows(ticker),
+        write=writer.add,
+        flush=writer.flush,
+        rate=0,
+    )
+    return pipeline.run(tickers)
+
+
+def test_tickers_from_a_failed_auto_flush_are_not_counted_as_written():
+    stats = run_pipeline(FakeClient(fail_on={"BAD"}), ["AAA", "BAD", "CCC"], batch_size=1)
+    assert stats.done == {"AAA", "CCC"}
+    assert set(stats.failures) == {"BAD"}
+    assert stats.succeeded + len(stats.failures) == stats.total
+
+
+def test_tickers_from_a_failed_final_flush_are_not_counted_as_written():
+    stats = run_pipeline(FakeClient(fail_on={"BAD"}), ["AAA", "BAD", "CCC"], batch_size=100)
+    assert stats.succeeded == 0
+    assert set(stats.failures) == {"AAA", "BAD", "CCC"}
+    assert all(stage == "write" for stage, _ in stats.failures.values())
@@ -0,0 +1,58 @@
+import numpy as np
+
+from checkpoint import Journal
+
+RUN = "run-1"
+TICKERS = ["AAA", "BBB", "CCC", "DDD"]
+
+
+def crashed_run(path):
+    """A run that died mid-way; the journal is never closed"""
+    journal = Journal(path)
+    journal.start_run(RUN, TICKERS)
+    for ticker in TICKERS:
+        journal.done(RUN, ticker, "fetch")
+    journal.done(RUN, "AAA", "compute", {"metrics": {"ticker": "AAA", "roe": np.float64(12.5)}})
+    journal.done_many(RUN, ["AAA"], "write")
+    journal.done(RUN, "BBB", "compute", {"metrics": {"ticker": "BBB", "roe": np.float64(8.25)},
+                                         "prices": {"ticker": "BBB", "volume": np.int64(1200)}})
+    journal.failed(RUN, "DDD", "compute", ValueError("no cashflow"))
+    # CCC was fetched but never computed
+
+
+def test_resume_after_crash(tmp_path):
+    path = tmp_path / "journal.db"
+    crashed_run(str(path))
+
+    journal = Journal(str(path))
+    assert journal.latest_run() == RUN
+    assert journal.pending(RUN) == ["BBB", "CCC", "DDD"]
+    assert journal.pending(RUN, failed_only=True) == ["DDD"]
+
+    # Only BBB can skip straight to the write stage; NumPy scalars come back as plain numbers
+    computed = journal.computed_rows(RUN, journal.pending(RUN))
+    assert computed == {"BBB": {"metrics": {"ticker": "BBB", "roe": 8.25},
+                                "prices": {"ticker": "BBB", "volume": 1200}}}
+    assert type(computed["BBB"]["prices"]["volume"]) is int
+
+    assert journal.summary(RUN) == {
+        "fetch": {"done": 4},
+        "compute": {"done": 2, "failed": 1},
+        "write": {"done": 1},
+    }
+    journal.close()
+
+
+def test_resumed_run_keeps_its_universe_and_finishes(tmp_path):
+    path = str(tmp_path / "journal.db")
+    crashed_run(path)
+
+    journal = Journal(path)
+    journal.start_run(RUN, ["ZZZ"])  # resuming with a different ticker list
+    assert journal.run_tickers(RUN) == TICKERS
+
+    journal.done(RUN, "DDD", "compute", {"metrics": None})  # the retry succeeded
+    journal.done_many(RUN, ["BBB", "CCC", "DDD"], "write")
+    assert journal.pending(RUN) == []
+    assert journal.pending(RUN, failed_only=True) == []
+    journal.close()
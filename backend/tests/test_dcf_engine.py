@@ -0,0 +1,86 @@
+import math
+
+import numpy as np
+import pytest
+
+from dcf_engine import (
+    TERMINAL_GROWTH,
+    _random_universe,
+    dcf_from_inputs,
+    dcf_vectorized,
+    sensitivity_grid,
+)
+
+FIELDS = (
+    "intrinsic_value", "margin_of_safety", "upside_downside", "pv_projected_fcfe",
+    "pv_terminal_value", "enterprise_value", "equity_value",
+)
+
+
+def scalar(inputs: dict, i: int) -> dict:
+    return dcf_from_inputs(*(float(inputs[key][i]) for key in (
+        "base_fcfe", "growth_rate", "wacc", "terminal_growth",
+        "net_debt", "shares_outstanding", "current_price",
+    )))
+
+
+def test_vectorized_matches_scalar_to_the_cent():
+    inputs = _random_universe(2_000, np.random.default_rng(0))
+    vectorized = dcf_vectorized(**inputs)
+
+    for i in range(2_000):
+        expected = scalar(inputs, i)
+        # Per-share value agrees to the cent
+        assert float(vectorized["intrinsic_value"][i]) == pytest.approx(expected["intrinsic_value"], abs=0.005)
+        for field in FIELDS:
+            assert float(vectorized[field][i]) == pytest.approx(expected[field], rel=1e-9)
+
+
+@pytest.mark.parametrize("wacc", [TERMINAL_GROWTH, TERMINAL_GROWTH - 0.01])
+def test_wacc_at_or_below_terminal_growth_is_nan(wacc):
+    result = dcf_vectorized(1e9, 0.1, wacc, TERMINAL_GROWTH, 0.0, 1e8, 50.0)
+    assert all(math.isnan(float(result[field])) for field in FIELDS)
+
+    # The scalar model has no valuation there either: it divides by zero
+    # or capitalizes a negative spread into a meaningless number
+    if wacc == TERMINAL_GROWTH:
+        with pytest.raises(ZeroDivisionError):
+            dcf_from_inputs(1e9, 0.1, wacc, TERMINAL_GROWTH, 0.0, 1e8, 50.0)
+    else:
+        assert dcf_from_inputs(1e9, 0.1, wacc, TERMINAL_GROWTH, 0.0, 1e8, 50.0)["intrinsic_value"] < 0
+
+
+def test_only_invalid_cells_are_nan():
+    waccs = np.array([0.02, TERMINAL_GROWTH, 0.09])
+    result = dcf_vectorized(1e9, 0.1, waccs, TERMINAL_GROWTH, 0.0, 1e8, 50.0)
+    assert np.isnan(result["intrinsic_value"][:2]).all()
+    assert result["intrinsic_value"][2] == pytest.approx(
+        dcf_from_inputs(1e9, 0.1, 0.09, TERMINAL_GROWTH, 0.0, 1e8, 50.0)["intrinsic_value"]
+    )
+
+
+def test_sensitivity_grid_cells_match_scalar():
+    universe = _random_universe(3, np.random.default_rng(1))
+    growth_rates = [0.0, 0.15, 0.3]
+    waccs = [0.02, 0.08, 0.12]  # 0.02 is below terminal growth
+    terminal_rates = [0.02, 0.03]
+    grid = sensitivity_grid(
+        universe["base_fcfe"], universe["net_debt"], universe["shares_outstanding"],
+        universe["current_price"], growth_rates, waccs, terminal_rates,
+    )
+    assert grid["intrinsic_value"].shape == (3, 3, 3, 2)
+
+    for t in range(3):
+        for g, growth in enumerate(growth_rates):
+            for w, wacc in enumerate(waccs):
+                for r, terminal in enumerate(terminal_rates):
+                    cell = float(grid["intrinsic_value"][t, g, w, r])
+                    if wacc <= terminal:
+                        assert math.isnan(cell)
+                        continue
+                    expected = dcf_from_inputs(
+                        float(universe["base_fcfe"][t]), growth, wacc, terminal,
+                        float(universe["net_debt"][t]), float(universe["shares_outstanding"][t]),
+                        float(universe["current_price"][t]),
+                    )["intrinsic_value"]
+                    assert cell == pytest.approx(expected, abs=0.005)
@@ -0,0 +1,119 @@
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from financials import COLUMNS, FIELD_MAP, annual, financial_rows, latest_value, normalize_statements
+
+SCHEMA = Path(__file__).resolve().parents[2] / "database" / "schema.sql"
+
+FY2025, FY2024 = pd.Timestamp("2025-12-31"), pd.Timestamp("2024-12-31")
+
+
+def statement(rows: dict, periods=(FY2025, FY2024)) -> pd.DataFrame:
+    """A yfinance-shaped statement: labels x period_end"""
+    return pd.DataFrame(rows, index=list(periods)).T
+
+
+def annual_statements(income=None, balance=None, cashflow=None) -> dict:
+    frames = {"income": income, "balance": balance, "cashflow": cashflow}
+    return {"annual": {name: frame for name, frame in frames.items() if frame is not None}}
+
+
+def test_field_map_columns_exist_in_the_financials_table():
+    body = re.search(r"CREATE TABLE financials \((.*?)\n\);", SCHEMA.read_text(), re.S).group(1)
+    table_columns = set(re.findall(r"^\s*(\w+)\s", body, re.M))
+    assert set(COLUMNS) <= table_columns
+    assert len({column for column, _, _ in FIELD_MAP}) == len(FIELD_MAP)
+
+
+def test_labels_are_tried_in_order_per_period():
+    income = statement({
+        "Total Revenue": [1000.0, np.nan],
+        "Operating Revenue": [990.0, 900.0],
+        "Net Income Common Stockholders": [150.0, 120.0],
+    })
+    frame = normalize_statements({"AAA": annual_statements(income=income)})
+
+    assert frame["revenue"].tolist() == [1000.0, 900.0]  # falls back only where the first label is empty
+    assert frame["net_income"].tolist() == [150.0, 120.0]
+    assert frame["period_type"].tolist() == ["FY", "FY"]
+    assert frame["fiscal_year"].tolist() == [2025, 2024]
+    assert frame["ebit"].isna().all()  # no label present
+
+
+def test_capex_stays_negative_and_fcf_is_ocf_plus_capex():
+    cashflow = statement({
+        "Operating Cash Flow": [500.0, 400.0],
+        "Capital Expenditure": [-120.0, -100.0],
+        "Free Cash Flow": [np.nan, 310.0],  # reported FCF wins when present
+        "Issuance Of Debt": [50.0, np.nan],
+        "Repayment Of Debt": [-20.0, np.nan],
+    })
+    frame = annual(normalize_statements({"AAA": annual_statements(cashflow=cashflow)}), "AAA")
+
+    assert (frame["capex"] < 0).all()
+    assert frame["free_cash_flow"].tolist() == [380.0, 310.0]
+    assert frame.loc[0, "free_cash_flow"] == frame.loc[0, "operating_cash_flow"] + frame.loc[0, "capex"]
+    # Net borrowing = issued - repaid; unknown when neither row exists
+    assert frame.loc[0, "net_borrowing"] == 30.0
+    assert np.isnan(frame.loc[1, "net_borrowing"])
+
+
+def test_debt_repayment_counts_as_outflow_whatever_its_sign():
+    cashflow = statement({"Issuance Of Debt": [50.0], "Repayment Of Debt": [20.0]}, periods=(FY2025,))
+    frame = normalize_statements({"AAA": annual_statements(cashflow=cashflow)})
+    assert frame.loc[0, "net_borrowing"] == 30.0
+
+
+def test_tickers_and_frequencies_are_stacked():
+    quarterly = statement({"Total Revenue": [300.0, 280.0]},
+                          periods=(pd.Timestamp("2025-09-30"), pd.Timestamp("2025-06-30")))
+    statements = {
+        "AAA": {**annual_statements(income=statement({"Total Revenue": [1000.0, 900.0]})),
+                "quarterly": {"income": quarterly}},
+        # yfinance pads with an all-empty older period
+        "BBB": annual_statements(income=statement({"Total Revenue": [50.0, np.nan]})),
+        "CCC": {},
+    }
+    frame = normalize_statements(statements)
+
+    assert list(zip(frame["ticker"], frame["period_type"], frame["revenue"])) == [
+        ("AAA", "FY", 1000.0), ("AAA", "FY", 900.0),
+        ("AAA", "Q2", 280.0), ("AAA", "Q3", 300.0),
+        ("BBB", "FY", 50.0),
+    ]
+    assert latest_value(annual(frame, "AAA"), "revenue") == 1000.0
+    assert latest_value(annual(frame, "CCC"), "revenue") is None
+
+
+def test_no_statements_gives_an_empty_frame_with_every_column():
+    frame = normalize_statements({"AAA": {}})
+    assert frame.empty
+    assert set(COLUMNS) <= set(frame.columns)
+
+
+def test_financial_rows_are_plain_values():
+    income = statement({"Total Revenue": [1000.0], "Basic EPS": [1.234567]}, periods=(FY2025,))
+    cashflow = statement({"Operating Cash Flow": [500.4], "Capital Expenditure": [-120.6]}, periods=(FY2025,))
+    [row] = financial_rows(normalize_statements({"AAA": annual_statements(income=income, cashflow=cashflow)}))
+
+    assert row["period_end"] == "2025-12-31" and row["period_type"] == "FY"
+    assert row["capex"] == -121 and type(row["capex"]) is int
+    assert row["free_cash_flow"] == 380
+    assert row["eps"] == 1.2346
+    assert row["total_debt"] is None
+
+
+def test_fcfe_adds_negative_capex():
+    bootstrap_db = pytest.importorskip("bootstrap_db")  # needs supabase and yfinance
+    cashflow = statement({
+        "Operating Cash Flow": [500.0],
+        "Capital Expenditure": [-120.0],
+        "Issuance Of Debt": [50.0],
+        "Repayment Of Debt": [-20.0],
+    }, periods=(FY2025,))
+    rows = annual(normalize_statements({"AAA": annual_statements(cashflow=cashflow)}), "AAA")
+    assert bootstrap_db.calculate_fcfe(rows) == 500.0 - 120.0 + 30.0
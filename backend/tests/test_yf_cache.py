@@ -0,0 +1,90 @@
+import pytest
+
+pytest.importorskip("yfinance")
+
+import yf_cache
+from yf_cache import YFinanceCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(yf_cache.time, "time", clock)
+    return clock
+
+
+class Loader:
+    def __init__(self, payload):
+        self.payload = payload
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.payload
+
+
+def test_entry_expires_after_its_ttl(tmp_path, clock):
+    cache = YFinanceCache(str(tmp_path / "cache.db"), ttl={"quote": 60})
+    loader = Loader({"currentPrice": 10.0})
+
+    assert cache.get("AAA", "quote", loader) == {"currentPrice": 10.0}
+    clock.now += 59
+    assert cache.get("AAA", "quote", loader) == {"currentPrice": 10.0}
+    assert loader.calls == 1
+
+    clock.now += 1
+    loader.payload = {"currentPrice": 11.0}
+    assert cache.get("AAA", "quote", loader) == {"currentPrice": 11.0}
+    assert loader.calls == 2
+    assert (cache.hits["quote"], cache.misses["quote"]) == (1, 2)
+
+
+def test_ttls_are_per_kind(tmp_path, clock):
+    cache = YFinanceCache(str(tmp_path / "cache.db"))
+    quote, profile = Loader({"currentPrice": 10.0}), Loader({"sector": "Technology"})
+    cache.get("AAA", "quote", quote)
+    cache.get("AAA", "profile", profile)
+
+    clock.now += yf_cache.DEFAULT_TTL["quote"] + 1
+    cache.get("AAA", "quote", quote)
+    cache.get("AAA", "profile", profile)
+    assert (quote.calls, profile.calls) == (2, 1)
+
+
+def test_offline_serves_stale_entries_and_never_loads(tmp_path, clock):
+    path = str(tmp_path / "cache.db")
+    YFinanceCache(path).get("AAA", "statements", Loader({"annual": {}}))
+    clock.now += 365 * 24 * 3600
+
+    offline = YFinanceCache(path, offline=True)
+    loader = Loader({"annual": {"income": None}})
+    assert offline.get("AAA", "statements", loader) == {"annual": {}}
+    assert offline.get("BBB", "statements", loader) is None
+    assert loader.calls == 0
+
+
+def test_refresh_ignores_fresh_entries(tmp_path, clock):
+    path = str(tmp_path / "cache.db")
+    YFinanceCache(path).get("AAA", "profile", Loader({"sector": "Old"}))
+    loader = Loader({"sector": "New"})
+    assert YFinanceCache(path, refresh=True).get("AAA", "profile", loader) == {"sector": "New"}
+    assert YFinanceCache(path).get("AAA", "profile", Loader(None)) == {"sector": "New"}
+
+
+def test_stale_quote_is_overlaid_on_a_fresh_profile(tmp_path, clock, monkeypatch):
+    cache = YFinanceCache(str(tmp_path / "cache.db"))
+    cache._store("AAA", "profile", {"sector": "Technology", "currentPrice": 10.0})
+    cache._store("AAA", "quote", {"currentPrice": 10.0})
+
+    clock.now += yf_cache.DEFAULT_TTL["quote"] + 1
+    monkeypatch.setattr(yf_cache, "fetch_quote", lambda ticker: {"currentPrice": 12.0, "volume": None})
+    assert cache.info("AAA") == {"sector": "Technology", "currentPrice": 12.0}
+    assert cache.hits["profile"] == 1 and cache.misses["quote"] == 1
@@ -121,6 +121,7 @@ CREATE TABLE financials (
     financing_cash_flow BIGINT,
     capex BIGINT,
     free_cash_flow BIGINT,
+    net_borrowing BIGINT, -- debt issued - debt repaid (FCFE input)
     
     -- Dividends
     dividends_paid BIGINT,
@@ -338,6 +339,10 @@ CREATE TABLE messages (
     tool_calls JSONB,
     tool_results JSONB,
     
+    -- Responses API id of the turn's final response; a follow-up resumes
+    -- from the latest one (previous_response_id)
+    response_id TEXT,
+    
     created_at TIMESTAMP DEFAULT NOW()
 );
 
@@ -548,6 +553,70 @@ LEFT JOIN LATERAL (
     LIMIT 1
 ) m ON true;
 
+-- Denormalized screening table: one row per ticker with the latest price,
+-- DCF and metrics, so "find undervalued tech stocks" is one indexed query.
+-- Refreshed by the bootstrap (SELECT refresh_screening()).
+CREATE MATERIALIZED VIEW screening AS
+SELECT 
+    c.ticker,
+    c.name,
+    c.sector,
+    c.industry,
+    c.market_cap,
+    p.close as current_price,
+    p.change_percent as price_change_percent,
+    p.date as price_date,
+    d.intrinsic_value,
+    d.margin_of_safety,
+    d.upside_downside,
+    (d.scenarios -> 'monte_carlo' ->> 'prob_undervalued')::DECIMAL(5,4) as prob_undervalued,
+    d.valuation_date,
+    m.pe_ratio,
+    m.pb_ratio,
+    m.ps_ratio,
+    m.roe,
+    m.roa,
+    m.gross_margin,
+    m.operating_margin,
+    m.net_margin,
+    m.revenue_growth,
+    m.earnings_growth,
+    m.debt_to_equity,
+    m.current_ratio,
+    m.dividend_yield,
+    m.metric_date,
+    NOW() as refreshed_at
+FROM companies c
+LEFT JOIN (
+    SELECT DISTINCT ON (ticker) * FROM prices
+    WHERE is_latest = true
+    ORDER BY ticker, date DESC
+) p ON p.ticker = c.ticker
+LEFT JOIN (
+    SELECT DISTINCT ON (ticker) * FROM dcf_valuations
+    ORDER BY ticker, valuation_date DESC
+) d ON d.ticker = c.ticker
+LEFT JOIN (
+    SELECT DISTINCT ON (ticker) * FROM metrics
+    ORDER BY ticker, metric_date DESC
+) m ON m.ticker = c.ticker;
+
+-- Unique index is required for REFRESH ... CONCURRENTLY (reads never block)
+CREATE UNIQUE INDEX idx_screening_ticker ON screening(ticker);
+CREATE INDEX idx_screening_sector_mos ON screening(sector, margin_of_safety DESC);
+CREATE INDEX idx_screening_mos ON screening(margin_of_safety DESC);
+CREATE INDEX idx_screening_upside ON screening(upside_downside DESC);
+CREATE INDEX idx_screening_pe ON screening(pe_ratio);
+CREATE INDEX idx_screening_roe ON screening(roe DESC);
+
+-- Callable over PostgREST: supabase.rpc('refresh_screening')
+CREATE OR REPLACE FUNCTION refresh_screening()
+RETURNS void AS $$
+BEGIN
+    REFRESH MATERIALIZED VIEW CONCURRENTLY screening;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
 -- ============================================================================
 -- SAMPLE DATA (for testing)
 -- ============================================================================
@@ -567,6 +636,7 @@ COMMENT ON TABLE financials IS 'Quarterly and annual financial statements';
 COMMENT ON TABLE dcf_valuations IS 'Pre-calculated DCF valuations';
 COMMENT ON TABLE pe_analysis IS 'Pre-calculated P/E analysis';
 COMMENT ON TABLE metrics IS 'Calculated financial metrics for screening';
+COMMENT ON MATERIALIZED VIEW screening IS 'Latest price, DCF and metrics per ticker (agent screen_stocks tool)';
 COMMENT ON TABLE ai_insights IS 'AI-generated insights (moat, risks, etc.)';
 COMMENT ON TABLE user_profiles IS 'User account information';
 COMMENT ON TABLE conversations IS 'AI chat conversations';